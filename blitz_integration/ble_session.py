@@ -0,0 +1,205 @@
+"""
+Riassemblaggio delle sessioni inviate in chunk via Bluetooth
+
+Il Metro Digitale trasferisce una sessione completa con tre tipi di
+messaggio JSON (vedi docs/storage.md):
+
+    {"type": "session_start", "session_id": "...", "total_chunks": N, "total_bytes": B}
+    {"type": "data_chunk", "chunk_id": 1..N, "data": "<base64>"}
+    {"type": "session_end", "crc32": C}
+
+Ogni chunk viene decodificato direttamente nella sua posizione di un
+buffer preallocato di B byte: i chunk possono arrivare in qualsiasi
+ordine e quelli duplicati vengono ignorati. Il CRC32 dei byte decodificati
+viene aggiornato man mano che la parte iniziale contigua del buffer
+cresce, così alla fine della sessione resta solo il confronto.
+
+Autore: Metro Digitale Project
+Licenza: MIT
+"""
+
+import binascii
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_MESSAGE_TYPES = ('session_start', 'data_chunk', 'session_end')
+
+# Campi obbligatori per ogni tipo di messaggio
+SESSION_REQUIRED_FIELDS = {
+    'session_start': ('session_id', 'total_chunks', 'total_bytes'),
+    'data_chunk': ('chunk_id', 'data'),
+    'session_end': ('crc32',),
+}
+
+
+@dataclass
+class BleSession:
+    """Sessione ricevuta e verificata"""
+    session_id: str
+    data: bytearray
+    crc32: int
+
+
+class BleSessionReassembler:
+    """Riassembla una sessione chunked alla volta"""
+    
+    # Dimensione massima accettata per una sessione (protezione memoria)
+    MAX_SESSION_BYTES = 16 * 1024 * 1024
+    
+    def __init__(self, max_bytes: int = MAX_SESSION_BYTES):
+        """
+        Inizializza il riassemblatore.
+        
+        Args:
+            max_bytes: Dimensione massima di una sessione
+        """
+        self.max_bytes = max_bytes
+        self.duplicates = 0
+        self._reset()
+    
+    @staticmethod
+    def is_session_message(payload: Dict[str, Any]) -> bool:
+        """True se il payload appartiene al protocollo di trasferimento sessioni."""
+        return payload.get('type') in SESSION_MESSAGE_TYPES
+    
+    @property
+    def in_progress(self) -> bool:
+        """True se una sessione è in corso di ricezione."""
+        return self.session_id is not None
+    
+    @property
+    def progress(self) -> float:
+        """Frazione di chunk ricevuti (0-1)."""
+        if not self.total_chunks:
+            return 0.0
+        return self._received_count / self.total_chunks
+    
+    def feed(self, payload: Dict[str, Any]) -> Optional[BleSession]:
+        """
+        Elabora un messaggio del protocollo.
+        
+        Args:
+            payload: Messaggio JSON decodificato
+        
+        Returns:
+            BleSession quando la sessione è completa e verificata, altrimenti None
+        
+        Raises:
+            ValueError: Se il messaggio viola il protocollo o il CRC non corrisponde
+                (la sessione in corso viene scartata)
+        """
+        kind = payload.get('type')
+        
+        # Chunk ritrasmessi dopo la fine della sessione: ignorati
+        if kind != 'session_start' and not self.in_progress:
+            logger.debug(f"Messaggio {kind} senza sessione in corso ignorato")
+            return None
+        
+        try:
+            if kind == 'session_start':
+                self._start(payload)
+                return None
+            if kind == 'data_chunk':
+                self._add_chunk(payload)
+            elif kind == 'session_end':
+                self._expected_crc = int(payload['crc32']) & 0xFFFFFFFF
+            else:
+                raise ValueError(f"Tipo messaggio non gestito: {kind}")
+            return self._finish_if_complete()
+        
+        except (ValueError, KeyError, TypeError, binascii.Error) as e:
+            self._reset()
+            raise ValueError(f"Sessione scartata: {e}")
+    
+    def _reset(self):
+        self.session_id = None
+        self.total_chunks = 0
+        self.total_bytes = 0
+        self._buffer = None
+        self._view = None
+        self._received = None
+        self._received_count = 0
+        self._chunk_size = None
+        self._crc = 0
+        self._crc_next = 0
+        self._expected_crc = None
+    
+    def _start(self, payload: Dict[str, Any]):
+        total_chunks = int(payload['total_chunks'])
+        total_bytes = int(payload['total_bytes'])
+        if total_chunks < 1 or total_bytes < total_chunks:
+            raise ValueError(f"Dimensioni sessione non valide: {total_chunks} chunk, {total_bytes} byte")
+        if total_bytes > self.max_bytes:
+            raise ValueError(f"Sessione troppo grande: {total_bytes} byte")
+        
+        if self.in_progress:
+            logger.warning(f"Sessione {self.session_id} interrotta da una nuova sessione")
+        
+        self._reset()
+        self.session_id = str(payload['session_id'])
+        self.total_chunks = total_chunks
+        self.total_bytes = total_bytes
+        self._buffer = bytearray(total_bytes)
+        self._view = memoryview(self._buffer)
+        self._received = bytearray(total_chunks)
+    
+    def _chunk_span(self, index: int, length: Optional[int] = None):
+        """Offset e lunghezza del chunk di indice index (0-based)."""
+        last = index == self.total_chunks - 1
+        
+        if self._chunk_size is None:
+            # Tutti i chunk tranne l'ultimo hanno la stessa dimensione:
+            # la si ricava dal primo chunk ricevuto
+            if last:
+                if self.total_chunks > 1:
+                    size, remainder = divmod(self.total_bytes - length, self.total_chunks - 1)
+                    if remainder:
+                        raise ValueError("Dimensione ultimo chunk non coerente")
+                    self._chunk_size = size
+            else:
+                self._chunk_size = length
+        
+        offset = index * (self._chunk_size or 0)
+        size = self.total_bytes - offset if last else self._chunk_size
+        if length is not None and length != size:
+            raise ValueError(f"Chunk {index + 1}: {length} byte invece di {size}")
+        return offset, size
+    
+    def _add_chunk(self, payload: Dict[str, Any]):
+        chunk_id = int(payload['chunk_id'])
+        if not 1 <= chunk_id <= self.total_chunks:
+            raise ValueError(f"Chunk {chunk_id} fuori intervallo (1-{self.total_chunks})")
+        
+        index = chunk_id - 1
+        if self._received[index]:
+            self.duplicates += 1
+            return
+        
+        data = payload['data']
+        decoded = binascii.a2b_base64(data.encode('ascii') if isinstance(data, str) else data)
+        offset, size = self._chunk_span(index, len(decoded))
+        self._view[offset:offset + size] = decoded
+        self._received[index] = 1
+        self._received_count += 1
+        
+        # CRC incrementale sulla parte iniziale contigua
+        while self._crc_next < self.total_chunks and self._received[self._crc_next]:
+            offset, size = self._chunk_span(self._crc_next)
+            self._crc = zlib.crc32(self._view[offset:offset + size], self._crc)
+            self._crc_next += 1
+    
+    def _finish_if_complete(self) -> Optional[BleSession]:
+        if self._received_count < self.total_chunks or self._expected_crc is None:
+            return None
+        
+        if self._crc != self._expected_crc:
+            raise ValueError(f"CRC32 errato: atteso {self._expected_crc}, calcolato {self._crc}")
+        
+        session = BleSession(self.session_id, self._buffer, self._crc)
+        self._view.release()
+        self._reset()
+        return session
@@ -13,6 +13,7 @@ import json
 import logging
 from typing import Optional, Callable, Dict, Any
 from bleak import BleakClient, BleakScanner
+from ble_session import BleSession, BleSessionReassembler, SESSION_REQUIRED_FIELDS
 
 # Configurazione
 SERVICE_UUID = "12345678-1234-1234-1234-123456789abc"
@@ -43,6 +44,8 @@ class BluetoothCalibroReceiver:
         self.client: Optional[BleakClient] = None
         self.is_connected = False
         self.on_misura_received: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.on_session_received: Optional[Callable[[BleSession], None]] = None
+        self.session_reassembler = BleSessionReassembler()
         self._running = False
         
     async def _find_device(self):
@@ -78,6 +81,11 @@ class BluetoothCalibroReceiver:
                 logger.warning(f"Payload non valido: {payload}")
                 return
             
+            # Trasferimento sessione chunked
+            if self.session_reassembler.is_session_message(payload):
+                self._handle_session_message(payload)
+                return
+            
             # Chiama callback se configurato
             if self.on_misura_received:
                 self.on_misura_received(payload)
@@ -99,6 +107,11 @@ class BluetoothCalibroReceiver:
         Returns:
             True se valido, False altrimenti
         """
+        # Messaggi del trasferimento sessioni (session_start/data_chunk/session_end)
+        required = SESSION_REQUIRED_FIELDS.get(payload.get('type'))
+        if required is not None:
+            return all(field in payload for field in required)
+        
         # Verifica campi richiesti per fermavetro
         if payload.get('type') == 'fermavetro':
             return 'misura_mm' in payload
@@ -109,6 +122,26 @@ class BluetoothCalibroReceiver:
         
         return False
     
+    def _handle_session_message(self, payload: Dict[str, Any]):
+        """
+        Passa un messaggio di sessione al riassemblatore.
+        
+        Args:
+            payload: Messaggio session_start, data_chunk o session_end
+        """
+        try:
+            session = self.session_reassembler.feed(payload)
+        except ValueError as e:
+            logger.error(f"Errore trasferimento sessione: {e}")
+            return
+        
+        if session is None:
+            return
+        
+        logger.info(f"Sessione {session.session_id} ricevuta ({len(session.data)} byte)")
+        if self.on_session_received:
+            self.on_session_received(session)
+    
     async def connect(self):
         """Connette al dispositivo Metro Digitale."""
         try:
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Latenza per tasto della validazione nel FormulaEditor
+
+Simula la digitazione di una formula lunga carattere per carattere
+(con correzioni: cancellazione e riscrittura di alcuni tratti) e misura
+il tempo di FormulaParser.validate() a ogni tasto, senza cache e con
+la cache di variabili/validazioni. Riporta anche quante validazioni
+esegue l'editor con il debounce, dato un ritmo di digitazione tipico.
+
+Uso:
+    python benchmarks/bench_formula_editor.py [--repeat N] [--key-interval MS] [--delay MS]
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import statistics
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.formula_parser import FormulaParser
+
+
+VARIABILI = ["L", "H", "B", "S"]
+
+FORMULA = (
+    "round((L + 6) / 2 - max(B, S) * 3 + abs(H - L) / 4 - min(L, H, 1200) "
+    "+ (L - 2 * B) / (H - 2 * S) * 100 - round(L / 3, 1) + max(L - 12, H - 15) "
+    "- abs(B - S) * 0.5, 1)"
+)
+
+
+def keystrokes(formula: str, rng: random.Random) -> List[str]:
+    """Sequenza dei testi dopo ogni tasto, con correzioni casuali"""
+    texts = []
+    for i in range(1, len(formula) + 1):
+        texts.append(formula[:i])
+        # Ogni tanto cancella qualche carattere e lo riscrive
+        if i > 10 and rng.random() < 0.1:
+            back = rng.randint(1, 8)
+            for j in range(1, back + 1):
+                texts.append(formula[:i - j])
+            for j in range(back - 1, -1, -1):
+                texts.append(formula[:i - j])
+    return texts
+
+
+def measure(parser: FormulaParser, texts: List[str]) -> List[float]:
+    """Latenza di validate() per ogni tasto, in microsecondi"""
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        parser.validate(text, VARIABILI)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def debounced_validations(count: int, key_interval_ms: float, delay_ms: int,
+                          rng: random.Random) -> int:
+    """Validazioni eseguite con il debounce (pause casuali tra parole)"""
+    validations = 0
+    for _ in range(count):
+        # Intervallo tra tasti con pause occasionali più lunghe del ritardo
+        interval = key_interval_ms * rng.uniform(0.5, 1.5)
+        if rng.random() < 0.05:
+            interval += delay_ms * 2
+        if interval >= delay_ms:
+            validations += 1
+    return validations + 1
+
+
+def summary(label: str, latencies: List[float], head: int):
+    """Stampa media, p95 e media su inizio/fine formula (costo per tasto)"""
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    first = statistics.mean(latencies[:head])
+    last = statistics.mean(latencies[-head:])
+    print(f"{label:<28} media {statistics.mean(latencies):8.1f} µs   p95 {p95:8.1f} µs   "
+          f"primi tasti {first:7.1f} µs   ultimi tasti {last:7.1f} µs")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--repeat', type=int, default=5,
+                            help="sessioni di digitazione sulla stessa formula")
+    arg_parser.add_argument('--key-interval', type=float, default=120.0,
+                            help="intervallo medio tra tasti (ms)")
+    arg_parser.add_argument('--delay', type=int, default=150,
+                            help="ritardo di validazione (FormulaEditor.VALIDATION_DELAY_MS)")
+    args = arg_parser.parse_args()
+    
+    rng = random.Random(0)
+    texts = [t for _ in range(args.repeat) for t in keystrokes(FORMULA, rng)]
+    head = min(50, len(texts) // 4)
+    
+    print(f"Formula: {len(FORMULA)} caratteri, {len(texts):,} tasti in {args.repeat} sessioni")
+    
+    uncached = measure(FormulaParser(cache_size=0), texts)
+    cached = measure(FormulaParser(), texts)
+    
+    summary("Senza cache", uncached, head)
+    summary("Con cache (variabili/esiti)", cached, head)
+    print(f"Speedup medio: {statistics.mean(uncached) / statistics.mean(cached):.1f}x")
+    
+    validations = debounced_validations(len(texts), args.key_interval, args.delay, rng)
+    print(f"Debounce {args.delay} ms, un tasto ogni ~{args.key_interval:.0f} ms: "
+          f"{validations:,} validazioni invece di {len(texts):,}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
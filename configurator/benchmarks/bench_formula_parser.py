@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark FormulaParser.evaluate
+
+Confronta il vecchio percorso (regex + namespace + eval() sulla stringa
+a ogni chiamata) e il percorso eval() su code object in cache con la
+valutazione tramite closure compilate dall'AST validato, usando le
+formule presenti nei template in resources/templates.
+Misura anche la valutazione batch (NumPy) su colonne di rilievi e
+il costo di un'anteprima con un parser nuovo per chiamata rispetto
+all'istanza condivisa (get_formula_parser()).
+
+Uso:
+    python benchmarks/bench_formula_parser.py [--iterations N] [--rows N]
+"""
+
+import sys
+import os
+import re
+import json
+import math
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.formula_parser import FormulaParser, HAS_NUMPY, get_formula_parser
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "resources" / "templates"
+
+
+def collect_template_formulas(templates_dir: Path = TEMPLATES_DIR) -> List[str]:
+    """Raccoglie tutte le formule (campi 'formula' e dict 'formule') dai template"""
+    formulas = []
+    
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == 'formula' and isinstance(value, str) and value.strip():
+                    formulas.append(value)
+                elif key == 'formule' and isinstance(value, dict):
+                    formulas.extend(f for f in value.values() if isinstance(f, str))
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+    
+    for path in sorted(templates_dir.glob("*")):
+        if path.suffix not in ('.json', '.mdp'):
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                walk(json.load(f))
+        except (IOError, json.JSONDecodeError):
+            continue
+    
+    # Rimuovi duplicati mantenendo ordine
+    return list(dict.fromkeys(formulas))
+
+
+def legacy_evaluate(formula: str, valori: Dict[str, float]) -> float:
+    """Replica del vecchio FormulaParser.evaluate (regex + eval a ogni chiamata)"""
+    pattern = r'\b([A-Za-z_][A-Za-z0-9_]*)\b'
+    keywords = {'round', 'abs', 'min', 'max', 'math'}
+    used_vars = []
+    for m in re.findall(pattern, formula):
+        if m.lower() not in keywords and m not in used_vars:
+            used_vars.append(m)
+    
+    missing = [v for v in used_vars if v not in valori]
+    if missing:
+        raise ValueError(f"Valori mancanti per: {', '.join(missing)}")
+    
+    safe_dict = {
+        'round': round,
+        'abs': abs,
+        'min': min,
+        'max': max,
+        'math': math,
+        '__builtins__': {}
+    }
+    safe_dict.update(valori)
+    return float(eval(formula, safe_dict))
+
+
+class CachedEval:
+    """Percorso eval() su code object in cache (namespace ricostruito a ogni chiamata)"""
+    
+    NAMESPACE = {
+        'round': round,
+        'abs': abs,
+        'min': min,
+        'max': max,
+        'math': math,
+        '__builtins__': {}
+    }
+    
+    def __init__(self):
+        self._codes = {}
+    
+    def __call__(self, formula: str, valori: Dict[str, float]) -> float:
+        code = self._codes.get(formula)
+        if code is None:
+            code = self._codes[formula] = compile(formula, '<formula>', 'eval')
+        namespace = dict(self.NAMESPACE)
+        namespace.update(valori)
+        return float(eval(code, namespace))
+
+
+def measure(func, formulas: List[str], valori: Dict[str, float], iterations: int) -> float:
+    """Ritorna valutazioni/secondo"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for formula in formulas:
+            func(formula, valori)
+    elapsed = time.perf_counter() - start
+    return (iterations * len(formulas)) / elapsed
+
+
+def measure_preview(formulas: List[str], valori: Dict[str, float], iterations: int):
+    """
+    Latenza media di un'anteprima (validazione + calcolo) in microsecondi:
+    parser creato a ogni anteprima contro istanza condivisa
+    """
+    def preview(parser: FormulaParser, formula: str):
+        parser.validate(formula, list(valori))
+        parser.evaluate(formula, valori)
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for formula in formulas:
+            preview(FormulaParser(), formula)
+    per_call = (time.perf_counter() - start) / (iterations * len(formulas))
+    
+    shared = get_formula_parser()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for formula in formulas:
+            preview(shared, formula)
+    shared_time = (time.perf_counter() - start) / (iterations * len(formulas))
+    
+    return per_call * 1e6, shared_time * 1e6
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--iterations', type=int, default=20000)
+    arg_parser.add_argument('--rows', type=int, default=1_000_000)
+    args = arg_parser.parse_args()
+    
+    formulas = collect_template_formulas()
+    if not formulas:
+        print("Nessuna formula trovata nei template")
+        return 1
+    
+    valori = {'L': 1200.0, 'H': 1500.0, 'B': 50.0, 'S': 20.0, 'D': 30.0}
+    parser = FormulaParser()
+    
+    # Verifica coerenza risultati prima di misurare
+    for formula in formulas:
+        assert parser.evaluate(formula, valori) == legacy_evaluate(formula, valori)
+    
+    before = measure(legacy_evaluate, formulas, valori, args.iterations)
+    cached_eval = measure(CachedEval(), formulas, valori, args.iterations)
+    after = measure(parser.evaluate, formulas, valori, args.iterations)
+    
+    print(f"Formule dai template: {len(formulas)} ({', '.join(formulas)})")
+    print(f"Prima (eval su stringa):     {before:>12,.0f} valutazioni/s")
+    print(f"eval su code object in cache: {cached_eval:>11,.0f} valutazioni/s")
+    print(f"Closure AST compilate:        {after:>11,.0f} valutazioni/s")
+    print(f"Speedup: {after / before:.1f}x su eval stringa, "
+          f"{after / cached_eval:.1f}x su eval in cache")
+    if after < cached_eval:
+        print("ATTENZIONE: closure più lente del percorso eval()")
+    
+    per_call, shared = measure_preview(formulas, valori, max(1, args.iterations // 10))
+    print(f"Anteprima con FormulaParser() nuovo: {per_call:8.1f} µs")
+    print(f"Anteprima con parser condiviso:      {shared:8.1f} µs ({per_call / shared:.1f}x)")
+    
+    if HAS_NUMPY:
+        rng = np.random.default_rng(0)
+        columns = {name: rng.uniform(300.0, 3000.0, args.rows) for name in valori}
+        start = time.perf_counter()
+        for formula in formulas:
+            parser.evaluate_batch(formula, columns)
+        elapsed = (time.perf_counter() - start) / len(formulas)
+        print(f"Batch NumPy ({args.rows:,} righe): {elapsed * 1000:.1f} ms per formula "
+              f"({args.rows / elapsed:,.0f} righe/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
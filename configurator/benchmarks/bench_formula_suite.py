@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Suite di benchmark e fuzz differenziale per le formule
+
+Genera formule casuali di profondità e numero di variabili crescenti e
+misura parse, compilazione, valutazione singola (closure e bytecode) e
+valutazione batch (NumPy). I risultati vengono scritti in JSON per
+confrontarli tra una release e l'altra (--compare segnala le regressioni).
+
+La modalità differenziale (--differential) verifica che la formula
+ottimizzata dia lo stesso risultato della formula originale entro 1e-9,
+anche con variabili nulle, e che la valutazione batch (nan al posto
+degli errori) coincida con quella scalare; l'interprete
+bytecode (variabili e risultato float come nel firmware) viene
+confrontato con la formula originale calcolata sugli stessi input float,
+entro la precisione float del risultato.
+
+Uso:
+    python benchmarks/bench_formula_suite.py [--output risultati.json]
+        [--compare precedente.json] [--label v1.2] [--differential N]
+"""
+
+import sys
+import os
+import json
+import math
+import time
+import random
+import argparse
+import platform
+from datetime import datetime
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.formula_parser import FormulaParser, HAS_NUMPY
+from core.formula_bytecode import compile_bytecode, run_bytecode, to_float32
+from core.formula_fuzz import random_formula
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+# Nomi variabili maiuscoli (gli unici accettati dal parser del firmware)
+NOMI_VARIABILI = list("LHBSDPTWACEFGIKMNOQRUVXYZ")
+
+TOLLERANZA = 1e-9
+
+# Bytecode: risultato float (32 bit) come nel firmware, entro 2 ulp
+TOLLERANZA_FLOAT32 = 2.0 ** -22
+
+# Peggioramento oltre il quale --compare segnala una regressione
+SOGLIA_REGRESSIONE = 0.25
+
+
+def random_values(rng: random.Random, variables: List[str],
+                  zero_probability: float = 0.0) -> Dict[str, float]:
+    """Valori di rilievo casuali (mm); con zero_probability una variabile vale 0"""
+    return {
+        name: 0.0 if rng.random() < zero_probability else round(rng.uniform(10.0, 3000.0), 2)
+        for name in variables
+    }
+
+
+# Ripetizioni di ogni misura: si tiene la migliore (meno rumore)
+ROUNDS = 5
+
+
+def _timed(func, items) -> float:
+    """Tempo medio per elemento in microsecondi (migliore di ROUNDS)"""
+    best = float('inf')
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+
+def bench_case(seed: int, depth: int, n_vars: int, count: int,
+               rows: int, repeat: int) -> Dict:
+    """
+    Misura un caso (profondità, numero variabili) su count formule
+    
+    Le formule dipendono solo da seed, profondità e variabili, così i
+    risultati restano confrontabili anche cambiando l'elenco dei casi.
+    """
+    rng = random.Random(f"{seed}-{depth}-{n_vars}")
+    variables = NOMI_VARIABILI[:n_vars]
+    formulas = [random_formula(rng, depth, variables) for _ in range(count)]
+    valori = random_values(rng, variables)
+    
+    # Parse e compilazione senza cache: ogni chiamata fa il lavoro completo
+    cold = FormulaParser(cache_size=0)
+    parse_us = _timed(cold.parse, formulas)
+    compile_us = _timed(cold.compile, formulas)
+    
+    parser = FormulaParser()
+    compiled = [parser.compile(f) for f in formulas]
+    bytecodes = [compile_bytecode(c) for c in compiled]
+    
+    def safe(func):
+        def call(item):
+            try:
+                func(item)
+            except ValueError:
+                pass
+        return call
+    
+    evaluate_us = _timed(safe(lambda c: c.evaluate(valori)), compiled * repeat)
+    bytecode_us = _timed(safe(lambda b: run_bytecode(b, valori)), bytecodes * repeat)
+    
+    result = {
+        'depth': depth,
+        'variables': n_vars,
+        'formulas': count,
+        'avg_length': sum(len(f) for f in formulas) / count,
+        'parse_us': parse_us,
+        'compile_us': compile_us,
+        'evaluate_us': evaluate_us,
+        'bytecode_us': bytecode_us,
+        'bytecode_bytes': sum(len(b.to_bytes()) for b in bytecodes) / count,
+    }
+    
+    if HAS_NUMPY and rows:
+        np_rng = np.random.default_rng(depth * 100 + n_vars)
+        columns = {name: np_rng.uniform(10.0, 3000.0, rows) for name in variables}
+        elapsed = _timed(lambda c: c.evaluate_batch(columns), compiled) / 1e6
+        result['batch_rows'] = rows
+        result['batch_ms'] = elapsed * 1000
+        result['batch_rows_per_s'] = rows / elapsed
+    
+    return result
+
+
+def differential(rng: random.Random, count: int, max_depth: int, max_vars: int) -> Dict:
+    """
+    Confronta con la formula non ottimizzata FormulaParser, la valutazione
+    batch (se NumPy è disponibile) e l'interprete bytecode (precisione
+    float del firmware)
+    
+    Alcune variabili valgono 0: l'ottimizzazione non deve trasformare una
+    divisione per zero in un risultato finito.
+    
+    Il constant folding può cambiare l'ultimo bit di un risultato
+    intermedio, e round() su un valore esattamente a metà lo amplifica: una
+    discrepanza con la formula originale che sparisce spostando gli input
+    di 1 ulp è riportata come instabile e non fa fallire.
+    
+    La valutazione batch usa lo stesso albero ottimizzato della valutazione
+    scalare, quindi viene confrontata con questa (senza margine per le
+    instabilità); non solleva errori: nan equivale a un errore.
+    
+    Returns:
+        Dizionario con numero di controlli e discrepanze
+    """
+    parser = FormulaParser()
+    unoptimized = FormulaParser(optimize=False)
+    mismatches = []
+    unstable = []
+    
+    def outcome(evaluate):
+        try:
+            return evaluate()
+        except ValueError:
+            return None
+    
+    def batch(formula, valori):
+        value = float(parser.evaluate_batch(formula, valori)[0])
+        if math.isnan(value):
+            raise ValueError("Risultato nan")
+        return value
+    
+    def matches(expected, got, rel_tol):
+        if expected is None or got is None:
+            return expected is None and got is None
+        return math.isclose(got, expected, rel_tol=rel_tol, abs_tol=TOLLERANZA)
+    
+    def firmware_reference(formula, valori32):
+        # Risultato finito arrotondato a float, come nel firmware
+        value = to_float32(unoptimized.evaluate(formula, valori32))
+        if not math.isfinite(value):
+            raise ValueError("Risultato non finito")
+        return value
+    
+    def record(target, formula, valori, name, expected, got):
+        target.append({
+            'formula': formula,
+            'valori': valori,
+            'evaluator': name,
+            'expected': expected,
+            'got': got,
+        })
+    
+    for _ in range(count):
+        variables = NOMI_VARIABILI[:rng.randint(1, max_vars)]
+        formula = random_formula(rng, rng.randint(1, max_depth), variables)
+        valori = random_values(rng, variables, zero_probability=0.1)
+        
+        # Bytecode: riferimento calcolato sugli stessi input float del firmware
+        valori32 = {name: to_float32(value) for name, value in valori.items()}
+        # (riferimento, input, tolleranza, risultato, instabilità ammessa)
+        candidates = {
+            'ottimizzata': (unoptimized.evaluate, valori, TOLLERANZA,
+                            outcome(lambda: parser.evaluate(formula, valori)), True),
+            'bytecode': (firmware_reference, valori32, TOLLERANZA_FLOAT32,
+                         outcome(lambda: run_bytecode(compile_bytecode(formula, parser), valori)),
+                         True),
+        }
+        if HAS_NUMPY:
+            candidates['batch'] = (parser.evaluate, valori, TOLLERANZA,
+                                   outcome(lambda: batch(formula, valori)), False)
+        
+        for name, (evaluate, inputs, rel_tol, got, tolerate) in candidates.items():
+            expected = outcome(lambda: evaluate(formula, inputs))
+            if matches(expected, got, rel_tol):
+                continue
+            nudged = (
+                {k: math.nextafter(v, direction) for k, v in inputs.items()}
+                for direction in (-math.inf, math.inf)
+            )
+            if tolerate and any(matches(outcome(lambda: evaluate(formula, n)), got, rel_tol)
+                                for n in nudged):
+                record(unstable, formula, valori, name, expected, got)
+            else:
+                record(mismatches, formula, valori, name, expected, got)
+    
+    return {
+        'checked': count,
+        'tolerance': TOLLERANZA,
+        'tolerance_float32': TOLLERANZA_FLOAT32,
+        'mismatches': mismatches,
+        'unstable': unstable,
+    }
+
+
+def compare(current: List[Dict], previous_path: str) -> List[str]:
+    """Confronta i tempi con un file di risultati precedente"""
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {(r['depth'], r['variables']): r for r in json.load(f)['results']}
+    
+    regressions = []
+    for result in current:
+        old = previous.get((result['depth'], result['variables']))
+        if not old or old['formulas'] != result['formulas']:
+            continue
+        for key in ('parse_us', 'compile_us', 'evaluate_us', 'bytecode_us', 'batch_ms'):
+            if key in result and key in old and old[key] > 0:
+                change = result[key] / old[key] - 1
+                if change > SOGLIA_REGRESSIONE:
+                    regressions.append(
+                        f"depth={result['depth']} vars={result['variables']} {key}: "
+                        f"{old[key]:.2f} -> {result[key]:.2f} (+{change:.0%})"
+                    )
+    return regressions
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(x) for x in text.split(',') if x.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--depths', type=_int_list, default=[1, 2, 4, 6, 8])
+    arg_parser.add_argument('--variables', type=_int_list, default=[1, 4, 12])
+    arg_parser.add_argument('--formulas', type=int, default=50,
+                            help="formule per caso")
+    arg_parser.add_argument('--repeat', type=int, default=50,
+                            help="ripetizioni della valutazione singola")
+    arg_parser.add_argument('--rows', type=int, default=100_000,
+                            help="righe per la valutazione batch (0 = salta)")
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--differential', type=int, default=0, metavar='N',
+                            help="esegue N confronti differenziali")
+    arg_parser.add_argument('--output', help="file JSON dei risultati")
+    arg_parser.add_argument('--compare', help="file JSON di una release precedente")
+    arg_parser.add_argument('--label', default='', help="etichetta (es: versione)")
+    args = arg_parser.parse_args(argv)
+    
+    results = []
+    
+    print(f"{'prof':>4} {'var':>4} {'parse':>9} {'compile':>9} {'eval':>8} "
+          f"{'bytecode':>9} {'batch':>9}")
+    for depth in args.depths:
+        for n_vars in args.variables:
+            r = bench_case(args.seed, depth, n_vars, args.formulas, args.rows, args.repeat)
+            results.append(r)
+            batch = f"{r['batch_ms']:7.2f}ms" if 'batch_ms' in r else f"{'-':>9}"
+            print(f"{depth:>4} {n_vars:>4} {r['parse_us']:7.1f}µs {r['compile_us']:7.1f}µs "
+                  f"{r['evaluate_us']:6.2f}µs {r['bytecode_us']:7.2f}µs {batch}")
+    
+    report = {
+        'label': args.label,
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__ if HAS_NUMPY else None,
+        'seed': args.seed,
+        'results': results,
+    }
+    
+    exit_code = 0
+    
+    if args.differential:
+        diff = differential(random.Random(args.seed), args.differential,
+                            max(args.depths), max(args.variables))
+        report['differential'] = diff
+        print(f"Differenziale: {diff['checked']} formule, "
+              f"{len(diff['mismatches'])} discrepanze ottimizzata/batch/bytecode "
+              f"(tolleranza {TOLLERANZA}, float {TOLLERANZA_FLOAT32:.1e}), "
+              f"{len(diff['unstable'])} instabili (informative)")
+        for m in diff['mismatches'][:10]:
+            print(f"  {m['evaluator']}: {m['formula']} -> {m['got']} (atteso {m['expected']})")
+        if diff['mismatches']:
+            exit_code = 1
+    
+    if args.compare:
+        regressions = compare(results, args.compare)
+        report['regressions'] = regressions
+        for line in regressions:
+            print(f"REGRESSIONE {line}")
+        if regressions:
+            exit_code = 1
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Risultati salvati in {args.output}")
+    
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
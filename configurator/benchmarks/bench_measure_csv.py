@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark import CSV delle misure
+
+Confronta import_measures_csv (csv.DictReader, una stringa per campo)
+seguito dalla conversione valore per valore di timestamp e misure, con
+l'import tipizzato per colonne (read_measures_csv_columns) su un export
+sintetico nel formato del firmware e nel formato italiano (';' e
+virgola decimale).
+
+Uso:
+    python benchmarks/bench_measure_csv.py [--rows N]
+"""
+
+import sys
+import os
+import csv
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.measure_csv import read_measures_csv_columns, HAS_NUMPY
+
+MODES = ('Calibro', 'Vetri', 'Astine', 'Fermavetri')
+
+
+def write_firmware_csv(path: Path, rows: int, delimiter: str = ',', decimal: str = '.'):
+    """Export sintetico con l'header di storage_export_csv"""
+    rng = random.Random(0)
+    start = datetime(2024, 3, 1, 8, 0, 0)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(delimiter.join(
+            ['Timestamp', 'Mode', 'Value(mm)', 'Value2(mm)', 'Material', 'Profile', 'Notes']
+        ) + '\n')
+        for i in range(rows):
+            value = f"{rng.uniform(10.0, 3000.0):.3f}"
+            value2 = f"{rng.uniform(10.0, 3000.0):.3f}"
+            if decimal == ',':
+                value, value2 = value.replace('.', ','), value2.replace('.', ',')
+            f.write(delimiter.join([
+                (start + timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+                MODES[i % len(MODES)], value, value2, 'PVC', 'P70', '',
+            ]) + '\n')
+
+
+def dictreader_import(path: Path, delimiter: str = ',', decimal: str = '.'):
+    """Percorso DictReader con conversione per valore"""
+    timestamps, modes, values, values2 = [], [], [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f, delimiter=delimiter):
+            timestamps.append(datetime.strptime(row['Timestamp'], "%Y-%m-%d %H:%M:%S"))
+            modes.append(row['Mode'].lower())
+            value, value2 = row['Value(mm)'], row['Value2(mm)']
+            if decimal == ',':
+                value, value2 = value.replace(',', '.'), value2.replace(',', '.')
+            values.append(float(value))
+            values2.append(float(value2))
+    return values
+
+
+def measure(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=500_000)
+    args = arg_parser.parse_args()
+    
+    if not HAS_NUMPY:
+        print("NumPy non disponibile: import tipizzato non supportato")
+        return 1
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, delimiter, decimal in (('firmware', ',', '.'), ('italiano', ';', ',')):
+            path = Path(tmpdir) / f"{label}.csv"
+            write_firmware_csv(path, args.rows, delimiter, decimal)
+            
+            # Verifica coerenza risultati prima di misurare
+            columns = read_measures_csv_columns(path)
+            assert columns['value'].tolist() == dictreader_import(path, delimiter, decimal)
+            
+            before = measure(dictreader_import, path, delimiter, decimal)
+            after = measure(read_measures_csv_columns, path)
+            print(f"CSV {label} ({args.rows:,} righe, {path.stat().st_size / 1e6:.1f} MB)")
+            print(f"  DictReader + conversione: {before:8.2f} s ({args.rows / before:>12,.0f} righe/s)")
+            print(f"  Colonne tipizzate:        {after:8.2f} s ({args.rows / after:>12,.0f} righe/s)")
+            print(f"  Speedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
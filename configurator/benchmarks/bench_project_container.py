@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark apertura progetti (.mdp)
+
+Confronta l'apertura di un progetto JSON unico (json.load e decodifica di
+tutte le sezioni) con il formato contenitore (lettura del TOC e
+decodifica della sola sezione usata) su un catalogo sintetico con molte
+tipologie, astine e fermavetri.
+
+Gli elementi sono decodificati in dataclass locali con la stessa forma
+di quelle di config_model (dict annidati -> oggetti).
+
+Uso:
+    python benchmarks/bench_project_container.py [--items N]
+"""
+
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.project_container import ProjectContainer, LazySection, write_container
+
+
+@dataclass
+class Variabile:
+    nome: str
+    descrizione: str = ""
+    unita: str = "mm"
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Variabile':
+        return cls(**data)
+
+
+@dataclass
+class Elemento:
+    id: str
+    formula: str
+    params: Dict = field(default_factory=dict)
+    variabili: List[Variabile] = field(default_factory=list)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Elemento':
+        return cls(
+            id=data['id'],
+            formula=data['formula'],
+            params=data.get('params', {}),
+            variabili=[Variabile.from_dict(v) for v in data.get('variabili', [])],
+        )
+
+
+def make_catalog(items: int) -> Dict[str, list]:
+    """Sezioni sintetiche: ogni elemento ha variabili annidate"""
+    def element(section: str, i: int) -> Dict:
+        return {
+            'id': f"{section}_{i}",
+            'formula': f"L - {i % 50} * 2 + H / 3",
+            'params': {'materiale': 'Alluminio', 'spessore': i % 7},
+            'variabili': [{'nome': f"v{j}", 'descrizione': f"Variabile {j}", 'unita': 'mm'}
+                          for j in range(6)],
+        }
+    
+    return {
+        name: [element(name, i) for i in range(items)]
+        for name in ('menus', 'tipologie', 'astine', 'fermavetri', 'modes')
+    }
+
+
+def open_json(path: Path) -> list:
+    """Percorso JSON unico: tutte le sezioni decodificate all'apertura"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    sections = {name: [Elemento.from_dict(e) for e in data[name]]
+                for name in ('menus', 'tipologie', 'astine', 'fermavetri', 'modes')}
+    return sections['tipologie']
+
+
+def open_container(path: Path) -> list:
+    """Formato contenitore: TOC all'apertura, poi solo la sezione usata"""
+    container = ProjectContainer(path)
+    sections = {name: LazySection(container, name, Elemento.from_dict)
+                for name in ('menus', 'tipologie', 'astine', 'fermavetri', 'modes')}
+    return list(sections['tipologie'])
+
+
+def measure(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--items', type=int, default=20_000,
+                            help="Elementi per sezione")
+    args = arg_parser.parse_args()
+    
+    catalog = make_catalog(args.items)
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        json_path = Path(tmpdir) / "catalogo_json.mdp"
+        container_path = Path(tmpdir) / "catalogo.mdp"
+        
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'nome': 'Catalogo', **catalog}, f, indent=2, ensure_ascii=False)
+        write_container(container_path, {'nome': 'Catalogo'}, catalog)
+        
+        # Verifica coerenza risultati prima di misurare
+        assert open_json(json_path) == open_container(container_path)
+        
+        before = measure(open_json, json_path)
+        after = measure(open_container, container_path)
+        toc_only = measure(ProjectContainer, container_path)
+        
+        print(f"Progetto: 5 sezioni x {args.items:,} elementi")
+        print(f"  JSON unico:   {json_path.stat().st_size / 1e6:6.1f} MB")
+        print(f"  Contenitore:  {container_path.stat().st_size / 1e6:6.1f} MB")
+        print(f"  Apertura JSON + decodifica completa:  {before * 1000:8.1f} ms")
+        print(f"  Contenitore, apertura (solo TOC):     {toc_only * 1000:8.1f} ms")
+        print(f"  Contenitore, apertura + tipologie:    {after * 1000:8.1f} ms")
+        print(f"  Speedup: {before / after:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
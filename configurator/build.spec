@@ -24,7 +24,6 @@ hiddenimports = [
     'serial.tools',
     'serial.tools.list_ports',
     'requests',
-    'pyparsing',
 ]
 
 a = Analysis(
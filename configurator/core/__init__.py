@@ -12,6 +12,14 @@ from .config_model import (
     ProgettoConfigurazione
 )
 from .formula_parser import FormulaParser
+from .formula_graph import FormulaGraph
+from .formula_bytecode import FormulaBytecode, compile_bytecode, run_bytecode
+from .measure_store import MeasureStore
+from .measure_stats import RunningStats, GroupedStats
+from .measure_journal import MeasureJournal
+from .measure_archive import SessionArchiver
+from .measure_index import MeasureIndex
+from .job_runner import JobRunner
 from .project_manager import ProjectManager
 from .esp_uploader import ESPUploader
 from .icon_browser import IconifyClient, IconInfo
@@ -26,6 +34,17 @@ __all__ = [
     'FermavetroConfig',
     'ProgettoConfigurazione',
     'FormulaParser',
+    'FormulaGraph',
+    'FormulaBytecode',
+    'compile_bytecode',
+    'run_bytecode',
+    'MeasureStore',
+    'RunningStats',
+    'GroupedStats',
+    'MeasureJournal',
+    'SessionArchiver',
+    'MeasureIndex',
+    'JobRunner',
     'ProjectManager',
     'ESPUploader',
     'IconifyClient',
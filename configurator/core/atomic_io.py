@@ -0,0 +1,192 @@
+"""
+Scritture atomiche con backup a rotazione
+
+atomic_write scrive in un file temporaneo nella stessa cartella, esegue
+fsync e lo sostituisce alla destinazione con os.replace (atomico), poi
+esegue fsync della cartella: dopo un crash il file è la versione
+precedente o quella nuova, mai un file troncato.
+
+Il backup della versione precedente è un hardlink al file esistente
+(nessuna copia dei dati: os.replace sostituisce solo la voce di
+cartella, il vecchio contenuto resta raggiungibile dal link). Dove gli
+hardlink non sono supportati (es: FAT32, alcune share di rete) il backup
+è una copia. Vengono conservati gli ultimi N backup:
+
+    config.json
+    config.backup_20241209_120000.json
+    config.backup_20241209_113000.json
+"""
+
+import os
+import json
+import uuid
+import shutil
+from pathlib import Path
+from datetime import datetime
+from typing import Any, List, Optional, Tuple, Union
+
+BACKUP_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+DEFAULT_KEEP_BACKUPS = 5
+
+
+def fsync_directory(directory: Path):
+    """Rende persistente su disco la voce di cartella (no-op su Windows)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _backup_order(path: Path, backup_path: Path) -> Tuple[str, int]:
+    """(timestamp, contatore) di <nome>.backup_<timestamp>[_<contatore>]<suffisso>"""
+    start = len(path.stem) + len('.backup_')
+    parts = backup_path.name[start:len(backup_path.name) - len(path.suffix)].split('_')
+    counter = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 0
+    return '_'.join(parts[:2]), counter
+
+
+def list_backups(path: Path) -> List[Path]:
+    """
+    Backup di un file, dal più recente
+    
+    Args:
+        path: File originale (es: config.json)
+    
+    Returns:
+        Lista di path config.backup_<timestamp>[_n].json
+    """
+    path = Path(path)
+    if not path.parent.is_dir():
+        return []
+    backups = path.parent.glob(f"{path.stem}.backup_*{path.suffix}")
+    return sorted(backups, key=lambda b: _backup_order(path, b), reverse=True)
+
+
+def create_backup(path: Path, keep: int = DEFAULT_KEEP_BACKUPS) -> Optional[Path]:
+    """
+    Crea il backup del file esistente ed elimina quelli oltre `keep`
+    
+    Args:
+        path: File da salvare
+        keep: Numero di backup da conservare
+    
+    Returns:
+        Path del backup, o None se il file non esiste
+    
+    Raises:
+        OSError: Se il backup non può essere creato
+    """
+    backup_path = _link_backup(Path(path))
+    if backup_path is not None:
+        prune_backups(path, keep)
+    return backup_path
+
+
+def _link_backup(path: Path) -> Optional[Path]:
+    """Hardlink (o copia) del file esistente con il nome del nuovo backup"""
+    if not path.exists():
+        return None
+    
+    timestamp = datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT)
+    name = f"{path.stem}.backup_{timestamp}"
+    
+    # Più backup nello stesso secondo: contatore successivo al più recente
+    # (non al primo libero, che può essere stato eliminato dal pruning)
+    backups = list_backups(path)
+    if backups and _backup_order(path, backups[0])[0] == timestamp:
+        name += f"_{_backup_order(path, backups[0])[1] + 1}"
+    backup_path = path.with_name(name + path.suffix)
+    
+    try:
+        os.link(path, backup_path)
+    except OSError:
+        shutil.copy2(path, backup_path)
+    return backup_path
+
+
+def prune_backups(path: Path, keep: int = DEFAULT_KEEP_BACKUPS) -> int:
+    """
+    Elimina i backup più vecchi oltre i `keep` più recenti
+    
+    Returns:
+        Numero di backup eliminati
+    """
+    removed = 0
+    for backup_path in list_backups(path)[max(keep, 0):]:
+        try:
+            backup_path.unlink()
+            removed += 1
+        except OSError as e:
+            print(f"Impossibile eliminare backup {backup_path}: {e}")
+    return removed
+
+
+def atomic_write(path: Path, data: Union[str, bytes], backup: bool = False,
+                 keep_backups: int = DEFAULT_KEEP_BACKUPS,
+                 encoding: str = 'utf-8') -> Optional[Path]:
+    """
+    Scrive un file in modo atomico
+    
+    Args:
+        path: File di destinazione
+        data: Contenuto (str viene codificata con encoding)
+        backup: Se True, conserva la versione precedente come backup
+        keep_backups: Numero di backup da conservare
+        encoding: Codifica per contenuto str
+    
+    Returns:
+        Path del backup creato (None se nessun backup)
+    
+    Raises:
+        OSError: Se la scrittura non riesce (la destinazione resta invariata)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    
+    # Nome univoco: più scritture concorrenti sullo stesso file non si sovrappongono
+    tmp_name = str(path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp"))
+    fd = os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            shutil.copymode(path, tmp_name)
+        
+        # Il link va creato prima del replace (punta al contenuto precedente);
+        # se il replace fallisce viene rimosso, i vecchi backup restano intatti
+        backup_path = _link_backup(path) if backup else None
+        try:
+            os.replace(tmp_name, path)
+        except BaseException:
+            if backup_path is not None:
+                backup_path.unlink(missing_ok=True)
+            raise
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    
+    fsync_directory(path.parent)
+    if backup_path is not None:
+        prune_backups(path, keep_backups)
+    return backup_path
+
+
+def atomic_write_json(path: Path, data: Any, backup: bool = False,
+                      keep_backups: int = DEFAULT_KEEP_BACKUPS,
+                      indent: Optional[int] = 2) -> Optional[Path]:
+    """
+    Scrive un oggetto JSON in modo atomico (vedi atomic_write)
+    
+    Returns:
+        Path del backup creato (None se nessun backup)
+    """
+    text = json.dumps(data, indent=indent, ensure_ascii=False)
+    return atomic_write(path, text, backup=backup, keep_backups=keep_backups)
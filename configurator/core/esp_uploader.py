@@ -8,6 +8,9 @@ import json
 import time
 from typing import List, Tuple, Dict, Callable, Optional
 from .config_model import ProgettoConfigurazione
+from .formula_parser import get_formula_parser
+from .formula_bytecode import compile_bytecode
+from .formula_graph import FormulaGraph
 
 
 class ESPUploader:
@@ -31,6 +34,7 @@ class ESPUploader:
     def __init__(self):
         self.serial_port: Optional[serial.Serial] = None
         self.connected: bool = False
+        self.formula_parser = get_formula_parser()
     
     def find_devices(self) -> List[Tuple[str, str]]:
         """
@@ -122,6 +126,73 @@ class ESPUploader:
             print(f"Errore invio dati: {e}")
             return False
     
+    def _optimize_formula(self, formula: str) -> str:
+        """Ottimizza una formula per il dispositivo (invariata se non valida)"""
+        try:
+            return self.formula_parser.optimize(formula)
+        except ValueError:
+            return formula
+    
+    def _formula_bytecode(self, formula: str) -> Optional[Dict]:
+        """Bytecode della formula per il firmware (None se non compilabile)"""
+        try:
+            return compile_bytecode(formula, self.formula_parser).to_dict()
+        except (ValueError, OverflowError):
+            return None
+    
+    def _inline_formule(self, formule: Dict[str, str]) -> Dict[str, str]:
+        """Formule senza riferimenti ad altri risultati (invariate se il grafo non è valido)"""
+        try:
+            return FormulaGraph(formule, self.formula_parser).inline()
+        except ValueError:
+            return dict(formule)
+    
+    def _prepare_payload(self, config: ProgettoConfigurazione) -> Dict:
+        """
+        Prepara il dizionario da inviare al dispositivo
+        
+        Le formule di tipologie e modalità vengono ottimizzate
+        (costanti pre-calcolate) e accompagnate dal bytecode postfix,
+        così il firmware può valutarle senza ri-analizzare il testo
+        a ogni misura. Il testo resta come riferimento e fallback.
+        
+        Il firmware valuta ogni formula di una modalità da sola, senza
+        ordine topologico: le formule che usano altri risultati del grafo
+        (MeasureMode.formule) vengono inviate con quei risultati sostituiti
+        dalle loro formule, così testo e bytecode usano solo le variabili
+        misurate.
+        
+        Args:
+            config: Configurazione da caricare
+            
+        Returns:
+            Dizionario serializzabile in JSON
+        """
+        data = config.to_dict()
+        
+        for tipologia in data.get('tipologie', []):
+            for elemento in tipologia.get('elementi', []):
+                if elemento.get('formula'):
+                    elemento['formula'] = self._optimize_formula(elemento['formula'])
+                    bytecode = self._formula_bytecode(elemento['formula'])
+                    if bytecode:
+                        elemento['bytecode'] = bytecode
+        
+        for mode in data.get('modes', []):
+            formule = mode.get('formule') if isinstance(mode, dict) else None
+            if isinstance(formule, dict):
+                mode['formule'] = {
+                    nome: self._optimize_formula(formula)
+                    for nome, formula in self._inline_formule(formule).items()
+                }
+                bytecode = {
+                    nome: self._formula_bytecode(formula)
+                    for nome, formula in mode['formule'].items()
+                }
+                mode['formule_bytecode'] = {k: v for k, v in bytecode.items() if v}
+        
+        return data
+    
     def upload_config(self, config: ProgettoConfigurazione, 
                      progress_callback: Optional[Callable[[int], None]] = None) -> bool:
         """
@@ -149,7 +220,8 @@ class ESPUploader:
             if progress_callback:
                 progress_callback(20)
             
-            config_json = json.dumps(config.to_dict(), ensure_ascii=False)
+            config_json = json.dumps(self._prepare_payload(config), ensure_ascii=False,
+                                     separators=(',', ':'))
             
             # 3. Invia dati a blocchi
             total_bytes = len(config_json)
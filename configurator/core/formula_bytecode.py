@@ -0,0 +1,310 @@
+"""
+Bytecode postfix delle formule per il firmware ESP32.
+
+Ogni formula viene compilata (dopo l'ottimizzazione) in un programma
+a stack che il firmware esegue senza dover ri-analizzare il testo a
+ogni misura. Questo modulo contiene anche l'interprete Python di
+riferimento, usato per i test di conformità: come il firmware riceve
+le variabili come float (32 bit), calcola in double e restituisce un
+float (formula_bytecode_evaluate in firmware/main/formula_parser.h).
+
+Formato del programma (little-endian):
+    
+    byte 0      versione formato (BYTECODE_VERSION)
+    byte 1      numero costanti (N)
+    byte 2      numero variabili (slot)
+    byte 3      profondità massima dello stack
+    N x 8 byte  pool costanti (double IEEE 754)
+    resto       istruzioni: opcode (1 byte) + eventuale operando (1 byte)
+
+Le variabili sono referenziate per indice di slot: l'ordine degli slot
+è quello della lista 'vars' che accompagna il programma.
+"""
+
+import ast
+import base64
+import math
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, List, Union
+
+from .formula_parser import FormulaParser, CompiledFormula, get_formula_parser
+
+
+BYTECODE_VERSION = 1
+
+# Profondità massima dello stack dell'interprete firmware
+# (FORMULA_BYTECODE_MAX_STACK in firmware/main/formula_parser.h)
+BYTECODE_MAX_STACK = 32
+
+# Opcode con operando (1 byte)
+OP_CONST = 0x01      # push costanti[operando]
+OP_VAR = 0x02        # push slot[operando]
+OP_MIN = 0x23        # min degli ultimi <operando> valori
+OP_MAX = 0x24        # max degli ultimi <operando> valori
+
+# Opcode senza operando
+OP_ADD = 0x10
+OP_SUB = 0x11
+OP_MUL = 0x12
+OP_DIV = 0x13
+OP_NEG = 0x14
+OP_ROUND = 0x20      # arrotondamento all'intero (metà al pari, come round())
+OP_ROUND_N = 0x21    # round(valore, cifre)
+OP_ABS = 0x22
+
+OPCODES_CON_OPERANDO = {OP_CONST, OP_VAR, OP_MIN, OP_MAX}
+
+_BINARI = {ast.Add: OP_ADD, ast.Sub: OP_SUB, ast.Mult: OP_MUL, ast.Div: OP_DIV}
+
+_HEADER = struct.Struct('<BBBB')
+
+_FLOAT32 = struct.Struct('<f')
+
+
+@dataclass
+class FormulaBytecode:
+    """Programma postfix compilato da una formula"""
+    code: bytes
+    constants: List[float] = field(default_factory=list)
+    variables: List[str] = field(default_factory=list)
+    stack_size: int = 0
+    
+    def to_bytes(self) -> bytes:
+        """Serializza header, pool costanti e istruzioni"""
+        header = _HEADER.pack(BYTECODE_VERSION, len(self.constants),
+                              len(self.variables), self.stack_size)
+        consts = struct.pack(f'<{len(self.constants)}d', *self.constants)
+        return header + consts + self.code
+    
+    @classmethod
+    def from_bytes(cls, data: bytes, variables: List[str]) -> 'FormulaBytecode':
+        """Deserializza un programma (la lista variabili viaggia a parte)"""
+        if len(data) < _HEADER.size:
+            raise ValueError("Bytecode troncato")
+        
+        version, n_consts, n_vars, stack_size = _HEADER.unpack_from(data)
+        if version != BYTECODE_VERSION:
+            raise ValueError(f"Versione bytecode non supportata: {version}")
+        if n_vars != len(variables):
+            raise ValueError("Numero variabili non coerente con il bytecode")
+        if stack_size > BYTECODE_MAX_STACK:
+            raise ValueError(f"Stack bytecode oltre il limite: {stack_size}")
+        
+        consts_end = _HEADER.size + 8 * n_consts
+        if len(data) < consts_end:
+            raise ValueError("Bytecode troncato")
+        
+        constants = list(struct.unpack_from(f'<{n_consts}d', data, _HEADER.size))
+        return cls(
+            code=bytes(data[consts_end:]),
+            constants=constants,
+            variables=list(variables),
+            stack_size=stack_size
+        )
+    
+    def to_dict(self) -> Dict:
+        return {
+            'vars': self.variables,
+            'program': base64.b64encode(self.to_bytes()).decode('ascii')
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'FormulaBytecode':
+        return cls.from_bytes(base64.b64decode(data['program']), data.get('vars', []))
+
+
+class _Compiler:
+    """Genera le istruzioni postfix da un AST validato"""
+    
+    def __init__(self):
+        self.code = bytearray()
+        self.constants: List[float] = []
+        self.variables: List[str] = []
+        self.depth = 0
+        self.max_depth = 0
+    
+    def _push(self, count: int = 1):
+        self.depth += count
+        self.max_depth = max(self.max_depth, self.depth)
+    
+    def _emit(self, opcode: int, operand: int = None, pops: int = 0, pushes: int = 0):
+        self.code.append(opcode)
+        if operand is not None:
+            if operand > 0xFF:
+                raise ValueError("Formula troppo grande per il bytecode")
+            self.code.append(operand)
+        self.depth -= pops
+        self._push(pushes)
+    
+    def _slot(self, table: List, value) -> int:
+        # Costanti e variabili ripetute condividono lo stesso slot
+        if value in table:
+            return table.index(value)
+        table.append(value)
+        return len(table) - 1
+    
+    def visit(self, node: ast.AST):
+        if isinstance(node, ast.Constant):
+            self._emit(OP_CONST, self._slot(self.constants, float(node.value)), pushes=1)
+        
+        elif isinstance(node, ast.Name):
+            self._emit(OP_VAR, self._slot(self.variables, node.id), pushes=1)
+        
+        elif isinstance(node, ast.UnaryOp):
+            self.visit(node.operand)
+            if isinstance(node.op, ast.USub):
+                self._emit(OP_NEG, pops=1, pushes=1)
+        
+        elif isinstance(node, ast.BinOp):
+            self.visit(node.left)
+            self.visit(node.right)
+            self._emit(_BINARI[type(node.op)], pops=2, pushes=1)
+        
+        else:
+            # ast.Call (già validato)
+            for arg in node.args:
+                self.visit(arg)
+            name = node.func.id
+            nargs = len(node.args)
+            if name == 'round':
+                self._emit(OP_ROUND if nargs == 1 else OP_ROUND_N, pops=nargs, pushes=1)
+            elif name == 'abs':
+                self._emit(OP_ABS, pops=1, pushes=1)
+            else:
+                self._emit(OP_MIN if name == 'min' else OP_MAX, nargs, pops=nargs, pushes=1)
+
+
+def compile_bytecode(formula: Union[str, CompiledFormula],
+                     parser: FormulaParser = None) -> FormulaBytecode:
+    """
+    Compila una formula in bytecode postfix
+    
+    Args:
+        formula: Testo formula o formula già compilata
+        parser: Parser da usare per compilare il testo. Se None, usa quello condiviso.
+    
+    Returns:
+        Programma bytecode
+    
+    Raises:
+        ValueError: Se la formula non è valida o supera i limiti del formato
+    """
+    if not isinstance(formula, CompiledFormula):
+        formula = (parser or get_formula_parser()).compile(formula)
+    
+    compiler = _Compiler()
+    compiler.visit(formula.tree.body)
+    
+    if len(compiler.constants) > 0xFF or len(compiler.variables) > 0xFF:
+        raise ValueError("Formula troppo grande per il bytecode")
+    if compiler.max_depth > BYTECODE_MAX_STACK:
+        raise ValueError(
+            f"Formula troppo complessa per il bytecode "
+            f"(stack {compiler.max_depth} > {BYTECODE_MAX_STACK})"
+        )
+    
+    return FormulaBytecode(
+        code=bytes(compiler.code),
+        constants=compiler.constants,
+        variables=compiler.variables,
+        stack_size=compiler.max_depth
+    )
+
+
+def to_float32(value: float) -> float:
+    """
+    Arrotonda un valore alla precisione float (32 bit) del firmware
+    
+    Raises:
+        ValueError: Se il valore (finito) non è rappresentabile come float
+    """
+    try:
+        return _FLOAT32.unpack(_FLOAT32.pack(value))[0]
+    except OverflowError:
+        raise ValueError(f"Valore fuori dall'intervallo float: {value}")
+
+
+def run_bytecode(bytecode: FormulaBytecode, valori: Dict[str, float]) -> float:
+    """
+    Interprete di riferimento del bytecode (stesso comportamento del firmware)
+    
+    Le variabili vengono arrotondate a float come negli slot del firmware,
+    lo stack e le costanti sono double e il risultato viene restituito come
+    float: rispetto a FormulaParser.evaluate può differire di un
+    arrotondamento float (e di più se gli input non sono rappresentabili).
+    
+    Args:
+        bytecode: Programma da eseguire
+        valori: Dizionario nome_variabile -> valore
+    
+    Returns:
+        Risultato numerico (valore float a 32 bit)
+    
+    Raises:
+        ValueError: Se mancano variabili, il programma non è valido
+                    o la valutazione fallisce (es: divisione per zero,
+                    risultato non finito o fuori dall'intervallo float)
+    """
+    missing = [v for v in bytecode.variables if v not in valori]
+    if missing:
+        raise ValueError(f"Valori mancanti per: {', '.join(missing)}")
+    
+    slots = [to_float32(float(valori[v])) for v in bytecode.variables]
+    constants = bytecode.constants
+    code = bytecode.code
+    stack: List[float] = []
+    pc = 0
+    
+    try:
+        while pc < len(code):
+            op = code[pc]
+            pc += 1
+            
+            if op in OPCODES_CON_OPERANDO:
+                arg = code[pc]
+                pc += 1
+                if op == OP_CONST:
+                    stack.append(constants[arg])
+                elif op == OP_VAR:
+                    stack.append(slots[arg])
+                else:
+                    values = stack[-arg:]
+                    del stack[-arg:]
+                    stack.append(min(values) if op == OP_MIN else max(values))
+            
+            elif op == OP_NEG:
+                stack.append(-stack.pop())
+            elif op == OP_ABS:
+                stack.append(abs(stack.pop()))
+            elif op == OP_ROUND:
+                stack.append(float(round(stack.pop())))
+            elif op == OP_ROUND_N:
+                digits = stack.pop()
+                if not float(digits).is_integer():
+                    raise ValueError("round(): numero di cifre non intero")
+                stack.append(float(round(stack.pop(), int(digits))))
+            
+            else:
+                right = stack.pop()
+                left = stack.pop()
+                if op == OP_ADD:
+                    stack.append(left + right)
+                elif op == OP_SUB:
+                    stack.append(left - right)
+                elif op == OP_MUL:
+                    stack.append(left * right)
+                elif op == OP_DIV:
+                    stack.append(left / right)
+                else:
+                    raise ValueError(f"Opcode non valido: 0x{op:02x}")
+    
+    except (IndexError, ArithmeticError) as e:
+        raise ValueError(f"Errore nella valutazione: {e}")
+    
+    if len(stack) != 1:
+        raise ValueError("Bytecode non valido: stack finale inconsistente")
+    if not math.isfinite(stack[0]):
+        raise ValueError("Risultato non finito")
+    
+    return to_float32(float(stack[0]))
@@ -0,0 +1,50 @@
+"""
+Generatore di formule casuali valide
+
+Usato dai fuzz test (tests/test_formula_*.py) e dalla suite di benchmark
+(benchmarks/bench_formula_suite.py): le formule coprono tutti i costrutti
+accettati da FormulaParser e dal bytecode del firmware (operatori, meno
+unario, round con e senza cifre, abs, min e max).
+"""
+
+import random
+from typing import Sequence
+
+
+# Variabili dei template di rilievo più comuni
+VARIABILI_DEFAULT = ("L", "H", "B", "S")
+
+
+def random_formula(rng: random.Random, depth: int,
+                   variables: Sequence[str] = VARIABILI_DEFAULT) -> str:
+    """
+    Genera una formula casuale valida
+    
+    Args:
+        rng: Generatore casuale
+        depth: Profondità massima dell'espressione
+        variables: Variabili utilizzabili
+    
+    Returns:
+        Testo della formula
+    """
+    if depth <= 0:
+        if rng.random() < 0.7:
+            return rng.choice(variables)
+        return str(round(rng.uniform(0.5, 100), rng.randint(0, 3)))
+    
+    choice = rng.random()
+    if choice < 0.65:
+        op = rng.choice(["+", "-", "*", "/"])
+        left = random_formula(rng, depth - 1, variables)
+        right = random_formula(rng, rng.randint(0, depth - 1), variables)
+        return f"({left} {op} {right})"
+    if choice < 0.75:
+        return f"-{random_formula(rng, depth - 1, variables)}"
+    if choice < 0.85:
+        return f"round({random_formula(rng, depth - 1, variables)}, {rng.randint(0, 3)})"
+    
+    func = rng.choice(["round", "abs", "min", "max"])
+    nargs = 1 if func in ("round", "abs") else rng.randint(2, 3)
+    args = ", ".join(random_formula(rng, depth - 1, variables) for _ in range(nargs))
+    return f"{func}({args})"
@@ -0,0 +1,180 @@
+"""
+Grafo delle dipendenze tra formule di una modalità di misura.
+Permette a una formula di usare i risultati di altre formule e ricalcola
+solo i risultati influenzati dalla variabile modificata.
+"""
+
+import ast
+import copy
+from typing import Dict, List, Optional, Set
+
+from .formula_parser import FormulaParser, CompiledFormula, get_formula_parser, to_source
+
+
+class FormulaGraph:
+    """Grafo aciclico delle formule {nome_risultato: formula}"""
+    
+    def __init__(self, formule: Dict[str, str], parser: Optional[FormulaParser] = None):
+        """
+        Costruisce il grafo e calcola l'ordine topologico
+        
+        Args:
+            formule: Dizionario nome_risultato -> formula (es: MeasureMode.formule)
+            parser: Parser da usare per la compilazione. Se None, usa quello condiviso.
+        
+        Raises:
+            ValueError: Se una formula non è valida o esiste una dipendenza circolare
+        """
+        self.parser = parser or get_formula_parser()
+        self.formule = dict(formule)
+        
+        self._compiled: Dict[str, CompiledFormula] = {}
+        self._dependencies: Dict[str, List[str]] = {}
+        inputs: Set[str] = set()
+        
+        for nome, formula in self.formule.items():
+            try:
+                compiled = self.parser.compile(formula)
+            except ValueError as e:
+                raise ValueError(f"Formula '{nome}' non valida: {e}")
+            
+            self._compiled[nome] = compiled
+            self._dependencies[nome] = [v for v in compiled.variables if v in self.formule]
+            inputs.update(v for v in compiled.variables if v not in self.formule)
+        
+        self.order = self._topological_order()
+        self.inputs = sorted(inputs)
+        
+        # Per ogni variabile di input: risultati a valle, già in ordine topologico
+        self._downstream = {var: self._affected_by(var) for var in self.inputs}
+        
+        self._values: Dict[str, float] = {}
+        self._evaluated = False
+    
+    def _topological_order(self) -> List[str]:
+        """Ordina i risultati in modo che ognuno segua le sue dipendenze"""
+        order = []
+        state: Dict[str, int] = {}  # 1 = in visita, 2 = completato
+        
+        def visit(nome: str, path: List[str]):
+            if state.get(nome) == 2:
+                return
+            if state.get(nome) == 1:
+                cycle = path[path.index(nome):] + [nome]
+                raise ValueError(f"Dipendenza circolare: {' -> '.join(cycle)}")
+            
+            state[nome] = 1
+            for dep in self._dependencies[nome]:
+                visit(dep, path + [nome])
+            state[nome] = 2
+            order.append(nome)
+        
+        for nome in self.formule:
+            visit(nome, [])
+        
+        return order
+    
+    def _affected_by(self, var: str) -> List[str]:
+        """Risultati da ricalcolare quando cambia una variabile di input"""
+        affected: Set[str] = set()
+        for nome in self.order:
+            used = self._compiled[nome].variables
+            if var in used or any(dep in affected for dep in self._dependencies[nome]):
+                affected.add(nome)
+        return [nome for nome in self.order if nome in affected]
+    
+    def _compute(self, nome: str, values: Dict[str, float]):
+        """Calcola un singolo risultato e lo aggiunge a values"""
+        try:
+            values[nome] = self._compiled[nome].evaluate(values)
+        except ValueError as e:
+            raise ValueError(f"{nome}: {e}")
+    
+    def evaluate(self, valori: Dict[str, float]) -> Dict[str, float]:
+        """
+        Calcola tutti i risultati
+        
+        Args:
+            valori: Dizionario variabile_workflow -> valore
+        
+        Returns:
+            Dizionario nome_risultato -> valore
+        
+        Raises:
+            ValueError: Se un calcolo fallisce (i risultati precedenti restano validi)
+        """
+        values = {k: v for k, v in valori.items() if k not in self.formule}
+        for nome in self.order:
+            self._compute(nome, values)
+        
+        self._values = values
+        self._evaluated = True
+        return self.results()
+    
+    def update(self, valori: Dict[str, float]) -> Dict[str, float]:
+        """
+        Aggiorna alcune variabili e ricalcola solo i risultati a valle
+        
+        Args:
+            valori: Variabili modificate (nome -> nuovo valore)
+        
+        Returns:
+            Dizionario dei soli risultati ricalcolati
+        
+        Raises:
+            ValueError: Se un calcolo fallisce; variabili e risultati restano
+                        quelli precedenti all'aggiornamento
+        """
+        if not self._evaluated:
+            merged = dict(self._values)
+            merged.update(valori)
+            return self.evaluate(merged)
+        
+        changed = [k for k, v in valori.items()
+                   if k not in self.formule and self._values.get(k) != v]
+        
+        if len(changed) == 1:
+            to_update = self._downstream.get(changed[0], [])
+        else:
+            affected = {nome for var in changed for nome in self._downstream.get(var, [])}
+            to_update = [nome for nome in self.order if nome in affected]
+        
+        # Calcolo su una copia: lo stato cambia solo se tutto riesce
+        values = dict(self._values)
+        values.update((k, valori[k]) for k in changed)
+        for nome in to_update:
+            self._compute(nome, values)
+        
+        self._values = values
+        return {nome: values[nome] for nome in to_update}
+    
+    def results(self) -> Dict[str, float]:
+        """Ritorna gli ultimi risultati calcolati (nell'ordine delle formule)"""
+        return {nome: self._values[nome] for nome in self.formule if nome in self._values}
+    
+    def dependents(self, var: str) -> List[str]:
+        """Ritorna i risultati che dipendono (anche indirettamente) da una variabile"""
+        return list(self._downstream.get(var, []))
+    
+    def inline(self) -> Dict[str, str]:
+        """
+        Formule indipendenti: ogni risultato usato come input viene
+        sostituito dalla sua formula (es: per il firmware, che valuta le
+        formule una per una senza ordine topologico)
+        
+        Returns:
+            Dizionario nome_risultato -> formula che usa solo self.inputs
+        """
+        expanded: Dict[str, ast.AST] = {}
+        
+        class _Sostituisci(ast.NodeTransformer):
+            def visit_Name(self, node: ast.Name) -> ast.AST:
+                if node.id in expanded:
+                    return copy.deepcopy(expanded[node.id])
+                return node
+        
+        for nome in self.order:
+            body = copy.deepcopy(self._compiled[nome].tree.body)
+            expanded[nome] = _Sostituisci().visit(body)
+        
+        return {nome: to_source(expanded[nome]) for nome in self.formule}
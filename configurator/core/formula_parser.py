@@ -1,52 +1,822 @@
 """
 Parser e validatore per formule matematiche.
 Supporta variabili, operatori aritmetici e funzioni matematiche base.
+
+Le formule sono analizzate con il modulo ast e ammesse solo se contengono
+elementi consentiti (numeri, variabili, + - * /, meno unario, parentesi,
+round/abs/min/max). L'AST validato viene ottimizzato (constant folding) e
+compilato in closure annidate: nessuna chiamata a eval(), quindi anche
+template non fidati sono sicuri.
 """
 
 import re
+import ast
 import math
-from typing import Tuple, List, Dict, Union, Optional
-from pyparsing import (
-    Word, alphas, alphanums, nums, oneOf, opAssoc,
-    infixNotation, Suppress, ParserElement, ParseException
+import operator
+import threading
+from decimal import Decimal
+from functools import reduce
+from collections import OrderedDict
+from typing import Tuple, List, Dict, Union, Callable, FrozenSet
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+# Funzioni consentite: nome -> (argomenti minimi, argomenti massimi)
+FUNZIONI_CONSENTITE = {
+    'round': (1, 2),
+    'abs': (1, 1),
+    'min': (2, None),
+    'max': (2, None),
+}
+
+# Profondità massima dell'espressione (protezione da formule patologiche)
+MAX_PROFONDITA = 100
+
+_OPERATORI_BINARI = {
+    ast.Add: '+',
+    ast.Sub: '-',
+    ast.Mult: '*',
+    ast.Div: '/',
+}
+
+
+class _Operazioni:
+    """Tabella delle operazioni usate dalle closure compilate"""
+    
+    def __init__(self, binari: Dict[type, Callable], neg: Callable,
+                 funzioni: Dict[str, Callable], const: Callable = None):
+        self.binari = binari
+        self.neg = neg
+        self.funzioni = funzioni
+        self.const = const or (lambda value: value)
+
+
+_OPERAZIONI_SCALARI = _Operazioni(
+    binari={
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+    },
+    neg=operator.neg,
+    funzioni={'round': round, 'abs': abs, 'min': min, 'max': max},
 )
 
+# Operazioni per la valutazione vettoriale: funzioni mappate su NumPy
+if HAS_NUMPY:
+    def _batch_div(a, b):
+        # Divisore nullo: nan come risultato della riga (con inf, L / (H / 0)
+        # darebbe 0 invece dell'errore della valutazione scalare)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(np.equal(b, 0), np.nan, np.true_divide(a, b))
+    
+    def _product_error(a, b, product):
+        # a * b - product, esatto (Dekker, senza FMA)
+        def split(x):
+            c = 134217729.0 * x  # 2^27 + 1
+            hi = c - (c - x)
+            return hi, x - hi
+        a_hi, a_lo = split(a)
+        b_hi, b_lo = split(b)
+        return ((a_hi * b_hi - product) + a_hi * b_lo + a_lo * b_hi) + a_lo * b_lo
+    
+    def _round_rows(values, digits):
+        # round() esatto su un array 1-d: la distanza da metà usa il valore
+        # esatto di values * 10^n (o values / 10^n), metà esatta al pari
+        scale = 10.0 ** abs(digits)  # esatto fino a 10^22
+        with np.errstate(over='ignore', invalid='ignore'):
+            if digits >= 0:
+                scaled = values * scale
+                error = _product_error(values, scale, scaled)
+            else:
+                scaled = values / scale
+                product = scaled * scale
+                error = ((values - product) - _product_error(scaled, scale, product)) / scale
+            
+            floor = np.floor(scaled)
+            excess = (scaled - (floor + 0.5)) + error
+            half = floor * 0.5
+            up = (excess > 0) | ((excess == 0) & (np.floor(half) != half))
+            rounded = np.where(up, floor + 1, floor)
+            result = np.copysign(rounded / scale if digits >= 0 else rounded * scale, values)
+        
+        # Oltre 2^52 (o non finiti) il calcolo non è esatto: round() scalare
+        for i in np.flatnonzero(~(np.abs(scaled) < 2.0 ** 52)):
+            result[i] = round(float(values[i]), digits)
+        return result
+    
+    def _batch_round(a, ndigits=None):
+        # Stesso risultato di round(): np.round(a, n) arrotonda a * 10^n già
+        # arrotondato, che vicino a metà cade dalla parte sbagliata
+        # (2.675 -> 2.68); le righe incerte sono ricalcolate con _round_rows
+        if ndigits is None:
+            return np.round(a)
+        digits = operator.index(ndigits)
+        a = np.asarray(a, dtype=np.float64)
+        shape = a.shape
+        a = a.ravel()
+        
+        if abs(digits) > 22:
+            # 10^n non esatto in double
+            return np.array([round(v, digits) for v in a.tolist()]).reshape(shape)
+        
+        scale = 10.0 ** abs(digits)
+        with np.errstate(over='ignore', invalid='ignore'):
+            scaled = a * scale if digits >= 0 else a / scale
+            rounded = np.rint(scaled)
+            result = rounded / scale if digits >= 0 else rounded * scale
+            # Errore di scaled al più 1 ulp: incerte le righe vicine a metà,
+            # oltre 2^52 e non finite (operazioni in place: meno copie)
+            distance = np.subtract(scaled, rounded)
+            np.abs(distance, out=distance)
+            np.subtract(0.5, distance, out=distance)
+            np.abs(scaled, out=scaled)
+            scaled *= 2.0 ** -49
+            uncertain = ~np.greater(distance, scaled)
+        
+        if uncertain.any():
+            result[uncertain] = _round_rows(a[uncertain], digits)
+        return result.reshape(shape)
+    
+    _OPERAZIONI_NUMPY = _Operazioni(
+        binari={**_OPERAZIONI_SCALARI.binari, ast.Div: _batch_div},
+        neg=np.negative,
+        funzioni={
+            'round': _batch_round,
+            'abs': np.abs,
+            'min': lambda *args: reduce(np.minimum, args),
+            'max': lambda *args: reduce(np.maximum, args),
+        },
+    )
+    
+    # Aritmetica degli intervalli: ogni valore è una coppia (minimo, massimo)
+    # di array NumPy, quindi la propagazione è vettoriale su tutte le righe
+    def _interval_mul(a, b):
+        products = (a[0] * b[0], a[0] * b[1], a[1] * b[0], a[1] * b[1])
+        return reduce(np.minimum, products), reduce(np.maximum, products)
+    
+    def _interval_div(a, b):
+        # Divisore che contiene lo zero: risultato illimitato
+        contains_zero = (b[0] <= 0) & (b[1] >= 0)
+        lo, hi = _interval_mul(a, (1.0 / b[1], 1.0 / b[0]))
+        return np.where(contains_zero, -np.inf, lo), np.where(contains_zero, np.inf, hi)
+    
+    def _interval_abs(a):
+        lo = np.where(a[0] >= 0, a[0], np.where(a[1] <= 0, -a[1], 0.0))
+        return lo, np.maximum(np.abs(a[0]), np.abs(a[1]))
+    
+    def _interval_round(a, ndigits=None):
+        if ndigits is None:
+            return np.round(a[0]), np.round(a[1])
+        if np.ndim(ndigits[0]) or ndigits[0] != ndigits[1]:
+            raise ValueError("round(): il numero di cifre deve essere una costante")
+        return _batch_round(a[0], ndigits[0]), _batch_round(a[1], ndigits[0])
+    
+    _OPERAZIONI_INTERVALLI = _Operazioni(
+        binari={
+            ast.Add: lambda a, b: (a[0] + b[0], a[1] + b[1]),
+            ast.Sub: lambda a, b: (a[0] - b[1], a[1] - b[0]),
+            ast.Mult: _interval_mul,
+            ast.Div: _interval_div,
+        },
+        neg=lambda a: (-a[1], -a[0]),
+        funzioni={
+            'round': _interval_round,
+            'abs': _interval_abs,
+            'min': lambda *args: (reduce(np.minimum, [a[0] for a in args]),
+                                  reduce(np.minimum, [a[1] for a in args])),
+            'max': lambda *args: (reduce(np.maximum, [a[0] for a in args]),
+                                  reduce(np.maximum, [a[1] for a in args])),
+        },
+        const=lambda value: (value, value),
+    )
+
+
+def tolerance_intervals(valori: Dict[str, "np.ndarray"],
+                        tolleranza: Union[float, Dict[str, float]]) -> Dict[str, Tuple]:
+    """
+    Converte valori nominali ± tolleranza in intervalli (minimo, massimo)
+    
+    Args:
+        valori: Dizionario nome_variabile -> valore o array di valori
+        tolleranza: Tolleranza unica o dizionario nome_variabile -> tolleranza
+                    (le variabili non presenti hanno tolleranza 0)
+    
+    Returns:
+        Dizionario nome_variabile -> (minimo, massimo), utilizzabile
+        con evaluate_interval()
+    
+    Raises:
+        ValueError: Se NumPy non è disponibile
+    """
+    if not HAS_NUMPY:
+        raise ValueError("NumPy non disponibile: impossibile calcolare gli intervalli")
+    
+    intervalli = {}
+    for nome, valore in valori.items():
+        tol = tolleranza.get(nome, 0.0) if isinstance(tolleranza, dict) else tolleranza
+        valore = np.asarray(valore, dtype=np.float64)
+        intervalli[nome] = (valore - abs(tol), valore + abs(tol))
+    return intervalli
+
+
+def _validate_tree(tree: ast.Expression) -> List[str]:
+    """
+    Verifica che l'AST contenga solo elementi consentiti
+    
+    Args:
+        tree: AST in modalità 'eval'
+    
+    Returns:
+        Lista variabili usate (senza duplicati, in ordine)
+    
+    Raises:
+        ValueError: Se l'espressione contiene elementi non consentiti
+    """
+    variables: List[str] = []
+    
+    def visit(node: ast.AST, depth: int):
+        if depth > MAX_PROFONDITA:
+            raise ValueError("Formula troppo complessa")
+        
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float):
+                raise ValueError(f"Valore non consentito: {node.value!r}")
+            # Es: 1e400 (inf): non rappresentabile nel testo per il firmware
+            if not _is_finite(node.value):
+                raise ValueError("Costante fuori dall'intervallo dei numeri finiti")
+        
+        elif isinstance(node, ast.Name):
+            if node.id.startswith('_'):
+                raise ValueError(f"Nome non consentito: {node.id}")
+            if node.id in FUNZIONI_CONSENTITE:
+                raise ValueError(f"Funzione usata come variabile: {node.id}")
+            if node.id not in variables:
+                variables.append(node.id)
+        
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _OPERATORI_BINARI:
+                raise ValueError(f"Operatore non consentito: {type(node.op).__name__}")
+            visit(node.left, depth + 1)
+            visit(node.right, depth + 1)
+        
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, (ast.USub, ast.UAdd)):
+                raise ValueError(f"Operatore non consentito: {type(node.op).__name__}")
+            visit(node.operand, depth + 1)
+        
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNZIONI_CONSENTITE:
+                raise ValueError("Funzione non consentita")
+            if node.keywords:
+                raise ValueError(f"Argomenti con nome non consentiti in {node.func.id}()")
+            min_args, max_args = FUNZIONI_CONSENTITE[node.func.id]
+            if len(node.args) < min_args or (max_args is not None and len(node.args) > max_args):
+                raise ValueError(f"Numero di argomenti errato per {node.func.id}()")
+            for arg in node.args:
+                if isinstance(arg, ast.Starred):
+                    raise ValueError("Elemento non consentito nella formula: Starred")
+                visit(arg, depth + 1)
+        
+        else:
+            raise ValueError(f"Elemento non consentito nella formula: {type(node).__name__}")
+    
+    visit(tree.body, 0)
+    return variables
+
+
+def _is_finite(value: Union[int, float]) -> bool:
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+def _build_closure(node: ast.AST, ops: _Operazioni) -> Callable:
+    """Compila un nodo AST validato in una closure valori -> risultato"""
+    if isinstance(node, ast.Constant):
+        value = ops.const(node.value)
+        return lambda v: value
+    
+    if isinstance(node, ast.Name):
+        return operator.itemgetter(node.id)
+    
+    if isinstance(node, ast.UnaryOp):
+        operand = _build_closure(node.operand, ops)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        neg = ops.neg
+        return lambda v: neg(operand(v))
+    
+    if isinstance(node, ast.BinOp):
+        return _build_binop(ops.binari[type(node.op)], node.left, node.right, ops)
+    
+    # ast.Call (già validato)
+    func = ops.funzioni[node.func.id]
+    args = [_build_closure(arg, ops) for arg in node.args]
+    if len(args) == 1:
+        a, = args
+        return lambda v: func(a(v))
+    if len(args) == 2:
+        a, b = args
+        return lambda v: func(a(v), b(v))
+    return lambda v: func(*[a(v) for a in args])
+
+
+def _build_binop(op: Callable, left: ast.AST, right: ast.AST, ops: _Operazioni) -> Callable:
+    """Compila un'operazione binaria, specializzando costanti e variabili"""
+    if isinstance(right, ast.Constant):
+        c = ops.const(right.value)
+        if isinstance(left, ast.Name):
+            a = left.id
+            return lambda v: op(v[a], c)
+        f = _build_closure(left, ops)
+        return lambda v: op(f(v), c)
+    
+    if isinstance(left, ast.Constant):
+        c = ops.const(left.value)
+        if isinstance(right, ast.Name):
+            b = right.id
+            return lambda v: op(c, v[b])
+        g = _build_closure(right, ops)
+        return lambda v: op(c, g(v))
+    
+    if isinstance(left, ast.Name) and isinstance(right, ast.Name):
+        a, b = left.id, right.id
+        return lambda v: op(v[a], v[b])
+    
+    f = _build_closure(left, ops)
+    g = _build_closure(right, ops)
+    return lambda v: op(f(v), g(v))
+
+
+def _to_list(node: ast.AST) -> Union[List, float, str]:
+    """Converte un nodo AST validato in lista annidata (formato di parse())"""
+    if isinstance(node, ast.Constant):
+        return float(node.value)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.UnaryOp):
+        return ['-' if isinstance(node.op, ast.USub) else '+', _to_list(node.operand)]
+    if isinstance(node, ast.BinOp):
+        return [_to_list(node.left), _OPERATORI_BINARI[type(node.op)], _to_list(node.right)]
+    return [node.func.id] + [_to_list(arg) for arg in node.args]
+
+
+# =====================================================================
+# OTTIMIZZAZIONE (constant folding e normalizzazione)
+# =====================================================================
+
+def _is_const(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant)
+
+
+def _const(value: Union[int, float]) -> ast.Constant:
+    return ast.Constant(value=value)
+
+
+def _safe_fold(func: Callable, *args) -> Union[int, float, None]:
+    """Calcola un valore costante; None se il risultato non è un numero finito"""
+    try:
+        value = func(*args)
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _flatten(node: ast.AST, ops: Tuple[type, type], inverse: bool, out: List):
+    """
+    Appiattisce una catena di + - (o * /) in una lista (invertito, termine)
+    
+    Un divisore resta un unico termine: L / (H / B) non diventa L / H * B,
+    che con B = 0 darebbe 0 invece dell'errore di divisione per zero.
+    """
+    if isinstance(node, ast.BinOp) and type(node.op) in ops:
+        _flatten(node.left, ops, inverse, out)
+        if isinstance(node.op, ast.Div):
+            out.append((not inverse, node.right))
+        else:
+            _flatten(node.right, ops, inverse != isinstance(node.op, ops[1]), out)
+    else:
+        out.append((inverse, node))
+
+
+def _simplify_additive(node: ast.BinOp) -> ast.AST:
+    """Somma le costanti di una catena + - e le sposta in fondo (es: L - 2*6 + 0.5 -> L - 11.5)"""
+    terms = []
+    _flatten(node, (ast.Add, ast.Sub), False, terms)
+    
+    constant = 0
+    others = []
+    for negative, term in terms:
+        term = _simplify(term)
+        if _is_const(term):
+            folded = _safe_fold(operator.sub if negative else operator.add, constant, term.value)
+            if folded is None:
+                return _rebuild_chain(terms, ast.Add, ast.Sub)
+            constant = folded
+        elif isinstance(term, ast.UnaryOp) and isinstance(term.op, ast.USub):
+            others.append((not negative, term.operand))
+        else:
+            others.append((negative, term))
+    
+    if not others:
+        return _const(constant)
+    
+    # Primo termine positivo in testa, per evitare un meno unario
+    first = next((i for i, (negative, _) in enumerate(others) if not negative), None)
+    if first is None and constant > 0:
+        result = _const(constant)
+        constant = 0
+        rest = others
+    elif first is None:
+        result = ast.UnaryOp(op=ast.USub(), operand=others[0][1])
+        rest = others[1:]
+    else:
+        result = others[first][1]
+        rest = others[:first] + others[first + 1:]
+    
+    for negative, term in rest:
+        result = ast.BinOp(left=result, op=ast.Sub() if negative else ast.Add(), right=term)
+    
+    if constant:
+        op = ast.Sub() if constant < 0 else ast.Add()
+        result = ast.BinOp(left=result, op=op, right=_const(abs(constant)))
+    
+    return result
+
+
+def _simplify_multiplicative(node: ast.BinOp) -> ast.AST:
+    """Raccoglie i fattori costanti di una catena * / (es: L * 2 / 4 -> L * 0.5)"""
+    factors = []
+    _flatten(node, (ast.Mult, ast.Div), False, factors)
+    
+    numerator = 1
+    denominator = 1
+    others = []
+    for divide, factor in factors:
+        factor = _simplify(factor)
+        if _is_const(factor) and not (divide and factor.value == 0):
+            if divide:
+                folded = _safe_fold(operator.mul, denominator, factor.value)
+                if folded is None:
+                    return _rebuild_chain(factors, ast.Mult, ast.Div)
+                denominator = folded
+            else:
+                folded = _safe_fold(operator.mul, numerator, factor.value)
+                if folded is None:
+                    return _rebuild_chain(factors, ast.Mult, ast.Div)
+                numerator = folded
+        else:
+            others.append((divide, factor))
+    
+    if not others:
+        value = _safe_fold(operator.truediv, numerator, denominator)
+        if value is None:
+            return _rebuild_chain(factors, ast.Mult, ast.Div)
+        return _const(int(value) if value == int(value) and isinstance(numerator, int)
+                      and isinstance(denominator, int) else value)
+    
+    # Un solo coefficiente: divisione se deriva solo da divisori (es: (L + 6) / 2)
+    if numerator != 1 and denominator != 1:
+        coefficient = _safe_fold(operator.truediv, numerator, denominator)
+        if coefficient is None:
+            return _rebuild_chain(factors, ast.Mult, ast.Div)
+        numerator, denominator = coefficient, 1
+    
+    first = next((i for i, (divide, _) in enumerate(others) if not divide), None)
+    if first is None:
+        result = _const(numerator)
+        numerator = 1
+        rest = others
+    else:
+        result = others[first][1]
+        rest = others[:first] + others[first + 1:]
+    
+    for divide, factor in rest:
+        result = ast.BinOp(left=result, op=ast.Div() if divide else ast.Mult(), right=factor)
+    
+    if numerator != 1:
+        result = ast.BinOp(left=result, op=ast.Mult(), right=_const(numerator))
+    if denominator != 1:
+        result = ast.BinOp(left=result, op=ast.Div(), right=_const(denominator))
+    
+    return result
+
+
+def _rebuild_chain(items: List, op: type, inverse_op: type) -> ast.AST:
+    """Ricostruisce una catena senza riordinarla (fallback se il folding non è sicuro)"""
+    result = _simplify(items[0][1])
+    if items[0][0]:
+        result = ast.BinOp(left=_const(0 if op is ast.Add else 1), op=inverse_op(), right=result)
+    for inverse, item in items[1:]:
+        result = ast.BinOp(left=result, op=inverse_op() if inverse else op(), right=_simplify(item))
+    return result
+
+
+def _simplify(node: ast.AST) -> ast.AST:
+    """Restituisce un nuovo nodo con costanti calcolate ed espressione normalizzata"""
+    if isinstance(node, (ast.Constant, ast.Name)):
+        return node
+    
+    if isinstance(node, ast.UnaryOp):
+        operand = _simplify(node.operand)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        if _is_const(operand):
+            return _const(-operand.value)
+        if isinstance(operand, ast.UnaryOp) and isinstance(operand.op, ast.USub):
+            return operand.operand
+        return ast.UnaryOp(op=ast.USub(), operand=operand)
+    
+    if isinstance(node, ast.BinOp):
+        if isinstance(node.op, (ast.Add, ast.Sub)):
+            return _simplify_additive(node)
+        return _simplify_multiplicative(node)
+    
+    # ast.Call
+    args = [_simplify(arg) for arg in node.args]
+    if all(_is_const(arg) for arg in args):
+        func = _OPERAZIONI_SCALARI.funzioni[node.func.id]
+        value = _safe_fold(func, *[arg.value for arg in args])
+        if value is not None:
+            return _const(value)
+    return ast.Call(func=ast.Name(id=node.func.id, ctx=ast.Load()), args=args, keywords=[])
+
+
+def optimize_tree(tree: ast.Expression) -> ast.Expression:
+    """
+    Ottimizza un AST validato: calcola le sottoespressioni costanti,
+    raccoglie le costanti delle catene + - e * /, elimina i segni ridondanti
+    
+    Args:
+        tree: AST validato in modalità 'eval'
+    
+    Returns:
+        Nuovo AST equivalente (a meno di arrotondamenti in virgola mobile)
+    """
+    return ast.fix_missing_locations(ast.Expression(body=_simplify(tree.body)))
+
+
+_PRECEDENZA = {ast.Add: 1, ast.Sub: 1, ast.Mult: 2, ast.Div: 2}
+
+
+def _format_number(value: Union[int, float]) -> str:
+    """Formatta un numero senza notazione esponenziale (il firmware non la supporta)"""
+    if not _is_finite(value):
+        raise ValueError(f"Costante non finita: {value!r}")
+    if isinstance(value, int):
+        return str(value)
+    text = format(Decimal(repr(value)), 'f')
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text or '0'
+
+
+def _precedence(node: ast.AST) -> int:
+    if isinstance(node, ast.BinOp):
+        return _PRECEDENZA[type(node.op)]
+    if isinstance(node, ast.UnaryOp) or (_is_const(node) and node.value < 0):
+        return 3
+    return 4
+
+
+def to_source(node: ast.AST) -> str:
+    """
+    Converte un AST validato in testo formula con parentesi minime
+    
+    Args:
+        node: AST (Expression o nodo espressione)
+    
+    Returns:
+        Formula testuale, compatibile con il parser del firmware
+    """
+    if isinstance(node, ast.Expression):
+        node = node.body
+    
+    if isinstance(node, ast.Constant):
+        return _format_number(node.value)
+    
+    if isinstance(node, ast.Name):
+        return node.id
+    
+    if isinstance(node, ast.UnaryOp):
+        operand = to_source(node.operand)
+        if _precedence(node.operand) < 3:
+            operand = f"({operand})"
+        return f"-{operand}" if isinstance(node.op, ast.USub) else operand
+    
+    if isinstance(node, ast.BinOp):
+        prec = _PRECEDENZA[type(node.op)]
+        left = to_source(node.left)
+        right = to_source(node.right)
+        if _precedence(node.left) < prec:
+            left = f"({left})"
+        if _precedence(node.right) <= prec or _precedence(node.right) == 3:
+            right = f"({right})"
+        return f"{left} {_OPERATORI_BINARI[type(node.op)]} {right}"
+    
+    return f"{node.func.id}({', '.join(to_source(arg) for arg in node.args)})"
+
+
+class CompiledFormula:
+    """
+    Formula compilata e riutilizzabile.
+    
+    Contiene l'AST validato, le variabili usate e la closure compilata,
+    così la valutazione ripetuta costa una sola chiamata.
+    """
+    
+    __slots__ = ('formula', 'tree', 'variables', '_fn', '_fn_batch', '_fn_interval')
+    
+    def __init__(self, formula: str, tree: ast.Expression, variables: List[str]):
+        self.formula = formula
+        self.tree = tree
+        self.variables = variables
+        self._fn = _build_closure(tree.body, _OPERAZIONI_SCALARI)
+        self._fn_batch = None
+        self._fn_interval = None
+    
+    def _missing(self, valori) -> ValueError:
+        """Errore per variabili senza valore"""
+        missing = [v for v in self.variables if v not in valori]
+        return ValueError(f"Valori mancanti per: {', '.join(missing)}")
+    
+    def evaluate(self, valori: Dict[str, float]) -> float:
+        """
+        Valuta la formula compilata con i valori forniti
+        
+        Args:
+            valori: Dizionario nome_variabile -> valore
+        
+        Returns:
+            Risultato numerico della formula
+        
+        Raises:
+            ValueError: Se mancano variabili o la valutazione fallisce
+        """
+        try:
+            return float(self._fn(valori))
+        except KeyError:
+            raise self._missing(valori)
+        except Exception as e:
+            raise ValueError(f"Errore nella valutazione: {e}")
+    
+    def evaluate_batch(self, columns: Dict[str, "np.ndarray"]) -> "np.ndarray":
+        """
+        Valuta la formula su intere colonne di valori (NumPy)
+        
+        Le righe con divisione per zero producono nan invece
+        di sollevare un'eccezione.
+        
+        Args:
+            columns: Dizionario nome_variabile -> array di valori
+        
+        Returns:
+            Array con un risultato per riga
+        
+        Raises:
+            ValueError: Se mancano colonne o la valutazione fallisce
+        """
+        if not HAS_NUMPY:
+            raise ValueError("NumPy non disponibile: impossibile valutare in batch")
+        
+        if any(v not in columns for v in self.variables):
+            raise self._missing(columns)
+        
+        if self._fn_batch is None:
+            self._fn_batch = _build_closure(self.tree.body, _OPERAZIONI_NUMPY)
+        
+        arrays = {name: np.asarray(col, dtype=np.float64) for name, col in columns.items()}
+        rows = max((a.shape[0] for a in arrays.values() if a.ndim), default=1)
+        
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = self._fn_batch(arrays)
+            return np.broadcast_to(np.asarray(result, dtype=np.float64), (rows,)).copy()
+        except Exception as e:
+            raise ValueError(f"Errore nella valutazione: {e}")
+    
+    def evaluate_interval(self, intervalli: Dict[str, Tuple]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Propaga intervalli di incertezza attraverso la formula (NumPy)
+        
+        Ogni variabile è una coppia (minimo, massimo) di valori o array;
+        il risultato è l'intervallo garantito che contiene tutti i valori
+        possibili della formula, riga per riga. Un divisore che contiene
+        lo zero produce un intervallo illimitato (-inf, inf).
+        
+        Args:
+            intervalli: Dizionario nome_variabile -> (minimo, massimo)
+                        (vedi tolerance_intervals())
+        
+        Returns:
+            Tupla (minimi, massimi) con un elemento per riga
+        
+        Raises:
+            ValueError: Se mancano variabili, un intervallo non è valido
+                        o la valutazione fallisce
+        """
+        if not HAS_NUMPY:
+            raise ValueError("NumPy non disponibile: impossibile valutare gli intervalli")
+        
+        if any(v not in intervalli for v in self.variables):
+            raise self._missing(intervalli)
+        
+        if self._fn_interval is None:
+            self._fn_interval = _build_closure(self.tree.body, _OPERAZIONI_INTERVALLI)
+        
+        arrays = {}
+        for name in self.variables:
+            lo, hi = (np.asarray(x, dtype=np.float64) for x in intervalli[name])
+            if np.any(lo > hi):
+                raise ValueError(f"Intervallo non valido per {name}: minimo maggiore del massimo")
+            arrays[name] = (lo, hi)
+        
+        rows = max((a.shape[0] for pair in arrays.values() for a in pair if a.ndim), default=1)
+        
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                lo, hi = self._fn_interval(arrays)
+            return tuple(
+                np.broadcast_to(np.asarray(x, dtype=np.float64), (rows,)).copy()
+                for x in (lo, hi)
+            )
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Errore nella valutazione: {e}")
+    
+    def __repr__(self) -> str:
+        return f"CompiledFormula({self.formula!r})"
+
 
 class FormulaParser:
     """Parser per formule matematiche con variabili"""
     
-    def __init__(self):
-        # Abilita packrat parsing per performance
-        ParserElement.enablePackrat()
-        self._grammar = self._build_grammar()
+    # Numero massimo di formule compilate mantenute in cache (LRU)
+    CACHE_SIZE = 256
+    
+    # Dimensione cache dell'istanza condivisa (tutte le formule del progetto)
+    SHARED_CACHE_SIZE = 2048
+    
+    def __init__(self, cache_size: int = CACHE_SIZE, optimize: bool = True):
+        # Cache LRU formula -> CompiledFormula
+        self._cache_size = cache_size
+        self._compiled: "OrderedDict[str, CompiledFormula]" = OrderedDict()
         
-    def _build_grammar(self):
-        """Costruisce la grammatica per il parser"""
-        # Numeri (interi e decimali)
-        number = Word(nums + ".-").setParseAction(lambda t: float(t[0]))
+        # Cache LRU per l'editor: variabili estratte e esiti di validazione
+        # (l'utente che digita ripassa più volte dagli stessi prefissi)
+        self._variables_cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+        self._validation_cache: "OrderedDict[Tuple[str, FrozenSet[str]], Tuple[bool, str]]" = OrderedDict()
         
-        # Variabili (lettere maiuscole o nomi con underscore)
-        variable = Word(alphas + "_", alphanums + "_")
+        # Applica constant folding prima della compilazione
+        self._optimize = optimize
         
-        # Funzioni supportate
-        func_name = oneOf("round abs min max", caseless=True)
+        # Le cache sono condivise tra thread (istanza di get_formula_parser())
+        self._lock = threading.Lock()
+    
+    def _cache_get(self, cache: OrderedDict, key):
+        """Legge da una cache LRU aggiornando l'ordine di utilizzo (None se assente)"""
+        # Lettura senza lock: get e move_to_end sono atomiche su OrderedDict
+        value = cache.get(key)
+        if value is not None:
+            try:
+                cache.move_to_end(key)
+            except KeyError:
+                pass  # Scartata nel frattempo da un altro thread
+        return value
+    
+    def _cache_put(self, cache: OrderedDict, key, value):
+        """Inserisce in una cache LRU scartando l'elemento meno recente"""
+        with self._lock:
+            cache[key] = value
+            if len(cache) > self._cache_size:
+                cache.popitem(last=False)
+    
+    def _parse_tree(self, formula: str) -> Tuple[ast.Expression, List[str]]:
+        """
+        Analizza e valida la formula
         
-        # Parentesi
-        lparen = Suppress("(")
-        rparen = Suppress(")")
+        Returns:
+            Tupla (AST validato, variabili usate)
         
-        # Espressione di base
-        expr = infixNotation(
-            number | variable,
-            [
-                (func_name + lparen, 1, opAssoc.RIGHT),
-                (rparen, 1, opAssoc.LEFT),
-                (oneOf("* /"), 2, opAssoc.LEFT),
-                (oneOf("+ -"), 2, opAssoc.LEFT),
-            ]
-        )
+        Raises:
+            ValueError: Se la formula non è valida o contiene elementi non consentiti
+        """
+        try:
+            tree = ast.parse(formula.strip(), mode='eval')
+        except (SyntaxError, ValueError, RecursionError, MemoryError) as e:
+            raise ValueError(f"Errore di parsing: {e}")
         
-        return expr
+        return tree, _validate_tree(tree)
     
     def parse(self, formula: str) -> Union[List, float]:
         """
@@ -54,17 +824,65 @@ class FormulaParser:
         
         Args:
             formula: Stringa contenente la formula
-            
+        
         Returns:
-            AST (lista) o valore numerico
-            
+            AST (lista annidata) o valore numerico
+        
         Raises:
-            ParseException: Se la formula non è valida
+            ValueError: Se la formula non è valida
         """
-        try:
-            return self._grammar.parseString(formula, parseAll=True).asList()
-        except ParseException as e:
-            raise ValueError(f"Errore di parsing: {e}")
+        tree, _ = self._parse_tree(formula)
+        return _to_list(tree.body)
+    
+    def compile(self, formula: str) -> CompiledFormula:
+        """
+        Compila una formula in un oggetto riutilizzabile (con cache LRU)
+        
+        Args:
+            formula: Stringa contenente la formula
+        
+        Returns:
+            Formula compilata
+        
+        Raises:
+            ValueError: Se la formula non è valida o contiene elementi non consentiti
+        """
+        compiled = self._cache_get(self._compiled, formula)
+        if compiled is not None:
+            return compiled
+        
+        tree, variables = self._parse_tree(formula)
+        if self._optimize:
+            tree = optimize_tree(tree)
+        compiled = CompiledFormula(formula, tree, variables)
+        self._cache_put(self._compiled, formula, compiled)
+        
+        return compiled
+    
+    def optimize(self, formula: str) -> str:
+        """
+        Restituisce la formula ottimizzata (costanti calcolate, forma normalizzata)
+        
+        Es: "L - 2*6 + 0.5" -> "L - 11.5"
+        
+        Args:
+            formula: Formula da ottimizzare
+        
+        Returns:
+            Formula testuale equivalente, compatibile con il parser del firmware
+        
+        Raises:
+            ValueError: Se la formula non è valida
+        """
+        tree, _ = self._parse_tree(formula)
+        return to_source(optimize_tree(tree))
+    
+    def clear_cache(self):
+        """Svuota le cache (formule compilate, variabili, validazioni)"""
+        with self._lock:
+            self._compiled.clear()
+            self._variables_cache.clear()
+            self._validation_cache.clear()
     
     def validate(self, formula: str, variabili: List[str]) -> Tuple[bool, str]:
         """
@@ -73,13 +891,25 @@ class FormulaParser:
         Args:
             formula: Formula da validare
             variabili: Lista di nomi variabili disponibili
-            
+        
         Returns:
             Tupla (valido, messaggio_errore)
         """
         if not formula or not formula.strip():
             return False, "Formula vuota"
         
+        # L'esito dipende solo dalla formula e dall'insieme di variabili
+        key = (formula, frozenset(variabili))
+        cached = self._cache_get(self._validation_cache, key)
+        if cached is not None:
+            return cached
+        
+        result = self._validate(formula, variabili)
+        self._cache_put(self._validation_cache, key, result)
+        return result
+    
+    def _validate(self, formula: str, variabili: List[str]) -> Tuple[bool, str]:
+        """Validazione effettiva (senza cache)"""
         try:
             # Controlla variabili utilizzate
             used_vars = self.get_variables(formula)
@@ -93,7 +923,7 @@ class FormulaParser:
             self.evaluate(formula, test_values)
             
             return True, ""
-            
+        
         except Exception as e:
             return False, str(e)
     
@@ -104,42 +934,54 @@ class FormulaParser:
         Args:
             formula: Formula da valutare
             valori: Dizionario nome_variabile -> valore
-            
+        
         Returns:
             Risultato numerico della formula
-            
+        
         Raises:
             ValueError: Se la formula non è valida o mancano variabili
         """
-        # Ottieni variabili usate
-        used_vars = self.get_variables(formula)
+        return self.compile(formula).evaluate(valori)
+    
+    def evaluate_batch(self, formula: str, columns: Dict[str, "np.ndarray"]) -> "np.ndarray":
+        """
+        Valuta una formula su intere colonne di valori (NumPy)
         
-        # Controlla che tutte le variabili abbiano un valore
-        missing = [v for v in used_vars if v not in valori]
-        if missing:
-            raise ValueError(f"Valori mancanti per: {', '.join(missing)}")
+        La formula viene compilata una sola volta e calcolata
+        sull'intero array, senza ciclare riga per riga.
         
-        # Sostituisci variabili e valuta
-        try:
-            # Crea namespace sicuro con funzioni matematiche
-            # NOTA: Uso di eval() limitato a namespace sicuro senza __builtins__
-            # Le formule provengono da utenti fidati (configuratori del dispositivo)
-            # Per maggiore sicurezza, validare sempre le variabili prima di valutare
-            safe_dict = {
-                'round': round,
-                'abs': abs,
-                'min': min,
-                'max': max,
-                'math': math,
-                '__builtins__': {}
-            }
-            safe_dict.update(valori)
-            
-            result = eval(formula, safe_dict)
-            return float(result)
-            
-        except Exception as e:
-            raise ValueError(f"Errore nella valutazione: {e}")
+        Args:
+            formula: Formula da valutare
+            columns: Dizionario nome_variabile -> array di valori
+        
+        Returns:
+            Array con un risultato per riga
+        
+        Raises:
+            ValueError: Se la formula non è valida o mancano colonne
+        """
+        return self.compile(formula).evaluate_batch(columns)
+    
+    def evaluate_interval(self, formula: str,
+                          intervalli: Dict[str, Tuple]) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Calcola l'intervallo di incertezza del risultato di una formula
+        
+        Es: con L = 1200 ± 0.005 la formula "(L + 6) / 2" dà
+        l'intervallo [602.9975, 603.0025].
+        
+        Args:
+            formula: Formula da valutare
+            intervalli: Dizionario nome_variabile -> (minimo, massimo)
+                        di valori o array (vedi tolerance_intervals())
+        
+        Returns:
+            Tupla (minimi, massimi) con un elemento per riga
+        
+        Raises:
+            ValueError: Se la formula non è valida o mancano variabili
+        """
+        return self.compile(formula).evaluate_interval(intervalli)
     
     def get_variables(self, formula: str) -> List[str]:
         """
@@ -147,10 +989,19 @@ class FormulaParser:
         
         Args:
             formula: Formula da analizzare
-            
+        
         Returns:
             Lista di nomi variabili (senza duplicati)
         """
+        cached = self._cache_get(self._variables_cache, formula)
+        if cached is None:
+            cached = tuple(self._extract_variables(formula))
+            self._cache_put(self._variables_cache, formula, cached)
+        
+        return list(cached)
+    
+    def _extract_variables(self, formula: str) -> List[str]:
+        """Estrazione effettiva delle variabili (senza cache)"""
         # Pattern per identificare variabili (lettere e underscore)
         pattern = r'\b([A-Za-z_][A-Za-z0-9_]*)\b'
         
@@ -177,7 +1028,7 @@ class FormulaParser:
         Args:
             formula: Formula da testare
             test_values: Dizionario con valori di test
-            
+        
         Returns:
             Tupla (successo, risultato_o_errore)
         """
@@ -186,3 +1037,24 @@ class FormulaParser:
             return True, result
         except Exception as e:
             return False, str(e)
+
+
+# Istanza singleton
+_formula_parser_instance = None
+_formula_parser_lock = threading.Lock()
+
+
+def get_formula_parser() -> FormulaParser:
+    """
+    Ottieni l'istanza condivisa del parser
+    
+    Tutti i punti dell'interfaccia usano la stessa istanza, così le formule
+    già compilate (e gli esiti di validazione) restano in cache tra
+    un dialog e l'altro invece di essere ricostruite a ogni apertura.
+    """
+    global _formula_parser_instance
+    if _formula_parser_instance is None:
+        with _formula_parser_lock:
+            if _formula_parser_instance is None:
+                _formula_parser_instance = FormulaParser(cache_size=FormulaParser.SHARED_CACHE_SIZE)
+    return _formula_parser_instance
@@ -7,9 +7,24 @@ con supporto per microSD e USB-C OTG
 import json
 import csv
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, Tuple, Union
 from datetime import datetime
-import shutil
+import heapq
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import measure_binary
+from .measure_store import MeasureStore, parse_timestamp
+from .measure_stats import GroupedStats, GroupBy
+from .measure_journal import MeasureJournal
+from . import measure_csv
+from . import measure_archive
+from .measure_archive import SessionArchiver
+from .measure_index import MeasureIndex, measure_keys
+from .sd_mirror import SdMirror
+from . import atomic_io
 
 
 class IOManager:
@@ -19,8 +34,13 @@ class IOManager:
     SD_MOUNT_PATH = "/sd"  # Path standard per microSD su ESP32
     USB_MOUNT_PATH = "/usb"  # Path standard per USB OTG
     
-    # Formato timestamp per backup
-    BACKUP_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+    # Estensioni dei file di misure riconosciute nell'import da cartella
+    # (JSONL e CSV anche compressi: .jsonl.gz, .csv.zst, ...)
+    MEASURE_FILE_SUFFIXES = ('.jsonl', '.csv', '.bin')
+    
+    # Formato timestamp e numero di backup configurazione conservati
+    BACKUP_TIMESTAMP_FORMAT = atomic_io.BACKUP_TIMESTAMP_FORMAT
+    KEEP_BACKUPS = atomic_io.DEFAULT_KEEP_BACKUPS
     
     def __init__(self):
         """Inizializza gestore I/O"""
@@ -31,14 +51,14 @@ class IOManager:
     # EXPORT/IMPORT MISURE
     # =====================================================================
     
-    def export_measures_jsonl(self, measures: List[Dict], output_path: Path,
+    def export_measures_jsonl(self, measures: Iterable[Dict], output_path: Path,
                               append: bool = True) -> bool:
         """
         Esporta misure in formato JSONL (JSON Lines)
         Append-safe per registrazione continua
         
         Args:
-            measures: Lista di dict misure
+            measures: Lista (o flusso) di dict misure
             output_path: Path file output
             append: Se True, appende al file esistente
         
@@ -54,29 +74,167 @@ class IOManager:
             # Modalità append o write
             mode = 'a' if append and output_path.exists() else 'w'
             
+            # Timestamp per le misure che ne sono prive (uno per chiamata)
+            now = None
+            count = 0
+            
             with open(output_path, mode, encoding='utf-8') as f:
                 for measure in measures:
                     # Aggiungi timestamp se non presente
                     if 'timestamp' not in measure:
-                        measure['timestamp'] = datetime.now().isoformat()
+                        if now is None:
+                            now = datetime.now().isoformat()
+                        measure['timestamp'] = now
                     
                     # Scrivi una linea JSON per misura
                     json_line = json.dumps(measure, ensure_ascii=False)
                     f.write(json_line + '\n')
+                    count += 1
             
             self.last_export_path = str(output_path)
-            print(f"Esportate {len(measures)} misure in {output_path}")
+            print(f"Esportate {count} misure in {output_path}")
             return True
             
         except (IOError, OSError) as e:
             print(f"Errore export misure JSONL: {e}")
             return False
     
+    def open_measure_journal(self, directory: Path, **options) -> Optional[MeasureJournal]:
+        """
+        Apre un journal per la registrazione continua (una misura alla volta)
+        
+        Da preferire a export_measures_jsonl(append=True) quando le misure
+        arrivano singolarmente (es: ricevitore BLE): il file resta aperto e
+        le scritture vengono raggruppate.
+        
+        Args:
+            directory: Cartella dei file giornalieri YYYYMMDD.jsonl
+            **options: Soglie di commit (vedi MeasureJournal)
+        
+        Returns:
+            MeasureJournal (da chiudere con close()) o None se errore
+        """
+        try:
+            return MeasureJournal(Path(directory), **options)
+        except (IOError, OSError) as e:
+            print(f"Errore apertura journal misure: {e}")
+            return None
+    
+    def iter_measures_jsonl(self, input_path: Path,
+                            fields: Optional[List[str]] = None,
+                            where: Optional[Callable[[Dict], bool]] = None,
+                            batch_size: Optional[int] = None,
+                            max_lines: Optional[int] = None
+                            ) -> Iterator[Union[Dict, List[Dict]]]:
+        """
+        Legge misure da JSONL una alla volta (memoria costante)
+        
+        Le linee non valide (es: ultima linea troncata) vengono saltate.
+        I file compressi (gzip o zstd, es: sessioni archiviate .jsonl.gz)
+        vengono decompressi in streaming.
+        
+        Args:
+            input_path: Path file input
+            fields: Campi da mantenere in ogni misura. None = tutti.
+            where: Predicato sulla misura completa; se False la misura viene scartata
+            batch_size: Se indicato, produce liste di al massimo batch_size misure
+            max_lines: Numero massimo linee da leggere. None = tutte.
+        
+        Yields:
+            Dict misura, oppure lista di misure se batch_size è indicato
+        
+        Raises:
+            IOError: Se il file non esiste o non è leggibile
+        """
+        input_path = Path(input_path)
+        
+        with measure_archive.open_measure_text(input_path) as f:
+            yield from self._select_measures(
+                self._parse_jsonl_lines(f, max_lines), fields, where, batch_size
+            )
+    
+    def import_measures_session(self, data: Union[bytes, bytearray],
+                                output_path: Optional[Path] = None) -> Optional[List[Dict]]:
+        """
+        Importa una sessione JSONL ricevuta in memoria (es: trasferimento BLE)
+        
+        Il buffer viene letto linea per linea senza decodificarlo in un'unica
+        stringa; se indicato, viene salvato così com'è in output_path.
+        
+        Args:
+            data: Contenuto JSONL della sessione
+            output_path: File in cui salvare la sessione (es: sessions/YYYYMMDD.jsonl)
+        
+        Returns:
+            Lista misure o None se errore
+        """
+        try:
+            if output_path is not None:
+                output_path = Path(output_path)
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(output_path, 'wb') as f:
+                    f.write(data)
+                self.last_export_path = str(output_path)
+            
+            measures = list(self._parse_jsonl_lines(_iter_buffer_lines(data)))
+            print(f"Importate {len(measures)} misure dalla sessione ({len(data)} byte)")
+            return measures
+        
+        except (IOError, OSError) as e:
+            print(f"Errore import sessione: {e}")
+            return None
+    
+    @staticmethod
+    def _parse_jsonl_lines(lines, max_lines: Optional[int] = None) -> Iterator[Dict]:
+        """Decodifica linee JSONL saltando quelle vuote o non valide"""
+        for i, line in enumerate(lines):
+            if max_lines and i >= max_lines:
+                break
+            
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Errore parse linea {i+1}: {e}")
+    
+    @staticmethod
+    def _select_measures(measures: Iterator[Dict],
+                         fields: Optional[List[str]] = None,
+                         where: Optional[Callable[[Dict], bool]] = None,
+                         batch_size: Optional[int] = None
+                         ) -> Iterator[Union[Dict, List[Dict]]]:
+        """Applica filtro, proiezione campi e raggruppamento a un flusso di misure"""
+        batch = []
+        
+        for measure in measures:
+            if where is not None and not where(measure):
+                continue
+                
+            if fields is not None:
+                measure = {k: measure[k] for k in fields if k in measure}
+                
+            if batch_size:
+                batch.append(measure)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            else:
+                yield measure
+        
+        if batch:
+            yield batch
+    
     def import_measures_jsonl(self, input_path: Path,
                              max_lines: Optional[int] = None) -> Optional[List[Dict]]:
         """
         Importa misure da formato JSONL
         
+        Carica tutte le misure in memoria: per file grandi usare
+        iter_measures_jsonl().
+        
         Args:
             input_path: Path file input
             max_lines: Numero massimo linee da leggere. None = tutte.
@@ -91,23 +249,7 @@ class IOManager:
             return None
         
         try:
-            measures = []
-            
-            with open(input_path, 'r', encoding='utf-8') as f:
-                for i, line in enumerate(f):
-                    if max_lines and i >= max_lines:
-                        break
-                    
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        measure = json.loads(line)
-                        measures.append(measure)
-                    except json.JSONDecodeError as e:
-                        print(f"Errore parse linea {i+1}: {e}")
-                        continue
+            measures = list(self.iter_measures_jsonl(input_path, max_lines=max_lines))
             
             self.last_import_path = str(input_path)
             print(f"Importate {len(measures)} misure da {input_path}")
@@ -117,6 +259,129 @@ class IOManager:
             print(f"Errore import misure JSONL: {e}")
             return None
     
+    def count_measures_jsonl(self, input_path: Path,
+                             where: Optional[Callable[[Dict], bool]] = None) -> Optional[int]:
+        """
+        Conta le misure valide di un file JSONL senza caricarle in memoria
+        
+        Args:
+            input_path: Path file input
+            where: Predicato opzionale per contare solo alcune misure
+        
+        Returns:
+            Numero misure o None se errore
+        """
+        input_path = Path(input_path)
+        
+        if not input_path.exists():
+            print(f"File non trovato: {input_path}")
+            return None
+        
+        try:
+            count = sum(len(batch) for batch in
+                        self.iter_measures_jsonl(input_path, where=where, batch_size=1024))
+            self.last_import_path = str(input_path)
+            return count
+        
+        except (IOError, OSError) as e:
+            print(f"Errore lettura misure JSONL: {e}")
+            return None
+    
+    def export_measures_binary(self, measures: List[Dict], output_path: Path,
+                               append: bool = False) -> bool:
+        """
+        Esporta misure nel formato binario del firmware (measurement_record_t)
+        
+        Args:
+            measures: Lista di dict misure (chiavi del JSONL del firmware)
+            output_path: Path file output
+            append: Se True, appende al file esistente
+        
+        Returns:
+            True se successo, False altrimenti
+        """
+        output_path = Path(output_path)
+        
+        try:
+            records = measure_binary.measures_to_records(measures)
+            measure_binary.write_records(output_path, records, append=append)
+            
+            self.last_export_path = str(output_path)
+            print(f"Esportate {len(records)} misure in binario: {output_path}")
+            return True
+            
+        except (IOError, OSError, ValueError) as e:
+            print(f"Errore export misure binario: {e}")
+            return False
+    
+    def import_measures_binary(self, input_path: Path,
+                               verify_crc: bool = True):
+        """
+        Importa misure da file binario del firmware (es: backup_*.bin)
+        
+        Il file viene mappato in memoria: se tutti i CRC sono corretti
+        l'array restituito non copia i dati.
+        
+        Args:
+            input_path: Path file input
+            verify_crc: Se True, scarta i record con CRC errato
+        
+        Returns:
+            Array NumPy strutturato (measure_binary.RECORD_DTYPE) o None se errore
+        """
+        input_path = Path(input_path)
+        
+        if not input_path.exists():
+            print(f"File non trovato: {input_path}")
+            return None
+        
+        try:
+            records = measure_binary.read_records(input_path)
+            
+            if verify_crc:
+                valid = measure_binary.verify_crc32(records)
+                invalid = len(records) - int(valid.sum())
+                if invalid:
+                    print(f"Scartati {invalid} record con CRC errato")
+                    records = records[valid]
+            
+            self.last_import_path = str(input_path)
+            print(f"Importate {len(records)} misure da {input_path}")
+            return records
+            
+        except (IOError, OSError, ValueError) as e:
+            print(f"Errore import misure binario: {e}")
+            return None
+    
+    def iter_measures_binary(self, input_path: Path,
+                             fields: Optional[List[str]] = None,
+                             where: Optional[Callable[[Dict], bool]] = None,
+                             batch_size: Optional[int] = None,
+                             verify_crc: bool = True
+                             ) -> Iterator[Union[Dict, List[Dict]]]:
+        """
+        Legge misure da file binario come dict (stesse chiavi del JSONL)
+        
+        Args:
+            input_path: Path file input
+            fields: Campi da mantenere in ogni misura. None = tutti.
+            where: Predicato sulla misura completa; se False la misura viene scartata
+            batch_size: Se indicato, produce liste di al massimo batch_size misure
+            verify_crc: Se True, salta i record con CRC errato
+        
+        Yields:
+            Dict misura, oppure lista di misure se batch_size è indicato
+        
+        Raises:
+            IOError: Se il file non esiste o non è leggibile
+        """
+        records = measure_binary.read_records(input_path)
+        valid = measure_binary.verify_crc32(records) if verify_crc else None
+        
+        yield from self._select_measures(
+            measure_binary.iter_measures(records, valid), fields, where, batch_size
+        )
+    
     def export_measures_csv(self, measures: List[Dict], output_path: Path,
                            fields: Optional[List[str]] = None) -> bool:
         """
@@ -136,33 +401,57 @@ class IOManager:
             print("Nessuna misura da esportare")
             return False
         
+        # Timestamp per le misure che ne sono prive
+        now = datetime.now().isoformat()
+        if fields is None or 'timestamp' in fields:
+            for measure in measures:
+                measure.setdefault('timestamp', now)
+        
+        # Senza schema: unione dei campi di tutte le misure
+        return self.export_measures_csv_stream(measures, output_path, fields=fields) is not None
+    
+    def export_measures_csv_stream(self, measures: Iterable[Dict], output_path: Path,
+                                   fields: Optional[List[str]] = None,
+                                   formatters: Optional[Dict[str, Callable[[Any], str]]] = None,
+                                   modes: Optional[Iterable[Any]] = None,
+                                   default_decimals: Optional[int] = None) -> Optional[int]:
+        """
+        Esporta misure in CSV in streaming (memoria costante)
+        
+        Accetta qualsiasi iterabile (es: iter_measures_jsonl, MeasureStore.iter_measures).
+        
+        Args:
+            measures: Misure da esportare
+            output_path: Path file output
+            fields: Schema (colonne). Se None, unione dei campi di tutte le misure
+                (un iteratore viene prima copiato in uno spool temporaneo).
+            formatters: Formatter per colonna (campo -> funzione valore -> stringa)
+            modes: MeasureMode (o dict nome -> decimali) per formattare i valori
+                di misura con i decimali della modalità di ogni riga
+            default_decimals: Decimali per le modalità non indicate
+        
+        Returns:
+            Numero di misure esportate o None se errore
+        """
+        output_path = Path(output_path)
+        
         try:
-            # Determina campi
-            if fields is None:
-                # Usa tutti i campi della prima misura
-                fields = list(measures[0].keys())
-            
-            # Crea directory se non esiste
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
             with open(output_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
-                writer.writeheader()
-                
-                for measure in measures:
-                    # Aggiungi timestamp se non presente
-                    if 'timestamp' not in measure and 'timestamp' in fields:
-                        measure['timestamp'] = datetime.now().isoformat()
-                    
-                    writer.writerow(measure)
+                count = measure_csv.write_measures_csv(
+                    f, measures, fields=fields, formatters=formatters,
+                    decimals=measure_csv.mode_decimals(modes) if modes is not None else None,
+                    default_decimals=default_decimals
+                )
             
             self.last_export_path = str(output_path)
-            print(f"Esportate {len(measures)} misure in CSV: {output_path}")
-            return True
+            print(f"Esportate {count} misure in CSV: {output_path}")
+            return count
             
         except (IOError, OSError, csv.Error) as e:
             print(f"Errore export misure CSV: {e}")
-            return False
+            return None
     
     def import_measures_csv(self, input_path: Path) -> Optional[List[Dict]]:
         """
@@ -197,6 +486,421 @@ class IOManager:
             print(f"Errore import misure CSV: {e}")
             return None
     
+    def import_measures_csv_typed(self, input_path: Path,
+                                  schema: Optional[Dict[str, str]] = None,
+                                  delimiter: Optional[str] = None,
+                                  decimal: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Importa misure da CSV come colonne tipizzate (array NumPy)
+        
+        Alternativa veloce a import_measures_csv per export grandi: i valori
+        vengono convertiti per colonna invece di restare stringhe.
+        Riconosce anche il CSV del firmware e la virgola decimale.
+        
+        Args:
+            input_path: Path file input
+            schema: Tipo per colonna ('float', 'int', 'datetime', 'str'),
+                None = dedotto dai valori
+            delimiter: Separatore di campo (None = dedotto)
+            decimal: Separatore decimale (None = dedotto)
+        
+        Returns:
+            Dict colonna -> array o None se errore
+        """
+        input_path = Path(input_path)
+        
+        if not input_path.exists():
+            print(f"File non trovato: {input_path}")
+            return None
+        
+        try:
+            columns = measure_csv.read_measures_csv_columns(
+                input_path, schema=schema, delimiter=delimiter, decimal=decimal
+            )
+            
+            rows = len(next(iter(columns.values()))) if columns else 0
+            self.last_import_path = str(input_path)
+            print(f"Importate {rows} misure da CSV: {input_path}")
+            return columns
+            
+        except (IOError, OSError, csv.Error, ValueError) as e:
+            print(f"Errore import misure CSV: {e}")
+            return None
+    
+    def iter_measures_directory(self, input_dir: Path,
+                                progress_callback: Optional[Callable[[int, int], None]] = None,
+                                max_workers: Optional[int] = None,
+                                error_callback: Optional[Callable[[Path, str], None]] = None
+                                ) -> Iterator[Dict]:
+        """
+        Legge tutti i file di misure di una cartella (es: copia di /sd/sessions)
+        
+        Un pool di processi decodifica in parallelo ogni file (JSONL, CSV,
+        binario) una sola volta, a blocchi di SORT_RUN_SIZE misure ordinati
+        per timestamp e scritti in file temporanei (spill) insieme alla
+        chiave di ordinamento; i blocchi consecutivi già in ordine (come le
+        sessioni del firmware) finiscono nello stesso spill. Il processo
+        principale esegue solo il merge a k vie (heapq.merge) degli spill,
+        letti in streaming: in memoria resta un gruppo di SPILL_CHUNK misure
+        per spill.
+        
+        Un file non leggibile (anche a metà, es: archivio troncato) viene
+        escluso per intero e segnalato con error_callback.
+        
+        Args:
+            input_dir: Cartella da importare (non ricorsiva)
+            progress_callback: Chiamata con (file letti, file totali)
+            max_workers: Processi del pool. None = numero di CPU.
+            error_callback: Chiamata con (file, messaggio) per ogni file escluso
+        
+        Yields:
+            Dict misura, in ordine di timestamp
+        
+        Raises:
+            IOError: Se la cartella non esiste
+        """
+        input_dir = Path(input_dir)
+        files = self._list_measure_files(input_dir)
+        total = len(files)
+        if progress_callback:
+            progress_callback(0, total)
+        
+        workers = min(max_workers or os.cpu_count() or 1, total)
+        
+        # Gli spill vengono eliminati alla fine (o all'abbandono) del flusso
+        with tempfile.TemporaryDirectory(prefix='measure_merge_') as spill_dir:
+            tasks = [(str(path), spill_dir, SORT_RUN_SIZE) for path in files]
+            
+            if workers <= 1:
+                results = []
+                for done, task in enumerate(tasks, 1):
+                    results.append(_prepare_sorted_runs(*task))
+                    if progress_callback:
+                        progress_callback(done, total)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(_prepare_sorted_runs, *task) for task in tasks]
+                    for done, future in enumerate(as_completed(futures), 1):
+                        if progress_callback:
+                            progress_callback(done, total)
+                    results = [future.result() for future in futures]
+            
+            spills = []
+            for path, (file_spills, error) in zip(files, results):
+                if error is not None:
+                    print(f"Errore lettura {path}: {error}")
+                    if error_callback:
+                        error_callback(path, error)
+                spills.extend(file_spills)
+            
+            self.last_import_path = str(input_dir)
+            
+            sources = [_iter_spill(spill) for spill in spills]
+            for _key, measure in heapq.merge(*sources, key=lambda item: item[0]):
+                yield measure
+    
+    def _list_measure_files(self, input_dir: Path) -> List[Path]:
+        """File di misure di una cartella, in ordine di nome"""
+        if not input_dir.is_dir():
+            raise IOError(f"Cartella non trovata: {input_dir}")
+        
+        return sorted(
+            path for path in input_dir.iterdir()
+            if path.is_file() and self._measure_format(path) in self.MEASURE_FILE_SUFFIXES
+        )
+    
+    @staticmethod
+    def _measure_format(path: Path) -> str:
+        """Estensione del formato di un file di misure, ignorando la compressione"""
+        base = measure_archive.strip_compression_suffix(path)
+        # I binari vengono mappati in memoria: solo non compressi
+        if base != Path(path) and base.suffix.lower() == '.bin':
+            return ''
+        return base.suffix.lower()
+    
+    def iter_measures_file(self, input_path: Path) -> Iterator[Dict]:
+        """
+        Legge in streaming un file di misure JSONL, CSV o binario (dall'estensione)
+        
+        I file JSONL e CSV possono essere compressi (.gz, .zst). Le righe
+        CSV hanno le stesse chiavi delle misure JSONL (header del firmware
+        rinominato, mode minuscolo).
+        
+        Args:
+            input_path: Path file input
+        
+        Yields:
+            Dict misura
+        
+        Raises:
+            IOError: Se il file non esiste o non è leggibile
+            ValueError: Se il formato non è supportato
+        """
+        input_path = Path(input_path)
+        suffix = self._measure_format(input_path)
+        
+        if suffix == '.jsonl':
+            yield from self.iter_measures_jsonl(input_path)
+        elif suffix == '.csv':
+            with measure_archive.open_measure_text(input_path, newline='') as f:
+                yield from _normalize_csv_rows(csv.DictReader(f))
+        elif suffix == '.bin':
+            yield from self.iter_measures_binary(input_path)
+        else:
+            raise ValueError(f"Formato non supportato: {input_path.suffix}")
+    
+    # =====================================================================
+    # STATISTICHE
+    # =====================================================================
+    
+    def compute_measure_stats(self, source: Union[Path, Iterable[Dict]],
+                              field: str = 'value',
+                              group_by: GroupBy = None,
+                              max_workers: Optional[int] = None) -> Optional[GroupedStats]:
+        """
+        Calcola min, max, media e deviazione standard in streaming
+        
+        Args:
+            source: File di misure, cartella (file elaborati in parallelo e
+                statistiche unite) o flusso di misure (es: iter_measures_jsonl)
+            field: Campo numerico (es: 'value', 'value2')
+            group_by: Campo o tupla di campi di raggruppamento
+                (es: 'mode', 'material', 'profile')
+            max_workers: Processi per le cartelle. None = numero di CPU.
+        
+        Returns:
+            GroupedStats o None se errore
+        """
+        if not isinstance(source, (str, Path)):
+            return GroupedStats(field, group_by).update_many(source)
+        
+        source = Path(source)
+        
+        try:
+            if not source.is_dir():
+                return GroupedStats(field, group_by).update_many(self.iter_measures_file(source))
+            
+            files = [str(path) for path in self._list_measure_files(source)]
+            stats = GroupedStats(field, group_by)
+            workers = min(max_workers or os.cpu_count() or 1, len(files))
+            
+            if workers <= 1:
+                for path in files:
+                    stats.merge(_file_measure_stats(path, field, group_by))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(_file_measure_stats, path, field, group_by)
+                               for path in files]
+                    for future in as_completed(futures):
+                        stats.merge(future.result())
+            return stats
+        
+        except (IOError, OSError, ValueError, csv.Error) as e:
+            print(f"Errore calcolo statistiche misure: {e}")
+            return None
+    
+    # =====================================================================
+    # ARCHIVIO COLONNARE
+    # =====================================================================
+    
+    def open_measure_store(self, root: Path) -> Optional[MeasureStore]:
+        """
+        Apre (o crea) un archivio colonnare di misure
+        
+        Args:
+            root: Directory dell'archivio
+        
+        Returns:
+            MeasureStore o None se errore
+        """
+        try:
+            return MeasureStore(Path(root))
+        except (IOError, OSError, ValueError, KeyError) as e:
+            print(f"Errore apertura archivio misure: {e}")
+            return None
+    
+    def import_measures_to_store(self, store: MeasureStore, input_path: Path,
+                                 batch_size: int = 65536) -> Optional[int]:
+        """
+        Importa un file di misure (JSONL, CSV o binario) nell'archivio colonnare
+        
+        Il formato è dedotto dall'estensione: .jsonl, .csv, .bin
+        (JSONL e CSV anche compressi). I record binari con CRC errato
+        vengono scartati.
+        
+        Args:
+            store: Archivio di destinazione
+            input_path: Path file input
+            batch_size: Misure scritte per volta
+        
+        Returns:
+            Numero di misure importate o None se errore
+        """
+        input_path = Path(input_path)
+        
+        if not input_path.exists():
+            print(f"File non trovato: {input_path}")
+            return None
+        
+        suffix = self._measure_format(input_path)
+        
+        try:
+            if suffix == '.jsonl':
+                count = store.append_measures(self.iter_measures_jsonl(input_path), batch_size)
+            elif suffix == '.csv':
+                with measure_archive.open_measure_text(input_path, newline='') as f:
+                    count = store.append_measures(csv.DictReader(f), batch_size)
+            elif suffix == '.bin':
+                records = measure_binary.read_records(input_path)
+                count = store.append_records(records[measure_binary.verify_crc32(records)])
+            else:
+                print(f"Formato non supportato: {input_path.suffix}")
+                return None
+            
+            self.last_import_path = str(input_path)
+            print(f"Importate {count} misure nell'archivio da {input_path}")
+            return count
+            
+        except (IOError, OSError, ValueError, csv.Error) as e:
+            print(f"Errore import misure nell'archivio: {e}")
+            return None
+    
+    # =====================================================================
+    # IMPORT SENZA DUPLICATI
+    # =====================================================================
+    
+    def ingest_measures(self, source: Union[Path, Iterable[Dict]], output_path: Path,
+                        index_path: Optional[Path] = None,
+                        batch_size: int = 4096) -> Optional[Dict[str, int]]:
+        """
+        Aggiunge misure a un file JSONL saltando quelle già importate
+        
+        Le misure sono identificate da (timestamp, modalità, crc32) in un
+        indice su disco (MeasureIndex): reimportare dump SD sovrapposti o
+        sessioni BLE già ricevute non crea duplicati. Le misure nuove
+        vengono scritte (con fsync) prima di essere registrate nell'indice,
+        quindi un'interruzione non fa perdere misure.
+        
+        Args:
+            source: File di misure (JSONL, CSV, binario, anche compressi)
+                o flusso di misure (es: import_measures_session)
+            output_path: File JSONL di destinazione (append)
+            index_path: File dell'indice. None = <output_path>.keys
+            batch_size: Misure elaborate per volta
+        
+        Returns:
+            Dict con 'imported', 'duplicates' e 'invalid', o None se errore
+        """
+        output_path = Path(output_path)
+        index_path = Path(index_path) if index_path else \
+            output_path.with_name(output_path.name + '.keys')
+        
+        if isinstance(source, (str, Path)):
+            if not Path(source).exists():
+                print(f"File non trovato: {source}")
+                return None
+            source = self.iter_measures_file(Path(source))
+        
+        result = {'imported': 0, 'duplicates': 0, 'invalid': 0}
+        
+        try:
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            with MeasureIndex(index_path) as index, \
+                    open(output_path, 'a', encoding='utf-8') as f:
+                for batch in self._select_measures(source, batch_size=batch_size):
+                    keys = measure_keys(batch)
+                    valid = [i for i, key in enumerate(keys) if key is not None]
+                    result['invalid'] += len(batch) - len(valid)
+                    
+                    known = index.contains_many([keys[i] for i in valid])
+                    fresh, seen = [], set()
+                    for i, is_known in zip(valid, known):
+                        if not is_known and keys[i] not in seen:
+                            seen.add(keys[i])
+                            fresh.append(i)
+                    result['duplicates'] += len(valid) - len(fresh)
+                    
+                    if not fresh:
+                        continue
+                    
+                    f.write(''.join(
+                        json.dumps(batch[i], ensure_ascii=False) + '\n' for i in fresh
+                    ))
+                    f.flush()
+                    os.fsync(f.fileno())
+                    
+                    index.add_many([keys[i] for i in fresh])
+                    index.flush()
+                    result['imported'] += len(fresh)
+            
+            self.last_export_path = str(output_path)
+            print(f"Importate {result['imported']} misure in {output_path} "
+                  f"({result['duplicates']} duplicate, {result['invalid']} non valide)")
+            return result
+        
+        except (IOError, OSError, ValueError, csv.Error) as e:
+            print(f"Errore import misure: {e}")
+            return None
+    
+    # =====================================================================
+    # ARCHIVIO COMPRESSO SESSIONI
+    # =====================================================================
+    
+    def archive_measure_sessions(self, directory: Path,
+                                 older_than_days: int = 30,
+                                 codec: str = 'gzip',
+                                 background: bool = True) -> Optional[SessionArchiver]:
+        """
+        Comprime a blocchi le sessioni JSONL più vecchie di N giorni
+        
+        Ogni sessione diventa un archivio .jsonl.gz (o .jsonl.zst) con
+        indice dei blocchi, leggibile da tutti i lettori di IOManager.
+        
+        Args:
+            directory: Cartella delle sessioni (es: /sd/sessions)
+            older_than_days: Età minima delle sessioni da comprimere
+            codec: 'gzip' o 'zstd' (richiede il pacchetto zstandard)
+            background: Se True, la compressione avviene in un thread di servizio
+        
+        Returns:
+            SessionArchiver (archived/errors, join() per attendere) o None se errore
+        """
+        try:
+            archiver = SessionArchiver(Path(directory), older_than_days, codec)
+        except ValueError as e:
+            print(f"Errore archiviazione sessioni: {e}")
+            return None
+        
+        if background:
+            return archiver.start()
+        
+        archiver.run()
+        print(f"Archiviate {len(archiver.archived)} sessioni in {directory}")
+        return archiver
+    
+    def iter_measures_range(self, input_path: Path,
+                            start=None, end=None) -> Iterator[Dict]:
+        """
+        Legge le misure di un file JSONL (anche archiviato) in un intervallo di tempo
+        
+        Per gli archivi con indice vengono decompressi solo i blocchi che
+        intersecano l'intervallo.
+        
+        Args:
+            input_path: Path file input
+            start: Inizio intervallo (incluso), timestamp, ISO o datetime. None = nessun limite.
+            end: Fine intervallo (esclusa). None = nessun limite.
+        
+        Yields:
+            Dict misura
+        
+        Raises:
+            IOError: Se il file non esiste o non è leggibile
+            ValueError: Se un limite non è valido
+        """
+        yield from measure_archive.iter_archive_range(Path(input_path), start, end)
+    
     # =====================================================================
     # EXPORT/IMPORT CONFIGURAZIONI
     # =====================================================================
@@ -209,7 +913,8 @@ class IOManager:
         Args:
             config: Dict configurazione
             output_path: Path file output
-            create_backup: Se True, crea backup del file esistente
+            create_backup: Se True, conserva il file esistente come backup
+                (ultimi KEEP_BACKUPS, hardlink dove possibile)
         
         Returns:
             True se successo, False altrimenti
@@ -217,13 +922,6 @@ class IOManager:
         output_path = Path(output_path)
         
         try:
-            # Backup file esistente
-            if create_backup and output_path.exists():
-                timestamp = datetime.now().strftime(self.BACKUP_TIMESTAMP_FORMAT)
-                backup_path = output_path.with_suffix(f'.backup_{timestamp}.json')
-                shutil.copy2(output_path, backup_path)
-                print(f"Backup creato: {backup_path}")
-            
             # Aggiungi metadata
             export_data = {
                 "export_version": "1.0.0",
@@ -231,12 +929,14 @@ class IOManager:
                 "config": config
             }
             
-            # Crea directory se non esiste
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Scrivi JSON con indent per leggibilità
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+            # Scrittura atomica (file temporaneo + rename): un crash non
+            # lascia mai un file troncato
+            backup_path = atomic_io.atomic_write_json(
+                output_path, export_data,
+                backup=create_backup, keep_backups=self.KEEP_BACKUPS
+            )
+            if backup_path is not None:
+                print(f"Backup creato: {backup_path}")
             
             self.last_export_path = str(output_path)
             print(f"Configurazione esportata in: {output_path}")
@@ -418,6 +1118,146 @@ class IOManager:
         })
         
         return destinations
+    
+    def sync_sd_mirror(self, dest_dir: Path,
+                       source_root: Optional[Path] = None) -> Optional[Dict[str, int]]:
+        """
+        Aggiorna la copia locale della microSD (solo dati nuovi)
+        
+        Delle sessioni (sessions/*.jsonl) vengono copiati solo i byte
+        aggiunti dall'ultima sincronizzazione; di exports/ e backup/ i file
+        nuovi. Lo stato è nel manifest della cartella di destinazione.
+        
+        Args:
+            dest_dir: Cartella locale della copia
+            source_root: Radice della SD. None = SD_MOUNT_PATH.
+        
+        Returns:
+            Dict con file nuovi/aggiornati/invariati e byte copiati, o None se errore
+        """
+        source_root = Path(source_root) if source_root else Path(self.SD_MOUNT_PATH)
+        
+        try:
+            stats = SdMirror(source_root, Path(dest_dir)).sync()
+        except (IOError, OSError, ValueError) as e:
+            print(f"Errore sincronizzazione SD: {e}")
+            return None
+        
+        self.last_import_path = str(source_root)
+        print(f"Sincronizzazione SD: {stats.new_files} nuovi, "
+              f"{stats.appended_files + stats.recopied_files} aggiornati, "
+              f"{stats.unchanged_files} invariati ({stats.bytes_copied} byte)")
+        return stats.to_dict()
+
+
+# Misure per blocco ordinato in memoria nei processi del pool (iter_measures_directory)
+SORT_RUN_SIZE = 100_000
+
+# Misure per record pickle negli spill (lette insieme durante il merge)
+SPILL_CHUNK = 1024
+
+
+def _iter_buffer_lines(data: Union[bytes, bytearray]) -> Iterator[bytes]:
+    """Linee di un buffer in memoria (senza il newline finale)"""
+    start = 0
+    size = len(data)
+    while start < size:
+        end = data.find(b'\n', start)
+        if end < 0:
+            end = size
+        yield data[start:end]
+        start = end + 1
+
+
+def _normalize_csv_rows(rows: Iterable[Dict]) -> Iterator[Dict]:
+    """Righe CSV con le chiavi delle misure JSONL (es: 'Value(mm)' -> 'value')"""
+    columns = measure_csv.FIRMWARE_CSV_COLUMNS
+    for row in rows:
+        measure = {columns.get(key, key): value for key, value in row.items()}
+        mode = measure.get('mode')
+        if isinstance(mode, str):
+            measure['mode'] = mode.lower()
+        yield measure
+
+
+def _measure_sort_key(measure: Dict) -> int:
+    """Timestamp della misura per l'ordinamento (0 se assente o non valido)"""
+    value = measure.get('timestamp', measure.get('Timestamp'))
+    try:
+        return parse_timestamp(value) if value not in (None, '') else 0
+    except ValueError:
+        return 0
+
+
+def _prepare_sorted_runs(path: str, spill_dir: str,
+                         run_size: int) -> Tuple[List[str], Optional[str]]:
+    """
+    Decodifica un file di misure in blocchi ordinati per timestamp
+    
+    Funzione di modulo: viene eseguita nei processi del pool. Il file viene
+    letto una sola volta, a blocchi di run_size misure (in memoria al più
+    un blocco); ogni blocco viene ordinato e scritto come coppie
+    (timestamp, misura) in un file di spill. Un blocco che segue in ordine
+    il precedente viene aggiunto allo stesso spill, così un file già
+    ordinato produce un solo spill.
+    
+    Returns:
+        (file di spill ordinati, None) oppure ([], messaggio di errore) se il
+        file non è leggibile; gli spill parziali vengono eliminati
+    """
+    name = Path(path).name
+    spills = []
+    spill_file = None
+    last_key = None
+    
+    def flush(run):
+        nonlocal spill_file, last_key
+        run.sort(key=lambda item: item[0])
+        if spill_file is None or run[0][0] < last_key:
+            if spill_file is not None:
+                spill_file.close()
+            spill_path = os.path.join(spill_dir, f"{name}.{len(spills)}.pickle")
+            spill_file = open(spill_path, 'wb')
+            spills.append(spill_path)
+        for start in range(0, len(run), SPILL_CHUNK):
+            pickle.dump(run[start:start + SPILL_CHUNK], spill_file, pickle.HIGHEST_PROTOCOL)
+        last_key = run[-1][0]
+    
+    try:
+        try:
+            run = []
+            for measure in IOManager().iter_measures_file(path):
+                run.append((_measure_sort_key(measure), measure))
+                if len(run) >= run_size:
+                    flush(run)
+                    run = []
+            if run:
+                flush(run)
+        finally:
+            if spill_file is not None:
+                spill_file.close()
+        return spills, None
+    
+    except (IOError, OSError, ValueError, EOFError, csv.Error) as e:
+        for spill in spills:
+            os.remove(spill)
+        return [], str(e)
+
+
+def _iter_spill(spill_path: str) -> Iterator[tuple]:
+    """Coppie (timestamp, misura) di uno spill, lette un record alla volta"""
+    with open(spill_path, 'rb') as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except EOFError:
+                return
+            yield from chunk
+
+
+def _file_measure_stats(path: str, field: str, group_by: GroupBy) -> GroupedStats:
+    """Statistiche di un file (eseguita nei processi del pool)"""
+    return GroupedStats(field, group_by).update_many(IOManager().iter_measures_file(path))
 
 
 # Istanza singleton
@@ -0,0 +1,325 @@
+"""
+Esecuzione in background delle operazioni di IOManager
+
+JobRunner esegue i job su un pool di thread, così export e import grandi
+non bloccano l'interfaccia. Ogni job riceve un oggetto Job con cui:
+
+- riportare l'avanzamento (progress, o track su un flusso di misure);
+- verificare la richiesta di annullamento (cooperativo: JobCancelled
+  viene sollevata al successivo controllo).
+
+Gli eventi (avvio, avanzamento, fine, errore, annullamento) vengono
+inviati ai listener dal thread del job: la UI li inoltra con un segnale
+Qt, che li consegna nel thread dell'interfaccia.
+
+I job con lo stesso target (es: il file di destinazione) vengono
+serializzati e accorpati: al massimo uno in esecuzione e uno in attesa.
+Un nuovo job sullo stesso target sostituisce quello in attesa e chiede
+l'annullamento di quello in corso, quindi export ripetuti sullo stesso
+file eseguono solo l'ultimo.
+"""
+
+import os
+import itertools
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+
+class JobCancelled(Exception):
+    """Sollevata nel job quando ne è stato richiesto l'annullamento"""
+
+
+# Stati di un job
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+COALESCED = 'coalesced'
+
+FINAL_STATES = (DONE, FAILED, CANCELLED, COALESCED)
+
+
+@dataclass
+class JobEvent:
+    """Evento di un job (kind: uno degli stati, o 'progress')"""
+    job_id: int
+    target: str
+    kind: str
+    done: int = 0
+    total: int = 0
+    message: str = ''
+    result: Any = None
+    error: Optional[str] = None
+
+
+class Job:
+    """Job in esecuzione o in attesa nel JobRunner"""
+    
+    def __init__(self, runner: 'JobRunner', job_id: int, target: str,
+                 func: Callable, args: tuple, kwargs: Dict):
+        self.id = job_id
+        self.target = target
+        self.state = PENDING
+        self.result = None
+        self.error: Optional[str] = None
+        self.done_count = 0
+        self.total = 0
+        
+        self._runner = runner
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+    
+    def __repr__(self):
+        return f"Job({self.id}, {self.target!r}, {self.state})"
+    
+    @property
+    def cancelled(self) -> bool:
+        """True se è stato richiesto l'annullamento"""
+        return self._cancel.is_set()
+    
+    def cancel(self):
+        """Richiede l'annullamento (effettivo al prossimo controllo nel job)"""
+        self._cancel.set()
+    
+    def check_cancelled(self):
+        """
+        Raises:
+            JobCancelled: Se è stato richiesto l'annullamento
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+    
+    def progress(self, done: int, total: int = 0, message: str = ''):
+        """
+        Riporta l'avanzamento e verifica l'annullamento
+        
+        Raises:
+            JobCancelled: Se è stato richiesto l'annullamento
+        """
+        self.done_count, self.total = done, total
+        self._runner._emit(JobEvent(self.id, self.target, 'progress', done, total, message))
+        self.check_cancelled()
+    
+    def track(self, items: Iterable, total: Optional[int] = None,
+              every: int = 1000, message: str = '') -> Iterator:
+        """
+        Restituisce gli elementi di items riportando l'avanzamento ogni `every`
+        
+        Args:
+            items: Flusso da consumare (es: misure da esportare)
+            total: Numero totale, se noto (None = len(items) se disponibile)
+            every: Elementi tra due eventi di avanzamento
+            message: Testo degli eventi
+        """
+        if total is None:
+            total = len(items) if hasattr(items, '__len__') else 0
+        
+        count = 0
+        for item in items:
+            if count % every == 0:
+                self.progress(count, total, message)
+            yield item
+            count += 1
+        self.progress(count, total, message)
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attende la fine del job
+        
+        Returns:
+            True se il job è terminato
+        """
+        return self._finished.wait(timeout)
+
+
+class JobRunner:
+    """Pool di thread per i job di I/O con eventi, annullamento e accorpamento"""
+    
+    def __init__(self, max_workers: int = 2):
+        """
+        Args:
+            max_workers: Job eseguiti in parallelo (su target diversi)
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='io-job')
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._running: Dict[str, Job] = {}
+        self._pending: Dict[str, Job] = {}
+        self._listeners: List[Callable[[JobEvent], None]] = []
+    
+    def add_listener(self, callback: Callable[[JobEvent], None]):
+        """Registra una funzione chiamata per ogni evento (dal thread del job)"""
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[JobEvent], None]):
+        """Rimuove un listener"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _emit(self, event: JobEvent):
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Errore listener job: {e}")
+    
+    def submit(self, target: str, func: Callable, *args, **kwargs) -> Job:
+        """
+        Accoda un job
+        
+        Args:
+            target: Chiave di accorpamento (es: path del file di destinazione)
+            func: Funzione func(job, *args, **kwargs) eseguita nel pool
+        
+        Returns:
+            Job
+        """
+        target = str(target)
+        job = Job(self, next(self._ids), target, func, args, kwargs)
+        superseded = None
+        
+        with self._lock:
+            superseded = self._pending.pop(target, None)
+            running = self._running.get(target)
+            if running is not None:
+                # Parte quando il job in corso sullo stesso target termina
+                running.cancel()
+                self._pending[target] = job
+            else:
+                self._start(job)
+        
+        if superseded is not None:
+            self._finish(superseded, COALESCED)
+        return job
+    
+    def _start(self, job: Job):
+        """Avvia un job (chiamare con il lock)"""
+        self._running[job.target] = job
+        self._executor.submit(self._run, job)
+    
+    def _run(self, job: Job):
+        job.state = RUNNING
+        self._emit(JobEvent(job.id, job.target, RUNNING))
+        
+        try:
+            job.check_cancelled()
+            job.result = job._func(job, *job._args, **job._kwargs)
+            state = DONE
+        except JobCancelled:
+            state = CANCELLED
+        except Exception as e:
+            job.error = str(e)
+            state = FAILED
+        
+        with self._lock:
+            if self._running.get(job.target) is job:
+                del self._running[job.target]
+            following = self._pending.pop(job.target, None)
+            if following is not None:
+                self._start(following)
+        
+        self._finish(job, state)
+    
+    def _finish(self, job: Job, state: str):
+        job.state = state
+        job._func = job._args = job._kwargs = None
+        self._emit(JobEvent(job.id, job.target, state, job.done_count, job.total,
+                            result=job.result, error=job.error))
+        job._finished.set()
+    
+    def cancel(self, target: Optional[str] = None):
+        """
+        Annulla i job di un target (None = tutti), in attesa e in corso
+        """
+        with self._lock:
+            targets = [str(target)] if target is not None else \
+                list(set(self._running) | set(self._pending))
+            pending = [self._pending.pop(t) for t in targets if t in self._pending]
+            for t in targets:
+                if t in self._running:
+                    self._running[t].cancel()
+        
+        for job in pending:
+            self._finish(job, CANCELLED)
+    
+    @property
+    def active_jobs(self) -> List[Job]:
+        """Job in esecuzione e in attesa"""
+        with self._lock:
+            return list(self._running.values()) + list(self._pending.values())
+    
+    def shutdown(self, wait: bool = True):
+        """Annulla i job e chiude il pool"""
+        self.cancel()
+        self._executor.shutdown(wait=wait)
+
+
+# =========================================================================
+# JOB DI IOManager
+# =========================================================================
+
+def export_measures_job(job: Job, io_manager, measures: Iterable[Dict],
+                        output_path: Path) -> int:
+    """
+    Export misure (JSONL o CSV, dall'estensione) con avanzamento
+    
+    Il file viene scritto accanto alla destinazione e rinominato solo a
+    export completato: un job annullato o fallito non lascia file parziali.
+    
+    Returns:
+        Numero di misure esportate
+    
+    Raises:
+        ValueError: Se il formato non è supportato
+        IOError: Se l'export non riesce
+    """
+    output_path = Path(output_path)
+    suffix = output_path.suffix.lower()
+    if suffix not in ('.jsonl', '.csv'):
+        raise ValueError(f"Formato non supportato: {output_path.suffix}")
+    
+    partial = output_path.with_name(output_path.name + '.part')
+    tracked = job.track(measures, message=f"Export {output_path.name}")
+    
+    try:
+        if suffix == '.jsonl':
+            success = io_manager.export_measures_jsonl(tracked, partial, append=False)
+        else:
+            success = io_manager.export_measures_csv_stream(tracked, partial) is not None
+        if not success:
+            raise IOError(f"Export non riuscito: {output_path}")
+        
+        job.check_cancelled()
+        os.replace(partial, output_path)
+        io_manager.last_export_path = str(output_path)
+        return job.done_count
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+
+def export_config_job(job: Job, io_manager, config: Dict, output_path: Path,
+                      create_backup: bool = True) -> str:
+    """
+    Export configurazione con avanzamento
+    
+    Returns:
+        Path del file esportato
+    
+    Raises:
+        IOError: Se l'export non riesce
+    """
+    # Ultimo punto di annullamento: la scrittura è un'unica operazione
+    job.progress(0, 1, f"Export {Path(output_path).name}")
+    if not io_manager.export_config(config, Path(output_path), create_backup=create_backup):
+        raise IOError(f"Export configurazione non riuscito: {output_path}")
+    job.done_count = 1
+    return str(output_path)
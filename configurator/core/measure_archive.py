@@ -0,0 +1,425 @@
+"""
+Archivio compresso delle sessioni di misure
+
+Le sessioni più vecchie di 30 giorni (vedi docs/storage.md) vengono
+compresse a blocchi: ogni blocco di linee JSONL è un membro gzip (o un
+frame zstd) indipendente, quindi il file resta leggibile da qualsiasi
+lettore gzip/zstd come un unico flusso. Accanto all'archivio, un indice
+JSON (<file>.idx) registra per ogni blocco offset, dimensione compressa,
+numero di misure e intervallo dei timestamp: una query per intervallo
+decomprime solo i blocchi che lo intersecano.
+
+open_measure_text apre in modo trasparente file compressi e non,
+riconoscendo il formato dai magic bytes e non dall'estensione.
+"""
+
+import io
+import os
+import gzip
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime, date, timedelta
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO, Union
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+from .measure_store import parse_timestamp
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Estensione dei file compressi -> codec
+COMPRESSED_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+CODEC_SUFFIXES = {codec: suffix for suffix, codec in COMPRESSED_SUFFIXES.items()}
+
+INDEX_SUFFIX = '.idx'
+INDEX_VERSION = 1
+
+# Byte non compressi per blocco
+DEFAULT_BLOCK_SIZE = 256 * 1024
+
+TimeBound = Union[int, float, str, datetime, None]
+
+
+def _require_codec(codec: str):
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"Codec non supportato: {codec}")
+    if codec == 'zstd' and not HAS_ZSTD:
+        raise ValueError("zstandard non disponibile: installare il pacchetto 'zstandard'")
+
+
+def detect_codec(path: Union[str, Path]) -> Optional[str]:
+    """
+    Codec di compressione di un file dai primi byte
+    
+    Returns:
+        'gzip', 'zstd' o None se il file non è compresso
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if magic == ZSTD_MAGIC:
+        return 'zstd'
+    return None
+
+
+def strip_compression_suffix(path: Union[str, Path]) -> Path:
+    """Path senza l'estensione di compressione (es: 20240101.jsonl.gz -> 20240101.jsonl)"""
+    path = Path(path)
+    if path.suffix.lower() in COMPRESSED_SUFFIXES:
+        return path.with_suffix('')
+    return path
+
+
+def open_measure_binary(path: Union[str, Path]) -> BinaryIO:
+    """
+    Apre un file di misure in lettura binaria, decomprimendolo se serve
+    
+    Raises:
+        IOError: Se il file non è leggibile
+        ValueError: Se il file è zstd e zstandard non è disponibile
+    """
+    codec = detect_codec(path)
+    if codec == 'gzip':
+        return gzip.open(path, 'rb')
+    if codec == 'zstd':
+        _require_codec(codec)
+        return zstandard.ZstdDecompressor().stream_reader(
+            open(path, 'rb'), read_across_frames=True, closefd=True
+        )
+    return open(path, 'rb')
+
+
+def open_measure_text(path: Union[str, Path], newline: Optional[str] = None) -> TextIO:
+    """Apre un file di misure JSONL/CSV (anche compresso) come testo UTF-8"""
+    return io.TextIOWrapper(open_measure_binary(path), encoding='utf-8', newline=newline)
+
+
+def _compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == 'gzip':
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _line_timestamp(line: bytes) -> Optional[int]:
+    """Timestamp di una linea JSONL (None se la linea non è valida)"""
+    try:
+        value = json.loads(line).get('timestamp')
+        return None if value in (None, '') else parse_timestamp(value)
+    except (ValueError, AttributeError):
+        return None
+
+
+def index_path(archive: Union[str, Path]) -> Path:
+    """Path dell'indice dei blocchi di un archivio"""
+    archive = Path(archive)
+    return archive.with_name(archive.name + INDEX_SUFFIX)
+
+
+def write_block_archive(source: Union[str, Path], dest: Union[str, Path],
+                        codec: str = 'gzip',
+                        block_size: int = DEFAULT_BLOCK_SIZE,
+                        level: Optional[int] = None) -> Dict:
+    """
+    Comprime un file JSONL a blocchi indipendenti e ne scrive l'indice
+    
+    Archivio e indice vengono scritti su file temporanei e rinominati solo
+    a scrittura completata: un'interruzione non lascia archivi parziali.
+    
+    Args:
+        source: File JSONL da comprimere
+        dest: File archivio (es: 20240101.jsonl.gz)
+        codec: 'gzip' o 'zstd'
+        block_size: Byte non compressi per blocco (a linee intere)
+        level: Livello di compressione. None = 6 per gzip, 3 per zstd.
+    
+    Returns:
+        Indice dell'archivio
+    
+    Raises:
+        IOError: Se i file non sono leggibili/scrivibili
+        ValueError: Se il codec non è disponibile
+    """
+    _require_codec(codec)
+    if level is None:
+        level = 6 if codec == 'gzip' else 3
+    source, dest = Path(source), Path(dest)
+    
+    blocks = []
+    tmp_dest = dest.with_name(dest.name + '.tmp')
+    
+    with open(source, 'rb') as src, open(tmp_dest, 'wb') as out:
+        lines, size, count = [], 0, 0
+        ts_min = ts_max = None
+        
+        def write_block():
+            data = _compress(b''.join(lines), codec, level)
+            blocks.append({
+                'offset': out.tell(),
+                'size': len(data),
+                'count': count,
+                'ts_min': ts_min,
+                'ts_max': ts_max,
+            })
+            out.write(data)
+        
+        for line in src:
+            if not line.strip():
+                continue
+            if not line.endswith(b'\n'):
+                line += b'\n'
+            lines.append(line)
+            size += len(line)
+            timestamp = _line_timestamp(line)
+            if timestamp is not None:
+                count += 1
+                ts_min = timestamp if ts_min is None else min(ts_min, timestamp)
+                ts_max = timestamp if ts_max is None else max(ts_max, timestamp)
+            
+            if size >= block_size:
+                write_block()
+                lines, size, count = [], 0, 0
+                ts_min = ts_max = None
+        
+        if lines:
+            write_block()
+        
+        out.flush()
+        os.fsync(out.fileno())
+        archive_size = out.tell()
+    
+    index = {
+        'version': INDEX_VERSION,
+        'codec': codec,
+        'source': source.name,
+        'size': archive_size,
+        'blocks': blocks,
+    }
+    
+    idx = index_path(dest)
+    tmp_idx = idx.with_name(idx.name + '.tmp')
+    with open(tmp_idx, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    
+    os.replace(tmp_dest, dest)
+    os.replace(tmp_idx, idx)
+    return index
+
+
+def read_index(archive: Union[str, Path]) -> Optional[Dict]:
+    """
+    Indice dei blocchi di un archivio
+    
+    Returns:
+        Indice, o None se assente, illeggibile o non corrispondente all'archivio
+    """
+    archive = Path(archive)
+    try:
+        with open(index_path(archive), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION or index.get('size') != archive.stat().st_size:
+            return None
+        return index
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def iter_archive_range(archive: Union[str, Path],
+                       start: TimeBound = None,
+                       end: TimeBound = None) -> Iterator[Dict]:
+    """
+    Misure di un file (compresso o no) in un intervallo di tempo
+    
+    Con un indice valido vengono letti e decompressi solo i blocchi che
+    intersecano l'intervallo; altrimenti il file viene letto per intero.
+    
+    Args:
+        archive: File di misure JSONL (anche .gz/.zst)
+        start: Inizio intervallo (incluso). None = nessun limite.
+        end: Fine intervallo (esclusa). None = nessun limite.
+    
+    Yields:
+        Dict misura (le misure senza timestamp valido sono escluse)
+    
+    Raises:
+        IOError: Se il file non è leggibile
+        ValueError: Se un limite non è valido o il codec non è disponibile
+    """
+    start = None if start is None else parse_timestamp(start)
+    end = None if end is None else parse_timestamp(end)
+    
+    def in_range(measure: Dict) -> bool:
+        try:
+            timestamp = parse_timestamp(measure['timestamp'])
+        except (KeyError, ValueError):
+            return False
+        return (start is None or timestamp >= start) and (end is None or timestamp < end)
+    
+    def parse(lines) -> Iterator[Dict]:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                measure = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(measure, dict) and in_range(measure):
+                yield measure
+    
+    index = read_index(archive)
+    if index is None:
+        with open_measure_binary(archive) as f:
+            yield from parse(f)
+        return
+    
+    codec = index['codec']
+    _require_codec(codec)
+    with open(archive, 'rb') as f:
+        for block in index['blocks']:
+            if block['ts_min'] is not None:
+                if end is not None and block['ts_min'] >= end:
+                    continue
+                if start is not None and block['ts_max'] < start:
+                    continue
+            f.seek(block['offset'])
+            yield from parse(_decompress(f.read(block['size']), codec).splitlines())
+
+
+def archive_session(path: Union[str, Path], codec: str = 'gzip',
+                    block_size: int = DEFAULT_BLOCK_SIZE,
+                    remove_source: bool = True) -> Path:
+    """
+    Comprime una sessione JSONL accanto all'originale (es: .jsonl -> .jsonl.gz)
+    
+    L'archivio mantiene la data di modifica dell'originale, che viene
+    rimosso solo dopo la scrittura completa di archivio e indice.
+    
+    Returns:
+        Path dell'archivio
+    """
+    path = Path(path)
+    dest = path.with_name(path.name + CODEC_SUFFIXES.get(codec, ''))
+    write_block_archive(path, dest, codec, block_size)
+    
+    stat = path.stat()
+    os.utime(dest, (stat.st_atime, stat.st_mtime))
+    if remove_source:
+        path.unlink()
+    return dest
+
+
+class SessionArchiver:
+    """Job in background che comprime le sessioni più vecchie di N giorni"""
+    
+    FILENAME_DATE_FORMAT = "%Y%m%d"
+    
+    def __init__(self, directory: Path,
+                 older_than_days: int = 30,
+                 codec: str = 'gzip',
+                 block_size: int = DEFAULT_BLOCK_SIZE,
+                 remove_source: bool = True,
+                 clock=time.time):
+        """
+        Args:
+            directory: Cartella delle sessioni (es: /sd/sessions)
+            older_than_days: Età minima (giorni) delle sessioni da comprimere
+            codec: 'gzip' o 'zstd'
+            block_size: Byte non compressi per blocco
+            remove_source: Se True, rimuove il JSONL dopo la compressione
+            clock: Sorgente del tempo (secondi Unix)
+        
+        Raises:
+            ValueError: Se il codec non è disponibile
+        """
+        _require_codec(codec)
+        self.directory = Path(directory)
+        self.older_than_days = older_than_days
+        self.codec = codec
+        self.block_size = block_size
+        self.remove_source = remove_source
+        self.clock = clock
+        
+        self.archived: List[Path] = []
+        self.errors: List[str] = []
+        
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _session_day(self, path: Path) -> date:
+        """Giorno della sessione dal nome (YYYYMMDD.jsonl) o dalla data di modifica"""
+        try:
+            return datetime.strptime(path.stem, self.FILENAME_DATE_FORMAT).date()
+        except ValueError:
+            return datetime.fromtimestamp(path.stat().st_mtime).date()
+    
+    def candidates(self) -> List[Path]:
+        """Sessioni JSONL non compresse più vecchie della soglia"""
+        if not self.directory.is_dir():
+            return []
+        limit = datetime.fromtimestamp(self.clock()).date() - timedelta(days=self.older_than_days)
+        return sorted(
+            path for path in self.directory.glob('*.jsonl')
+            if path.is_file() and self._session_day(path) < limit
+        )
+    
+    def run(self) -> List[Path]:
+        """
+        Comprime le sessioni candidate (nel thread chiamante)
+        
+        Returns:
+            Archivi creati
+        """
+        for path in self.candidates():
+            if self._stop.is_set():
+                break
+            try:
+                self.archived.append(
+                    archive_session(path, self.codec, self.block_size, self.remove_source)
+                )
+            except (IOError, OSError, ValueError) as e:
+                self.errors.append(f"{path}: {e}")
+                print(f"Errore archiviazione sessione {path}: {e}")
+        return self.archived
+    
+    def start(self) -> 'SessionArchiver':
+        """Avvia la compressione in un thread di servizio"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Interrompe il job dopo la sessione in corso"""
+        self._stop.set()
+    
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attende la fine del job
+        
+        Returns:
+            True se il job è terminato
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+    
+    @property
+    def running(self) -> bool:
+        """True se il job è in esecuzione"""
+        return self._thread is not None and self._thread.is_alive()
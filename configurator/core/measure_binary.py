@@ -0,0 +1,317 @@
+"""
+Lettura/scrittura delle misure in formato binario del firmware.
+
+Un file binario (es: /sd/backup/backup_YYYYMMDD.bin) è la sequenza dei
+record measurement_record_t di storage_manager.h, little-endian, senza
+header:
+
+    uint32  timestamp       Unix timestamp
+    int32   mode            0=calibro, 1=vetri, 2=astine, 3=fermavetri
+    float   value_mm
+    float   value2_mm
+    char    material[32]
+    char    profile[48]
+    char    notes[64]
+    uint32  crc32           CRC32 (come esp_crc32_le) di timestamp, mode,
+                            valori e delle stringhe fino al terminatore
+
+I file vengono mappati in memoria (np.memmap) e decodificati senza copie;
+il CRC viene verificato su tutto l'array in modo vettoriale, a blocchi,
+così anche archivi di più GB restano gestibili.
+"""
+
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+# Nomi modalità nell'ordine di measure_mode_t
+MODE_NAMES = ['calibro', 'vetri', 'astine', 'fermavetri']
+
+RECORD_SIZE = 164
+
+# Byte coperti dal CRC: campi numerici e stringhe (offset, dimensione)
+_CRC_PREFIX = 16
+_STRING_FIELDS = (('material', 16, 32), ('profile', 48, 48), ('notes', 96, 64))
+
+# Record elaborati per blocco nel calcolo del CRC (limita la memoria temporanea)
+CRC_BLOCK_RECORDS = 1 << 18
+
+if HAS_NUMPY:
+    RECORD_DTYPE = np.dtype([
+        ('timestamp', '<u4'),
+        ('mode', '<i4'),
+        ('value_mm', '<f4'),
+        ('value2_mm', '<f4'),
+        ('material', 'S32'),
+        ('profile', 'S48'),
+        ('notes', 'S64'),
+        ('crc32', '<u4'),
+    ])
+    assert RECORD_DTYPE.itemsize == RECORD_SIZE
+    
+    def _crc_table() -> "np.ndarray":
+        """Tabella CRC32 (polinomio riflesso 0xEDB88320)"""
+        table = np.arange(256, dtype=np.uint32)
+        for _ in range(8):
+            table = np.where(table & 1, (table >> 1) ^ np.uint32(0xEDB88320), table >> 1)
+        return table.astype(np.uint32)
+    
+    _CRC_TABLE = _crc_table()
+
+
+def _require_numpy():
+    if not HAS_NUMPY:
+        raise ValueError("NumPy non disponibile: formato binario non supportato")
+
+
+def _crc_update(crc: "np.ndarray", column: "np.ndarray") -> "np.ndarray":
+    """Aggiorna i CRC di tutti i record con un byte ciascuno"""
+    return _CRC_TABLE[(crc ^ column) & 0xFF] ^ (crc >> 8)
+
+
+def _crc_block(raw: "np.ndarray") -> "np.ndarray":
+    """CRC32 di un blocco di record (array uint8 di forma (n, RECORD_SIZE))"""
+    crc = np.full(raw.shape[0], 0xFFFFFFFF, dtype=np.uint32)
+    
+    for k in range(_CRC_PREFIX):
+        crc = _crc_update(crc, raw[:, k])
+    
+    for _name, offset, size in _STRING_FIELDS:
+        field = raw[:, offset:offset + size]
+        # strlen: posizione del primo terminatore (campo pieno se assente)
+        is_nul = field == 0
+        lengths = np.where(is_nul.any(axis=1), is_nul.argmax(axis=1), size)
+        
+        max_length = int(lengths.max(initial=0))
+        if max_length == 0:
+            continue
+        
+        # Record ordinati per lunghezza: al byte k restano attivi solo
+        # quelli in coda, quindi il costo è proporzionale ai byte effettivi
+        order = np.argsort(lengths, kind='stable')
+        sorted_lengths = lengths[order]
+        sorted_field = field[order]
+        sorted_crc = crc[order]
+        
+        for k in range(max_length):
+            start = np.searchsorted(sorted_lengths, k, side='right')
+            sorted_crc[start:] = _crc_update(sorted_crc[start:], sorted_field[start:, k])
+        
+        crc[order] = sorted_crc
+    
+    return crc ^ np.uint32(0xFFFFFFFF)
+
+
+def compute_crc32(records: "np.ndarray") -> "np.ndarray":
+    """
+    Calcola il CRC32 di ogni record (stesso algoritmo del firmware)
+    
+    Args:
+        records: Array con dtype RECORD_DTYPE
+    
+    Returns:
+        Array uint32 con un CRC per record
+    """
+    _require_numpy()
+    records = np.ascontiguousarray(records, dtype=RECORD_DTYPE)
+    raw = records.view(np.uint8).reshape(-1, RECORD_SIZE)
+    
+    result = np.empty(len(records), dtype=np.uint32)
+    for start in range(0, len(records), CRC_BLOCK_RECORDS):
+        result[start:start + CRC_BLOCK_RECORDS] = _crc_block(raw[start:start + CRC_BLOCK_RECORDS])
+    return result
+
+
+def verify_crc32(records: "np.ndarray") -> "np.ndarray":
+    """
+    Verifica l'integrità dei record
+    
+    Args:
+        records: Array con dtype RECORD_DTYPE
+    
+    Returns:
+        Array booleano: True per i record con CRC corretto
+    """
+    return compute_crc32(records) == records['crc32']
+
+
+def read_records(path: Union[str, Path], use_mmap: bool = True) -> "np.ndarray":
+    """
+    Legge un file binario di misure
+    
+    Un eventuale record finale incompleto (scrittura interrotta) viene ignorato.
+    
+    Args:
+        path: File da leggere
+        use_mmap: Se True mappa il file in memoria (sola lettura, senza copie)
+    
+    Returns:
+        Array con dtype RECORD_DTYPE
+    
+    Raises:
+        IOError: Se il file non è leggibile
+        ValueError: Se NumPy non è disponibile
+    """
+    _require_numpy()
+    path = Path(path)
+    count = path.stat().st_size // RECORD_SIZE
+    
+    if count == 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    
+    if use_mmap:
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+    return np.fromfile(path, dtype=RECORD_DTYPE, count=count)
+
+
+def _encode(text, size: int) -> bytes:
+    """Stringa C a dimensione fissa (troncata lasciando spazio al terminatore)"""
+    if isinstance(text, bytes):
+        data = text
+    else:
+        data = str(text or '').encode('utf-8')
+    return data[:size - 1]
+
+
+def _mode_index(mode) -> int:
+    if isinstance(mode, str):
+        mode = mode.lower()
+        if mode not in MODE_NAMES:
+            raise ValueError(f"Modalità sconosciuta: {mode}")
+        return MODE_NAMES.index(mode)
+    return int(mode)
+
+
+def parse_timestamp(value) -> int:
+    """Converte timestamp Unix, datetime o stringa (ISO o formato CSV firmware)"""
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+    
+    text = str(value).strip()
+    try:
+        return int(float(text))
+    except ValueError:
+        pass
+    try:
+        return int(datetime.fromisoformat(text).timestamp())
+    except ValueError:
+        raise ValueError(f"Timestamp non valido: {value}")
+
+
+def measures_to_records(measures: Iterable[Dict]) -> "np.ndarray":
+    """
+    Converte misure (formato JSONL del firmware) in record binari con CRC
+    
+    Accetta le chiavi 'value'/'value2' del JSONL o 'value_mm'/'value2_mm';
+    il timestamp può essere Unix o ISO (come scritto da IOManager).
+    
+    Args:
+        measures: Misure da convertire
+    
+    Returns:
+        Array con dtype RECORD_DTYPE
+    
+    Raises:
+        ValueError: Se una misura non è convertibile
+    """
+    _require_numpy()
+    rows = []
+    for m in measures:
+        try:
+            rows.append((
+                parse_timestamp(m.get('timestamp', 0)),
+                _mode_index(m.get('mode', 0)),
+                float(m.get('value_mm', m.get('value', 0.0))),
+                float(m.get('value2_mm', m.get('value2', 0.0))),
+                _encode(m.get('material'), 32),
+                _encode(m.get('profile'), 48),
+                _encode(m.get('notes'), 64),
+                0,
+            ))
+        except (TypeError, AttributeError) as e:
+            raise ValueError(f"Misura non valida: {e}")
+    
+    records = np.array(rows, dtype=RECORD_DTYPE)
+    records['crc32'] = compute_crc32(records)
+    return records
+
+
+def write_records(path: Union[str, Path], records: "np.ndarray", append: bool = False):
+    """
+    Scrive record binari su file
+    
+    Args:
+        path: File di destinazione
+        records: Array con dtype RECORD_DTYPE
+        append: Se True, aggiunge in coda al file esistente
+    
+    Raises:
+        IOError: Se il file non è scrivibile
+    """
+    _require_numpy()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    
+    with open(path, 'ab' if append else 'wb') as f:
+        np.ascontiguousarray(records, dtype=RECORD_DTYPE).tofile(f)
+
+
+def _decode(value: bytes) -> str:
+    return value.split(b'\0', 1)[0].decode('utf-8', errors='replace')
+
+
+def decode_strings(values: "np.ndarray") -> "np.ndarray":
+    """
+    Decodifica un campo stringa (es: records['material']) in array di str
+    
+    Ogni valore distinto viene decodificato una sola volta.
+    
+    Args:
+        values: Array di bytes a dimensione fissa
+    
+    Returns:
+        Array di oggetti str
+    """
+    uniques, inverse = np.unique(np.asarray(values), return_inverse=True)
+    decoded = np.array([_decode(v) for v in uniques.tolist()], dtype=object)
+    return decoded[inverse.reshape(-1)]
+
+
+def iter_measures(records: "np.ndarray", valid: Optional["np.ndarray"] = None,
+                  batch_size: int = 4096) -> Iterator[Dict]:
+    """
+    Converte record binari in misure (stesse chiavi del JSONL del firmware)
+    
+    Args:
+        records: Array con dtype RECORD_DTYPE (anche memmap)
+        valid: Maschera dei record da includere. None = tutti.
+        batch_size: Record decodificati per volta
+    
+    Yields:
+        Dict misura
+    """
+    for start in range(0, len(records), batch_size):
+        block = np.asarray(records[start:start + batch_size])
+        if valid is not None:
+            block = block[valid[start:start + batch_size]]
+        
+        for ts, mode, v1, v2, material, profile, notes, crc in block.tolist():
+            yield {
+                'timestamp': ts,
+                'mode': MODE_NAMES[mode] if 0 <= mode < len(MODE_NAMES) else mode,
+                'value': v1,
+                'value2': v2,
+                'material': _decode(material),
+                'profile': _decode(profile),
+                'notes': _decode(notes),
+                'crc32': crc,
+            }
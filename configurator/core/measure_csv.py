@@ -0,0 +1,470 @@
+"""
+Export e import CSV delle misure
+
+Export: write_measures_csv accetta qualsiasi iterabile di misure e scrive una riga
+alla volta, quindi la memoria usata non dipende dal numero di misure.
+L'header è lo schema dichiarato oppure l'unione dei campi di tutte le
+misure: per un iteratore le misure vengono prima copiate in un file
+temporaneo (in memoria finché piccolo) mentre si raccolgono i campi,
+poi riscritte da lì.
+
+I valori passano per un formatter per colonna; i valori di misura usano
+i decimali della modalità (MeasureMode.decimali) della riga.
+
+Import tipizzato: read_measures_csv_columns converte intere colonne in
+array NumPy (float, int, datetime64, stringhe) invece di una stringa per
+campo, riconoscendo separatore, virgola decimale italiana e il dialetto
+CSV del firmware (Timestamp,Mode,Value(mm),...).
+"""
+
+import io
+import re
+import csv
+import pickle
+import tempfile
+from itertools import repeat
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Mapping,
+    Optional, Sequence, TextIO, Tuple, Union
+)
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+Formatter = Callable[[Any], str]
+
+# Campi di misura formattati con i decimali della modalità
+VALUE_FIELDS = ('value', 'value2', 'value_mm', 'value2_mm')
+
+# Oltre questa dimensione lo spool delle misure passa su disco
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# Misure serializzate insieme nello spool
+SPOOL_BATCH = 1024
+
+
+def decimal_formatter(decimals: int) -> Formatter:
+    """
+    Formatter a decimali fissi (valori non numerici scritti così come sono)
+    
+    Args:
+        decimals: Cifre decimali
+    
+    Returns:
+        Funzione valore -> stringa
+    """
+    pattern = f"{{:.{int(decimals)}f}}"
+    
+    def format_value(value) -> str:
+        if value is None or value == '':
+            return ''
+        try:
+            return pattern.format(float(value))
+        except (TypeError, ValueError):
+            return str(value)
+    
+    return format_value
+
+
+def _format_plain(value) -> str:
+    return '' if value is None else str(value)
+
+
+def mode_decimals(modes: Union[Iterable[Any], Mapping[str, int]]) -> Dict[str, int]:
+    """
+    Decimali per modalità
+    
+    Args:
+        modes: Oggetti MeasureMode (si usano id, nome e decimali) o dict nome -> decimali
+    
+    Returns:
+        Dict modalità (minuscolo) -> decimali
+    """
+    if isinstance(modes, Mapping):
+        return {str(name).lower(): int(decimals) for name, decimals in modes.items()}
+    
+    result = {}
+    for mode in modes:
+        for name in (getattr(mode, 'id', None), getattr(mode, 'nome', None)):
+            if name:
+                result[str(name).lower()] = int(mode.decimali)
+    return result
+
+
+def scan_fields(measures: Iterable[Dict]) -> Tuple[List[str], Iterable[Dict]]:
+    """
+    Unione dei campi di tutte le misure, nell'ordine in cui compaiono
+    
+    Le sequenze (liste) vengono lette due volte; gli iteratori vengono
+    copiati in uno spool temporaneo da cui rileggerli.
+    
+    Returns:
+        (campi, misure da scrivere)
+    """
+    fields = {}
+    
+    if isinstance(measures, Sequence):
+        for measure in measures:
+            for key in measure:
+                fields.setdefault(key, None)
+        return list(fields), measures
+    
+    # Un pickle indipendente per gruppo di misure: memoria limitata al gruppo
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    batch = []
+    for measure in measures:
+        for key in measure:
+            fields.setdefault(key, None)
+        batch.append(measure)
+        if len(batch) >= SPOOL_BATCH:
+            pickle.dump(batch, spool, protocol=pickle.HIGHEST_PROTOCOL)
+            batch = []
+    if batch:
+        pickle.dump(batch, spool, protocol=pickle.HIGHEST_PROTOCOL)
+    
+    return list(fields), _replay_spool(spool)
+
+
+def _replay_spool(spool) -> Iterator[Dict]:
+    """Rilegge le misure dallo spool e lo chiude"""
+    try:
+        spool.seek(0)
+        while True:
+            try:
+                batch = pickle.load(spool)
+            except EOFError:
+                break
+            yield from batch
+    finally:
+        spool.close()
+
+
+def write_measures_csv(f: TextIO, measures: Iterable[Dict],
+                       fields: Optional[List[str]] = None,
+                       formatters: Optional[Dict[str, Formatter]] = None,
+                       decimals: Optional[Dict[str, int]] = None,
+                       default_decimals: Optional[int] = None,
+                       delimiter: str = ',') -> int:
+    """
+    Scrive misure in CSV una riga alla volta
+    
+    Args:
+        f: File di testo aperto con newline=''
+        measures: Misure (qualsiasi iterabile)
+        fields: Schema (colonne). None = unione dei campi delle misure.
+        formatters: Formatter per colonna (hanno la precedenza)
+        decimals: Decimali per modalità (vedi mode_decimals), usati per VALUE_FIELDS
+        default_decimals: Decimali per le modalità non presenti in decimals
+        delimiter: Separatore di campo
+    
+    Returns:
+        Numero di righe scritte
+    """
+    if fields is None:
+        fields, measures = scan_fields(measures)
+    
+    formatters = formatters or {}
+    decimals = decimals or {}
+    by_decimals: Dict[Optional[int], Formatter] = {None: _format_plain}
+    
+    def value_formatter(places: Optional[int]) -> Formatter:
+        formatter = by_decimals.get(places)
+        if formatter is None:
+            formatter = by_decimals[places] = decimal_formatter(places)
+        return formatter
+    
+    # Colonne: (campo, formatter fisso o None se dipende dalla modalità della riga)
+    columns = []
+    for name in fields:
+        if name in formatters:
+            columns.append((name, formatters[name]))
+        elif name in VALUE_FIELDS and decimals:
+            columns.append((name, None))
+        elif name in VALUE_FIELDS and default_decimals is not None:
+            columns.append((name, value_formatter(default_decimals)))
+        else:
+            columns.append((name, _format_plain))
+    per_mode = any(formatter is None for _name, formatter in columns)
+    
+    writer = csv.writer(f, delimiter=delimiter)
+    writer.writerow(fields)
+    
+    count = 0
+    for measure in measures:
+        if per_mode:
+            mode = measure.get('mode')
+            places = decimals.get(str(mode).lower(), default_decimals)
+            mode_formatter = value_formatter(places)
+        get = measure.get
+        writer.writerow([
+            (formatter or mode_formatter)(get(name)) for name, formatter in columns
+        ])
+        count += 1
+    
+    return count
+
+
+# =========================================================================
+# IMPORT TIPIZZATO
+# =========================================================================
+
+COLUMN_TYPES = ('float', 'int', 'datetime', 'str')
+
+# Header del CSV firmware (storage_export_csv) -> nomi del JSONL
+FIRMWARE_CSV_COLUMNS = {
+    'Timestamp': 'timestamp',
+    'Mode': 'mode',
+    'Value(mm)': 'value',
+    'Value2(mm)': 'value2',
+    'Material': 'material',
+    'Profile': 'profile',
+    'Notes': 'notes',
+}
+
+FIRMWARE_CSV_SCHEMA = {
+    'timestamp': 'datetime',
+    'mode': 'str',
+    'value': 'float',
+    'value2': 'float',
+    'material': 'str',
+    'profile': 'str',
+    'notes': 'str',
+}
+
+# Valori esaminati per dedurre il tipo di una colonna
+INFER_SAMPLE = 200
+
+_INT_RE = re.compile(r'^[+-]?\d+$')
+_FLOAT_RE = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+_DATETIME_RE = re.compile(r'^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?$')
+# Numero italiano: punto solo come separatore delle migliaia ('1.188,5')
+_ITALIAN_RE = re.compile(r'^[+-]?(\d{1,3}(\.\d{3})+|\d+)(,\d*)?$')
+
+
+def _sniff_delimiter(sample: str) -> str:
+    """Separatore di campo tra , ; e tab (',' se non determinabile)"""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=',;\t').delimiter
+    except csv.Error:
+        return ','
+
+
+def _sample(values: Sequence[str]) -> List[str]:
+    """Primi valori non vuoti di una colonna"""
+    return [v for v in values[:INFER_SAMPLE * 4] if v][:INFER_SAMPLE]
+
+
+def _italian_to_float_text(text: str) -> str:
+    """
+    '1.188,5' -> '1188.5'
+    
+    Raises:
+        ValueError: Se il punto non separa le migliaia (es: '1.5')
+    """
+    if '.' in text and not _ITALIAN_RE.match(text):
+        raise ValueError(f"Numero non in formato italiano: {text}")
+    return text.replace('.', '').replace(',', '.')
+
+
+def _column_decimal(name: str, values: Sequence[str]) -> str:
+    """
+    Separatore decimale di una colonna numerica
+    
+    La virgola viene usata solo se tutti i valori con la virgola sono numeri
+    italiani e nessun valore ha il solo punto: '1.500' può essere 1500 o
+    1,5, quindi una colonna che mescola '2,5' e '1.5' non viene indovinata.
+    
+    Raises:
+        ValueError: Se la colonna mescola virgola e punto decimale
+    """
+    commas = [v for v in values if ',' in v]
+    if not commas or not all(_ITALIAN_RE.match(v) for v in commas):
+        return '.'
+    dots = [v for v in values if '.' in v and ',' not in v and _FLOAT_RE.match(v)]
+    if dots:
+        raise ValueError(
+            f"Colonna {name}: separatore decimale ambiguo "
+            f"('{commas[0]}' e '{dots[0]}'), indicare decimal"
+        )
+    return ','
+
+
+def _infer_type(values: Sequence[str], decimal: str = '.') -> str:
+    """Tipo di una colonna dai primi valori non vuoti"""
+    sample = _sample(values)
+    if not sample:
+        return 'str'
+    if all(_INT_RE.match(v) for v in sample):
+        return 'int'
+    # Con la virgola decimale un valore come '1.5' resta numerico: la
+    # conversione lo rifiuta invece di leggerlo come 15
+    if all(_FLOAT_RE.match(v) or (decimal == ',' and _ITALIAN_RE.match(v)) for v in sample):
+        return 'float'
+    if all(_DATETIME_RE.match(v) for v in sample):
+        return 'datetime'
+    return 'str'
+
+
+def _parse_float(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def _parse_datetime(text: str) -> "np.datetime64":
+    try:
+        return np.datetime64(text, 's')
+    except ValueError:
+        return np.datetime64('NaT', 's')
+
+
+def _to_float(values: Sequence[str], decimal: str) -> "np.ndarray":
+    """
+    Colonna di testo -> float64 (vuoti e non numerici = NaN)
+    
+    Raises:
+        ValueError: Con decimal ',' se un valore usa il punto decimale
+    """
+    if decimal == ',':
+        values = list(map(_italian_to_float_text, values))
+    try:
+        # Conversione diretta da lista di stringhe: la più veloce
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        return np.fromiter(map(_parse_float, values), dtype=np.float64, count=len(values))
+
+
+def _to_int(values: Sequence[str], decimal: str) -> "np.ndarray":
+    """Colonna di testo -> int64 (float64 se ci sono vuoti o non interi)"""
+    try:
+        return np.array(values, dtype=np.int64)
+    except (ValueError, OverflowError):
+        return _to_float(values, decimal)
+
+
+def _to_datetime(values: Sequence[str], decimal: str) -> "np.ndarray":
+    """Colonna di testo -> datetime64[s] (ora locale del file, vuoti = NaT)"""
+    try:
+        return np.array(values, dtype='datetime64[s]')
+    except ValueError:
+        return np.array([_parse_datetime(v) for v in values], dtype='datetime64[s]')
+
+
+def _to_str(values: Sequence[str], decimal: str) -> "np.ndarray":
+    return np.array(values, dtype=object)
+
+
+def _split_columns(text: str, delimiter: str) -> Tuple[List[str], List[List[str]]]:
+    """
+    Divide il testo CSV in header e colonne
+    
+    Senza virgolette e con righe tutte della stessa larghezza (come gli
+    export del firmware) il testo viene diviso con str.split e le colonne
+    sono slice della lista piatta dei campi; altrimenti si usa csv.reader
+    sul testo intero (i campi tra virgolette possono contenere newline) e
+    le righe incomplete vengono completate con valori vuoti.
+    
+    Raises:
+        ValueError: Se il file è vuoto
+    """
+    if '"' not in text:
+        lines = [line for line in text.splitlines() if line]
+        if not lines:
+            raise ValueError("File CSV vuoto")
+        header = lines[0].split(delimiter)
+        width = len(header)
+        counts = np.fromiter(map(str.count, lines, repeat(delimiter)), dtype=np.int64, count=len(lines))
+        if (counts == width - 1).all():
+            fields = delimiter.join(lines[1:]).split(delimiter) if len(lines) > 1 else []
+            return header, [fields[i::width] for i in range(width)]
+    
+    rows = [row for row in csv.reader(io.StringIO(text), delimiter=delimiter) if row]
+    if not rows:
+        raise ValueError("File CSV vuoto")
+    header = rows[0]
+    width = len(header)
+    data = [
+        row[:width] if len(row) >= width else row + [''] * (width - len(row))
+        for row in rows[1:]
+    ]
+    return header, [list(column) for column in zip(*data)] if data else [[] for _ in header]
+
+
+_CONVERTERS = {
+    'float': _to_float,
+    'int': _to_int,
+    'datetime': _to_datetime,
+    'str': _to_str,
+}
+
+
+def read_measures_csv_columns(source: Union[str, Path, TextIO],
+                              schema: Optional[Dict[str, str]] = None,
+                              delimiter: Optional[str] = None,
+                              decimal: Optional[str] = None) -> Dict[str, "np.ndarray"]:
+    """
+    Legge un CSV di misure come colonne tipizzate
+    
+    Il testo viene diviso in colonne (csv.reader solo se il file usa le
+    virgolette o ha righe irregolari) e ogni colonna è poi convertita in
+    un'unica operazione NumPy.
+    
+    Args:
+        source: Path del file o file di testo aperto
+        schema: Tipo per colonna ('float', 'int', 'datetime', 'str');
+            le colonne non indicate vengono dedotte dai valori
+        delimiter: Separatore di campo. None = dedotto (',' ';' o tab).
+        decimal: Separatore decimale ('.' o ','). None = dedotto per
+            colonna: ',' se il separatore di campo non è la virgola e i
+            numeri della colonna la usano.
+    
+    Returns:
+        Dict colonna -> array (colonne del CSV firmware rinominate come nel JSONL)
+    
+    Raises:
+        ValueError: Se NumPy non è disponibile, il file è vuoto, un tipo non
+            è valido o una colonna mescola virgola e punto decimale
+    """
+    if not HAS_NUMPY:
+        raise ValueError("NumPy non disponibile: import tipizzato non supportato")
+    
+    if isinstance(source, (str, Path)):
+        with open(source, 'r', newline='', encoding='utf-8-sig') as f:
+            text = f.read()
+    else:
+        text = source.read()
+    
+    if delimiter is None:
+        delimiter = _sniff_delimiter(text[:8192])
+    
+    header, columns = _split_columns(text, delimiter)
+    del text
+    
+    firmware = all(name in FIRMWARE_CSV_COLUMNS for name in header)
+    if firmware:
+        header = [FIRMWARE_CSV_COLUMNS[name] for name in header]
+        schema = dict(FIRMWARE_CSV_SCHEMA, **(schema or {}))
+    schema = schema or {}
+    
+    result = {}
+    for name, values in zip(header, columns):
+        column_decimal = decimal
+        if column_decimal is None:
+            numeric = schema.get(name, 'float') in ('float', 'int')
+            column_decimal = _column_decimal(name, values) if numeric and delimiter != ',' else '.'
+        
+        column_type = schema.get(name) or _infer_type(values, column_decimal)
+        if column_type not in _CONVERTERS:
+            raise ValueError(f"Tipo colonna non valido per {name}: {column_type}")
+        result[name] = _CONVERTERS[column_type](values, column_decimal)
+    
+    if firmware and 'mode' in result:
+        lower = {mode: mode.lower() for mode in set(result['mode'])}
+        result['mode'] = np.array(list(map(lower.__getitem__, result['mode'])), dtype=object)
+    
+    return result
@@ -0,0 +1,399 @@
+"""
+Indice su disco delle misure già importate (deduplicazione)
+
+Ogni misura è identificata dalla chiave (timestamp, modalità, crc32): il
+CRC calcolato dal firmware copre valori e stringhe, quindi la stessa
+misura arrivata da un dump SD (JSONL o binario) e da un trasferimento BLE
+ha la stessa chiave.
+
+Le chiavi sono in una tabella hash a indirizzamento aperto (probing
+lineare) in un file mappato in memoria:
+
+    header  32 byte   magic 'MDHX', versione, capacità, numero chiavi
+    slot    16 byte   int64 timestamp, uint32 crc32, uint32 modalità + 1
+                      (0 = slot libero)
+
+Ricerca e inserimento costano O(1) e toccano solo le pagine degli slot
+visitati: l'indice non viene mai caricato in RAM, così regge decine di
+milioni di chiavi. Oltre il 70% di riempimento la tabella viene
+ricostruita con capacità doppia.
+"""
+
+import os
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from .measure_binary import MODE_NAMES, measures_to_records
+from .measure_store import parse_timestamp
+
+MAGIC = b'MDHX'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sIQQ8x')
+_SLOT = struct.Struct('<qII')
+HEADER_SIZE = _HEADER.size
+SLOT_SIZE = _SLOT.size
+
+MAX_LOAD = 0.7
+# Slot della vecchia tabella reinseriti per blocco durante la crescita
+GROW_CHUNK_SLOTS = 1 << 16
+MIN_CAPACITY = 1 << 10
+
+_MASK64 = (1 << 64) - 1
+_HASH_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0xBF58476D1CE4E5B9, 0x94D049BB133111EB)
+
+if HAS_NUMPY:
+    SLOT_DTYPE = np.dtype([('timestamp', '<i8'), ('crc32', '<u4'), ('tag', '<u4')])
+    assert SLOT_DTYPE.itemsize == SLOT_SIZE
+
+MeasureKey = Tuple[int, int, int]
+
+
+def measure_key(measure: Dict) -> MeasureKey:
+    """
+    Chiave (timestamp, modalità, crc32) di una misura con crc32
+    
+    Raises:
+        ValueError: Se timestamp, modalità o crc32 mancano o non sono validi
+    """
+    try:
+        mode = measure['mode']
+        if isinstance(mode, str):
+            mode = MODE_NAMES.index(mode.strip().lower())
+        return parse_timestamp(measure['timestamp']), int(mode), int(measure['crc32']) & 0xFFFFFFFF
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Chiave misura non valida: {e}")
+
+
+def measure_keys(measures: List[Dict]) -> List[Optional[MeasureKey]]:
+    """
+    Chiavi di un lotto di misure
+    
+    Alle misure senza crc32 (es: CSV) il CRC viene calcolato come nel
+    firmware, in un'unica passata vettoriale per tutto il lotto.
+    
+    Returns:
+        Chiave per ogni misura, None per le misure non valide
+    """
+    keys: List[Optional[MeasureKey]] = []
+    missing, normalized = [], []
+    
+    for i, measure in enumerate(measures):
+        try:
+            if measure.get('crc32') not in (None, ''):
+                keys.append(measure_key(measure))
+                continue
+            key = measure_key(dict(measure, crc32=0))
+            normalized.append({
+                'timestamp': key[0],
+                'mode': key[1],
+                'value': float(measure.get('value_mm', measure.get('value')) or 0.0),
+                'value2': float(measure.get('value2_mm', measure.get('value2')) or 0.0),
+                'material': measure.get('material'),
+                'profile': measure.get('profile'),
+                'notes': measure.get('notes'),
+            })
+            missing.append(i)
+            keys.append(None)
+        except (ValueError, TypeError, AttributeError):
+            keys.append(None)
+    
+    if normalized:
+        crcs = measures_to_records(normalized)['crc32'].tolist()
+        for i, data, crc in zip(missing, normalized, crcs):
+            keys[i] = (data['timestamp'], data['mode'], crc)
+    return keys
+
+
+def _hash(timestamp: int, mode: int, crc: int) -> int:
+    """Hash a 64 bit della chiave (finalizzatore splitmix64)"""
+    m1, m2, m3, m4 = _HASH_MULTIPLIERS
+    h = (timestamp * m1 + crc * m2 + mode) & _MASK64
+    h = ((h ^ (h >> 30)) * m3) & _MASK64
+    h = ((h ^ (h >> 27)) * m4) & _MASK64
+    return h ^ (h >> 31)
+
+
+def _hash_array(timestamps: "np.ndarray", modes: "np.ndarray", crcs: "np.ndarray") -> "np.ndarray":
+    """Come _hash, su array (aritmetica uint64 modulo 2^64)"""
+    m1, m2, m3, m4 = (np.uint64(m) for m in _HASH_MULTIPLIERS)
+    h = timestamps.astype(np.int64).view(np.uint64) * m1
+    h += crcs.astype(np.uint64) * m2
+    h += modes.astype(np.uint64)
+    h = (h ^ (h >> np.uint64(30))) * m3
+    h = (h ^ (h >> np.uint64(27))) * m4
+    return h ^ (h >> np.uint64(31))
+
+
+def _insert_array(slots: "np.ndarray", timestamps: "np.ndarray",
+                  tags: "np.ndarray", crcs: "np.ndarray",
+                  insert: bool = True) -> "np.ndarray":
+    """
+    Ricerca/inserimento vettoriale con probing lineare
+    
+    A ogni giro tutte le chiavi in sospeso esaminano il proprio slot: se
+    contiene la chiave è già presente, se è libero la prima chiave del
+    lotto che lo reclama lo occupa (le altre lo riesaminano al giro
+    successivo), altrimenti passano allo slot seguente.
+    
+    Args:
+        insert: Se False cerca soltanto
+    
+    Returns:
+        Maschera delle chiavi inserite (nuove), o trovate se insert è False
+    """
+    mask = np.uint64(len(slots) - 1)
+    slot = _hash_array(timestamps, tags - 1, crcs) & mask
+    is_new = np.zeros(len(timestamps), dtype=bool)
+    pending = np.arange(len(timestamps))
+    
+    while pending.size:
+        current = slots[slot[pending]]
+        empty = current['tag'] == 0
+        match = (~empty & (current['tag'] == tags[pending])
+                 & (current['timestamp'] == timestamps[pending])
+                 & (current['crc32'] == crcs[pending]))
+        
+        keep = ~(empty | match)
+        slot[pending[keep]] = (slot[pending[keep]] + np.uint64(1)) & mask
+        
+        if not insert:
+            is_new[pending[match]] = True
+            pending = pending[keep]
+            continue
+        
+        empty_pos = np.flatnonzero(empty)
+        if empty_pos.size:
+            # Più chiavi sullo stesso slot libero: vince la prima del lotto
+            _unique, first = np.unique(slot[pending[empty_pos]], return_index=True)
+            winners = pending[empty_pos[first]]
+            target = slots[slot[winners]]
+            target['timestamp'] = timestamps[winners]
+            target['crc32'] = crcs[winners]
+            target['tag'] = tags[winners]
+            slots[slot[winners]] = target
+            is_new[winners] = True
+            keep[empty_pos] = True
+            keep[empty_pos[first]] = False
+        
+        pending = pending[keep]
+    
+    return is_new
+
+
+class MeasureIndex:
+    """Insieme persistente delle chiavi delle misure importate"""
+    
+    def __init__(self, path: Path, initial_capacity: int = 1 << 16):
+        """
+        Apre (o crea) l'indice
+        
+        Args:
+            path: File dell'indice
+            initial_capacity: Slot iniziali di un indice nuovo (arrotondati a potenza di 2)
+        
+        Raises:
+            IOError: Se il file non è accessibile
+            ValueError: Se il file non è un indice valido
+        """
+        self.path = Path(path)
+        self._file = None
+        self._map = None
+        
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            capacity = MIN_CAPACITY
+            while capacity < initial_capacity:
+                capacity <<= 1
+            self._create(self.path, capacity)
+        self._open()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __contains__(self, key: MeasureKey) -> bool:
+        return self._find(*key)[1]
+    
+    @staticmethod
+    def _create(path: Path, capacity: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, capacity, 0))
+            f.truncate(HEADER_SIZE + capacity * SLOT_SIZE)
+    
+    def _open(self):
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        
+        magic, version, capacity, count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Indice misure non valido: {self.path}")
+        if len(self._map) != HEADER_SIZE + capacity * SLOT_SIZE:
+            self.close()
+            raise ValueError(f"Indice misure troncato: {self.path}")
+        
+        self.capacity = capacity
+        self.count = count
+        self._mask = capacity - 1
+    
+    def _find(self, timestamp: int, mode: int, crc: int) -> Tuple[int, bool]:
+        """Offset dello slot della chiave o del primo slot libero, e se la chiave c'è"""
+        slot = _hash(timestamp, mode, crc) & self._mask
+        tag = mode + 1
+        data = self._map
+        while True:
+            offset = HEADER_SIZE + slot * SLOT_SIZE
+            ts, slot_crc, slot_tag = _SLOT.unpack_from(data, offset)
+            if slot_tag == 0:
+                return offset, False
+            if slot_tag == tag and ts == timestamp and slot_crc == crc:
+                return offset, True
+            slot = (slot + 1) & self._mask
+    
+    def add(self, key: MeasureKey) -> bool:
+        """
+        Aggiunge una chiave
+        
+        Returns:
+            True se la chiave è nuova, False se era già presente
+        
+        Raises:
+            ValueError: Se la modalità è negativa
+        """
+        timestamp, mode, crc = key
+        if mode < 0:
+            raise ValueError(f"Modalità non valida: {mode}")
+        
+        offset, found = self._find(timestamp, mode, crc)
+        if found:
+            return False
+        
+        if (self.count + 1) > self.capacity * MAX_LOAD:
+            self._grow()
+            offset, _found = self._find(timestamp, mode, crc)
+        
+        _SLOT.pack_into(self._map, offset, timestamp, crc, mode + 1)
+        self.count += 1
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.capacity, self.count)
+        return True
+    
+    def add_many(self, keys: Iterable[MeasureKey]) -> List[bool]:
+        """
+        Aggiunge più chiavi (inserimento vettoriale con NumPy)
+        
+        Una chiave ripetuta nel lotto è nuova solo alla prima occorrenza.
+        
+        Returns:
+            Lista con True per ciascuna chiave nuova
+        
+        Raises:
+            ValueError: Se una modalità è negativa
+        """
+        keys = list(keys)
+        if not HAS_NUMPY:
+            return [self.add(key) for key in keys]
+        if not keys:
+            return []
+        
+        while self.count + len(keys) > self.capacity * MAX_LOAD:
+            self._grow()
+        
+        is_new = self._probe_many(keys, insert=True)
+        self.count += int(is_new.sum())
+        _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.capacity, self.count)
+        return is_new.tolist()
+    
+    def contains_many(self, keys: Iterable[MeasureKey]) -> List[bool]:
+        """Cerca più chiavi senza inserirle (True per ciascuna chiave presente)"""
+        keys = list(keys)
+        if not HAS_NUMPY:
+            return [key in self for key in keys]
+        if not keys:
+            return []
+        return self._probe_many(keys, insert=False).tolist()
+    
+    def _probe_many(self, keys: List[MeasureKey], insert: bool) -> "np.ndarray":
+        columns = np.array(keys, dtype=np.int64).reshape(-1, 3)
+        if (columns[:, 1] < 0).any():
+            raise ValueError("Modalità non valida: negativa")
+        
+        slots = self._slots()
+        try:
+            return _insert_array(
+                slots, columns[:, 0],
+                (columns[:, 1] + 1).astype(np.uint32),
+                (columns[:, 2] & 0xFFFFFFFF).astype(np.uint32),
+                insert,
+            )
+        finally:
+            del slots
+    
+    def _slots(self, data=None) -> "np.ndarray":
+        """Vista NumPy degli slot (da eliminare prima di chiudere la mappa)"""
+        data = self._map if data is None else data
+        capacity = (len(data) - HEADER_SIZE) // SLOT_SIZE
+        return np.ndarray((capacity,), dtype=SLOT_DTYPE, buffer=data, offset=HEADER_SIZE)
+    
+    def _grow(self):
+        """Ricostruisce la tabella con capacità doppia (file temporaneo + rename)"""
+        old_map, old_capacity = self._map, self.capacity
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        self._create(tmp_path, old_capacity * 2)
+        
+        with open(tmp_path, 'r+b') as f:
+            self._map = mmap.mmap(f.fileno(), 0)
+            self.capacity = old_capacity * 2
+            self._mask = self.capacity - 1
+            if HAS_NUMPY:
+                # Blocchi di dimensione fissa: la memoria non cresce con l'indice
+                old_slots, new_slots = self._slots(old_map), self._slots()
+                for start in range(0, old_capacity, GROW_CHUNK_SLOTS):
+                    chunk = old_slots[start:start + GROW_CHUNK_SLOTS]
+                    used = chunk[chunk['tag'] != 0]
+                    if used.size:
+                        _insert_array(new_slots, used['timestamp'], used['tag'], used['crc32'])
+                    del chunk, used
+                del old_slots, new_slots
+            else:
+                for slot in range(old_capacity):
+                    ts, crc, tag = _SLOT.unpack_from(old_map, HEADER_SIZE + slot * SLOT_SIZE)
+                    if tag:
+                        offset, _found = self._find(ts, tag - 1, crc)
+                        _SLOT.pack_into(self._map, offset, ts, crc, tag)
+            _HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.capacity, self.count)
+            self._map.flush()
+            self._map.close()
+        
+        old_map.close()
+        self._file.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+    
+    def flush(self):
+        """Scrive su disco le modifiche"""
+        if self._map is not None:
+            self._map.flush()
+    
+    def close(self):
+        """Scrive le modifiche e chiude l'indice"""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,223 @@
+"""
+Journal JSONL per la registrazione continua delle misure
+
+MeasureJournal tiene aperto il file del giorno e accumula le misure in un
+buffer: il buffer viene scritto con una sola write() seguita da flush e
+fsync (group commit) quando supera un numero di misure o di byte, oppure
+quando è trascorso l'intervallo massimo dall'ultimo commit.
+
+I file seguono la struttura della SD del dispositivo (/sd/sessions/YYYYMMDD.jsonl):
+a ogni cambio di giorno il journal passa al file nuovo. Alla riapertura
+di un file esistente, un'eventuale ultima linea incompleta (scrittura
+interrotta) viene rimossa prima di riprendere ad appendere.
+"""
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from datetime import datetime, date
+from typing import Callable, Dict, Optional
+
+
+class MeasureJournal:
+    """Writer JSONL con group commit e rotazione giornaliera"""
+    
+    FILENAME_FORMAT = "%Y%m%d.jsonl"
+    
+    def __init__(self, directory: Path,
+                 max_records: int = 256,
+                 max_bytes: int = 64 * 1024,
+                 flush_interval: float = 1.0,
+                 fsync: bool = True,
+                 auto_flush: bool = True,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            directory: Cartella dei file giornalieri (es: /sd/sessions)
+            max_records: Misure in buffer oltre le quali si esegue il commit
+            max_bytes: Byte in buffer oltre i quali si esegue il commit
+            flush_interval: Secondi massimi tra append e commit
+            fsync: Se True, ogni commit attende la scrittura su disco
+            auto_flush: Se True, un thread di servizio esegue il commit a tempo
+                anche senza nuove misure
+            clock: Sorgente del tempo (secondi Unix)
+        """
+        self.directory = Path(directory)
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.clock = clock
+        
+        self.current_path: Optional[Path] = None
+        self.recovered_bytes = 0
+        
+        self._file = None
+        self._day: Optional[date] = None
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._first_pending = None
+        self._lock = threading.Lock()
+        self._closed = False
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        
+        self._stop = threading.Event()
+        self._thread = None
+        if auto_flush:
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._thread.start()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def append(self, measure: Dict):
+        """
+        Aggiunge una misura al buffer (commit se si supera una soglia)
+        
+        Args:
+            measure: Dict misura; senza 'timestamp' viene usato l'istante corrente
+        
+        Raises:
+            ValueError: Se il journal è chiuso o la misura non è serializzabile
+        """
+        now = self.clock()
+        if 'timestamp' not in measure:
+            measure = dict(measure, timestamp=datetime.fromtimestamp(now).isoformat())
+        
+        try:
+            line = (json.dumps(measure, ensure_ascii=False) + '\n').encode('utf-8')
+        except TypeError as e:
+            raise ValueError(f"Misura non serializzabile: {e}")
+        day = self._measure_day(measure['timestamp'], now)
+        
+        with self._lock:
+            if self._closed:
+                raise ValueError("Journal chiuso")
+            
+            # Cambio giorno: chiude il file precedente con le sue misure
+            if day != self._day:
+                self._commit()
+                self._open_day(day)
+            
+            self._buffer.append(line)
+            self._buffer_bytes += len(line)
+            if self._first_pending is None:
+                self._first_pending = now
+            
+            if (len(self._buffer) >= self.max_records
+                    or self._buffer_bytes >= self.max_bytes
+                    or now - self._first_pending >= self.flush_interval):
+                self._commit()
+    
+    def flush(self):
+        """Scrive subito le misure in buffer"""
+        with self._lock:
+            self._commit()
+    
+    def close(self):
+        """Commit finale e chiusura del file"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        
+        with self._lock:
+            if self._closed:
+                return
+            self._commit()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._closed = True
+    
+    @property
+    def pending(self) -> int:
+        """Misure in buffer non ancora scritte"""
+        return len(self._buffer)
+    
+    def _flush_loop(self):
+        """Thread di servizio: commit a tempo delle misure in attesa"""
+        while not self._stop.wait(self.flush_interval / 2):
+            with self._lock:
+                if (self._first_pending is not None
+                        and self.clock() - self._first_pending >= self.flush_interval):
+                    self._commit()
+    
+    def _commit(self):
+        """Scrive il buffer con una sola write (chiamare con il lock)"""
+        if not self._buffer:
+            return
+        
+        self._file.write(b''.join(self._buffer))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._first_pending = None
+    
+    def _measure_day(self, timestamp, now: float) -> date:
+        """Giorno del file di una misura (timestamp Unix o ISO, altrimenti oggi)"""
+        try:
+            if isinstance(timestamp, (int, float)):
+                return datetime.fromtimestamp(timestamp).date()
+            return datetime.fromisoformat(str(timestamp)).date()
+        except (ValueError, OverflowError, OSError):
+            return datetime.fromtimestamp(now).date()
+    
+    def _open_day(self, day: date):
+        """Apre (in append) il file del giorno, ripristinando una linea troncata"""
+        if self._file is not None:
+            self._file.close()
+        
+        path = self.directory / day.strftime(self.FILENAME_FORMAT)
+        if path.exists():
+            self.recovered_bytes += self._truncate_torn_line(path)
+        self._file = open(path, 'ab')
+        self._day = day
+        self.current_path = path
+    
+    @staticmethod
+    def _truncate_torn_line(path: Path, chunk_size: int = 4096) -> int:
+        """
+        Ripara la coda del file dopo l'ultimo newline (letta a ritroso)
+        
+        Se la coda è un record JSON completo manca solo il newline, che
+        viene aggiunto; altrimenti la linea è incompleta e viene rimossa.
+        
+        Returns:
+            Byte rimossi
+        """
+        with open(path, 'r+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            keep = 0
+            while end > 0:
+                start = max(0, end - chunk_size)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    keep = start + newline + 1
+                    break
+                end = start
+            
+            if keep == size:
+                return 0
+            
+            f.seek(keep)
+            try:
+                json.loads(f.read(size - keep))
+            except ValueError:
+                f.truncate(keep)
+                print(f"Journal: rimossa linea incompleta ({size - keep} byte) da {path}")
+                return size - keep
+            
+            f.seek(size)
+            f.write(b'\n')
+            return 0
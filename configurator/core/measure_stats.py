@@ -0,0 +1,209 @@
+"""
+Statistiche incrementali sulle misure (min, max, media, deviazione standard)
+
+RunningStats usa l'algoritmo di Welford: ogni valore aggiorna le
+statistiche in O(1) senza conservare i dati, quindi funziona sui lettori
+in streaming di IOManager anche con milioni di misure. Due accumulatori
+calcolati su partizioni diverse (es: file letti in processi diversi) si
+uniscono con merge() ottenendo lo stesso risultato di un'unica passata.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+@dataclass
+class RunningStats:
+    """Accumulatore di Welford per una serie di valori"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    min: float = math.inf
+    max: float = -math.inf
+    
+    def update(self, value: float):
+        """Aggiunge un valore (O(1))"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+    
+    def update_batch(self, values):
+        """Aggiunge un array di valori (calcolo vettoriale, poi merge)"""
+        if HAS_NUMPY:
+            values = np.asarray(values, dtype=np.float64)
+            if values.size == 0:
+                return
+            mean = float(values.mean())
+            self.merge(RunningStats(
+                count=int(values.size),
+                mean=mean,
+                m2=float(((values - mean) ** 2).sum()),
+                min=float(values.min()),
+                max=float(values.max()),
+            ))
+        else:
+            for value in values:
+                self.update(float(value))
+    
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """
+        Unisce le statistiche di un'altra partizione (formula di Chan)
+        
+        Returns:
+            self, per concatenare le chiamate
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+    
+    @property
+    def variance(self) -> float:
+        """Varianza campionaria (0 con meno di due valori)"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self) -> float:
+        """Deviazione standard campionaria"""
+        return math.sqrt(self.variance)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializza (min/max None se vuoto)"""
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'std': self.std,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunningStats':
+        """Deserializza"""
+        count = data.get('count', 0)
+        return cls(
+            count=count,
+            mean=data.get('mean', 0.0),
+            m2=data.get('m2', 0.0),
+            min=data['min'] if count and data.get('min') is not None else math.inf,
+            max=data['max'] if count and data.get('max') is not None else -math.inf,
+        )
+
+
+GroupBy = Union[str, Tuple[str, ...], None]
+
+
+class GroupedStats:
+    """Statistiche di un campo delle misure, totali e per gruppo"""
+    
+    def __init__(self, field: str = 'value', group_by: GroupBy = None):
+        """
+        Args:
+            field: Campo numerico della misura (es: 'value', 'value2')
+            group_by: Campo (es: 'mode', 'material', 'profile'), tupla di
+                campi per chiavi composte, o None per le sole statistiche totali
+        """
+        self.field = field
+        self.group_by = group_by
+        self.total = RunningStats()
+        self.groups: Dict[Any, RunningStats] = {}
+        self.skipped = 0
+    
+    def _group_key(self, measure: Dict):
+        if isinstance(self.group_by, tuple):
+            return tuple(measure.get(name) for name in self.group_by)
+        return measure.get(self.group_by)
+    
+    def update(self, measure: Dict):
+        """Aggiunge una misura (saltata se il campo non è numerico)"""
+        try:
+            value = float(measure[self.field])
+        except (KeyError, TypeError, ValueError):
+            self.skipped += 1
+            return
+        if math.isnan(value):
+            self.skipped += 1
+            return
+        
+        self.total.update(value)
+        if self.group_by is not None:
+            key = self._group_key(measure)
+            stats = self.groups.get(key)
+            if stats is None:
+                stats = self.groups[key] = RunningStats()
+            stats.update(value)
+    
+    def update_many(self, measures: Iterable[Dict]) -> 'GroupedStats':
+        """
+        Aggiunge tutte le misure di un flusso (anche a batch)
+        
+        Returns:
+            self
+        """
+        for item in measures:
+            if isinstance(item, list):
+                for measure in item:
+                    self.update(measure)
+            else:
+                self.update(item)
+        return self
+    
+    def merge(self, other: 'GroupedStats') -> 'GroupedStats':
+        """
+        Unisce le statistiche di un'altra partizione
+        
+        Returns:
+            self
+        
+        Raises:
+            ValueError: Se campo o raggruppamento sono diversi
+        """
+        if (other.field, other.group_by) != (self.field, self.group_by):
+            raise ValueError("Statistiche non compatibili: campo o raggruppamento diversi")
+        
+        self.total.merge(other.total)
+        for key, stats in other.groups.items():
+            self.groups.setdefault(key, RunningStats()).merge(stats)
+        self.skipped += other.skipped
+        return self
+    
+    def get(self, key=None) -> Optional[RunningStats]:
+        """Statistiche di un gruppo (None = totali)"""
+        return self.total if key is None else self.groups.get(key)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializza (chiavi composte unite con '/')"""
+        def key_str(key):
+            return '/'.join(str(k) for k in key) if isinstance(key, tuple) else str(key)
+        
+        return {
+            'field': self.field,
+            'group_by': list(self.group_by) if isinstance(self.group_by, tuple) else self.group_by,
+            'total': self.total.to_dict(),
+            'groups': {key_str(key): stats.to_dict() for key, stats in self.groups.items()},
+            'skipped': self.skipped,
+        }
@@ -0,0 +1,451 @@
+"""
+Archivio colonnare delle misure
+
+Le misure vengono salvate per colonne in blocchi di al massimo
+block_size righe, ciascuno in una propria directory:
+
+    <root>/store.json                 manifest (dizionari e indice dei blocchi)
+    <root>/blocks/000000/timestamp.npy
+    <root>/blocks/000000/mode.npy
+    <root>/blocks/000000/value_mm.npy
+    <root>/blocks/000000/value2_mm.npy
+    <root>/blocks/000000/material.npy  codici nel dizionario dei materiali
+    <root>/blocks/000000/profile.npy   codici nel dizionario dei profili
+
+Un append scrive sempre blocchi nuovi (i blocchi esistenti non vengono
+riscritti, il costo è proporzionale alle righe aggiunte) che diventano
+visibili con la sostituzione atomica del manifest: dopo un'interruzione
+l'archivio resta quello dell'ultimo manifest salvato. Molti append
+piccoli lasciano blocchi incompleti, che compact() unisce in directory
+nuove; per questo gli id dei blocchi sono crescenti ma non contigui.
+
+Ogni blocco è ordinato per timestamp. Il manifest contiene un indice
+sparso con una voce per blocco (timestamp minimo/massimo e modalità
+presenti): le query per intervallo di tempo e per modalità aprono solo
+i blocchi che possono contenere risultati, e al loro interno leggono
+(in memory map) solo le righe dell'intervallo.
+"""
+
+import os
+import json
+import shutil
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from . import atomic_io
+from .measure_binary import MODE_NAMES, decode_strings, parse_timestamp
+
+
+STORE_VERSION = 1
+
+# Colonne numeriche e loro tipo
+NUMERIC_COLUMNS = {
+    'timestamp': 'i8',
+    'mode': 'i1',
+    'value_mm': 'f4',
+    'value2_mm': 'f4',
+}
+
+# Colonne di testo codificate con dizionario
+DICTIONARY_COLUMNS = ('material', 'profile')
+
+COLUMNS = list(NUMERIC_COLUMNS) + list(DICTIONARY_COLUMNS)
+
+TimeBound = Union[int, float, datetime, None]
+
+
+def _to_mode(value) -> int:
+    """Converte nome (anche maiuscolo, come nel CSV firmware) o indice modalità"""
+    if isinstance(value, str) and not value.strip().lstrip('-').isdigit():
+        name = value.strip().lower()
+        if name not in MODE_NAMES:
+            raise ValueError(f"Modalità sconosciuta: {value}")
+        return MODE_NAMES.index(name)
+    mode = int(value)
+    if not -128 <= mode <= 127:
+        raise ValueError(f"Modalità fuori intervallo: {value}")
+    return mode
+
+
+def _lookup(measure: Dict, *keys, default=None):
+    for key in keys:
+        if key in measure and measure[key] not in (None, ''):
+            return measure[key]
+    return default
+
+
+class MeasureStore:
+    """Archivio colonnare append-only con indice per tempo e modalità"""
+    
+    MANIFEST_NAME = "store.json"
+    DEFAULT_BLOCK_SIZE = 65536
+    
+    def __init__(self, root: Path, block_size: Optional[int] = None):
+        """
+        Apre (o crea) un archivio
+        
+        Args:
+            root: Directory dell'archivio
+            block_size: Righe per blocco (solo per archivi nuovi)
+        
+        Raises:
+            ValueError: Se NumPy non è disponibile o il manifest non è valido
+        """
+        if not HAS_NUMPY:
+            raise ValueError("NumPy non disponibile: archivio colonnare non supportato")
+        
+        self.root = Path(root)
+        manifest_path = self.root / self.MANIFEST_NAME
+        
+        if manifest_path.exists():
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != STORE_VERSION:
+                raise ValueError(f"Versione archivio non supportata: {manifest.get('version')}")
+            self.block_size = manifest['block_size']
+            self.blocks = manifest['blocks']
+            self.dictionaries = manifest['dictionaries']
+        else:
+            self.block_size = block_size or self.DEFAULT_BLOCK_SIZE
+            self.blocks = []
+            self.dictionaries = {name: [] for name in DICTIONARY_COLUMNS}
+        
+        # Lookup inverso per la codifica
+        self._codes = {
+            name: {text: code for code, text in enumerate(values)}
+            for name, values in self.dictionaries.items()
+        }
+    
+    def __len__(self) -> int:
+        return sum(block['count'] for block in self.blocks)
+    
+    # =====================================================================
+    # SCRITTURA
+    # =====================================================================
+    
+    def append(self, columns: Dict[str, "np.ndarray"]) -> int:
+        """
+        Aggiunge righe già in forma colonnare
+        
+        material/profile possono essere array di stringhe (vengono codificati).
+        Colonne mancanti valgono 0 o stringa vuota.
+        
+        Args:
+            columns: Dizionario colonna -> array (stessa lunghezza)
+        
+        Returns:
+            Numero di righe aggiunte
+        """
+        count = len(columns['timestamp'])
+        if count == 0:
+            return 0
+        
+        data = {}
+        for name, dtype in NUMERIC_COLUMNS.items():
+            if name in columns:
+                try:
+                    data[name] = np.asarray(columns[name], dtype=dtype)
+                except OverflowError as e:
+                    raise ValueError(f"Colonna {name}: {e}")
+            else:
+                data[name] = np.zeros(count, dtype=dtype)
+        for name in DICTIONARY_COLUMNS:
+            values = columns.get(name)
+            if values is None:
+                values = [''] * count
+            data[name] = self._encode(name, values)
+        
+        for name, values in data.items():
+            if len(values) != count:
+                raise ValueError(f"Colonna {name}: {len(values)} righe invece di {count}")
+        
+        # Solo blocchi nuovi, visibili con il nuovo manifest
+        saved_blocks = self.blocks
+        self.blocks = list(saved_blocks)
+        try:
+            for start in range(0, count, self.block_size):
+                chunk = {name: values[start:start + self.block_size] for name, values in data.items()}
+                self.blocks.append(self._write_block(self._next_block_id(), chunk))
+            self._save_manifest()
+        except BaseException:
+            self.blocks = saved_blocks
+            raise
+        return count
+    
+    def compact(self) -> int:
+        """
+        Unisce i blocchi incompleti consecutivi (es: dopo molti append piccoli)
+        
+        I blocchi uniti vengono scritti in directory nuove e attivati con il
+        manifest; le directory sostituite sono eliminate dopo il salvataggio.
+        
+        Returns:
+            Numero di blocchi in meno
+        """
+        groups: List[List[Dict]] = []
+        for block in self.blocks:
+            if groups and sum(b['count'] for b in groups[-1]) + block['count'] <= self.block_size:
+                groups[-1].append(block)
+            else:
+                groups.append([block])
+        if all(len(group) == 1 for group in groups):
+            return 0
+        
+        next_id = self._next_block_id()
+        compacted = []
+        replaced = []
+        for group in groups:
+            if len(group) == 1:
+                compacted.append(group[0])
+                continue
+            parts = [self._read_block(block, COLUMNS, raw=True) for block in group]
+            merged = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+            compacted.append(self._write_block(next_id, merged))
+            next_id += 1
+            replaced.extend(block['id'] for block in group)
+        
+        saved_blocks = self.blocks
+        self.blocks = compacted
+        try:
+            self._save_manifest()
+        except BaseException:
+            self.blocks = saved_blocks
+            raise
+        
+        for block_id in replaced:
+            shutil.rmtree(self._block_dir(block_id), ignore_errors=True)
+        return len(saved_blocks) - len(compacted)
+    
+    def append_measures(self, measures: Iterable[Dict], batch_size: int = 65536) -> int:
+        """
+        Aggiunge misure in formato dict (chiavi del JSONL o del CSV firmware)
+        
+        Args:
+            measures: Misure da aggiungere
+            batch_size: Misure convertite in colonne per volta
+        
+        Returns:
+            Numero di righe aggiunte
+        
+        Raises:
+            ValueError: Se una misura non è convertibile
+        """
+        total = 0
+        batch = []
+        for measure in measures:
+            batch.append(measure)
+            if len(batch) >= batch_size:
+                total += self.append(self._measures_to_columns(batch))
+                batch = []
+        if batch:
+            total += self.append(self._measures_to_columns(batch))
+        return total
+    
+    def append_records(self, records: "np.ndarray") -> int:
+        """
+        Aggiunge record binari del firmware (dtype measure_binary.RECORD_DTYPE)
+        
+        Args:
+            records: Array di record (anche memmap)
+        
+        Returns:
+            Numero di righe aggiunte
+        """
+        return self.append({
+            'timestamp': records['timestamp'],
+            'mode': records['mode'],
+            'value_mm': records['value_mm'],
+            'value2_mm': records['value2_mm'],
+            'material': decode_strings(records['material']),
+            'profile': decode_strings(records['profile']),
+        })
+    
+    @staticmethod
+    def _measures_to_columns(measures: List[Dict]) -> Dict[str, list]:
+        columns = {name: [] for name in COLUMNS}
+        try:
+            for m in measures:
+                columns['timestamp'].append(parse_timestamp(_lookup(m, 'timestamp', 'Timestamp', default=0)))
+                columns['mode'].append(_to_mode(_lookup(m, 'mode', 'Mode', default=0)))
+                columns['value_mm'].append(float(_lookup(m, 'value_mm', 'value', 'Value(mm)', default=0.0)))
+                columns['value2_mm'].append(float(_lookup(m, 'value2_mm', 'value2', 'Value2(mm)', default=0.0)))
+                columns['material'].append(str(_lookup(m, 'material', 'Material', default='')))
+                columns['profile'].append(str(_lookup(m, 'profile', 'Profile', default='')))
+        except (TypeError, AttributeError) as e:
+            raise ValueError(f"Misura non valida: {e}")
+        return columns
+    
+    def _encode(self, name: str, values) -> "np.ndarray":
+        """Codifica stringhe nel dizionario della colonna (aggiunge le nuove)"""
+        values = np.asarray(values)
+        if values.dtype.kind in 'iu':
+            return values.astype(np.int32)
+        
+        uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+        codes = self._codes[name]
+        mapping = np.empty(len(uniques), dtype=np.int32)
+        for i, text in enumerate(uniques.tolist()):
+            if text not in codes:
+                codes[text] = len(self.dictionaries[name])
+                self.dictionaries[name].append(text)
+            mapping[i] = codes[text]
+        return mapping[inverse.reshape(-1)]
+    
+    def _block_dir(self, block_id: int) -> Path:
+        return self.root / "blocks" / f"{block_id:06d}"
+    
+    def _next_block_id(self) -> int:
+        """Id libero per un blocco nuovo (una directory orfana viene sovrascritta)"""
+        return max(block['id'] for block in self.blocks) + 1 if self.blocks else 0
+    
+    def _write_block(self, block_id: int, data: Dict[str, "np.ndarray"]) -> Dict:
+        """Scrive un blocco ordinato per timestamp e ne restituisce la voce d'indice"""
+        order = np.argsort(data['timestamp'], kind='stable')
+        block_dir = self._block_dir(block_id)
+        block_dir.mkdir(parents=True, exist_ok=True)
+        
+        for name in COLUMNS:
+            with open(block_dir / f"{name}.npy", 'wb') as f:
+                np.save(f, np.ascontiguousarray(data[name][order]))
+                f.flush()
+                os.fsync(f.fileno())
+        atomic_io.fsync_directory(block_dir)
+        
+        timestamps = data['timestamp']
+        modes = np.unique(data['mode']).tolist()
+        return {
+            'id': block_id,
+            'count': len(timestamps),
+            'ts_min': int(timestamps.min()),
+            'ts_max': int(timestamps.max()),
+            'modes': modes,
+        }
+    
+    def _save_manifest(self):
+        manifest = {
+            'version': STORE_VERSION,
+            'block_size': self.block_size,
+            'dictionaries': self.dictionaries,
+            'blocks': self.blocks,
+        }
+        atomic_io.atomic_write_json(self.root / self.MANIFEST_NAME, manifest, indent=None)
+    
+    # =====================================================================
+    # LETTURA
+    # =====================================================================
+    
+    def _read_block(self, block: Dict, columns: List[str], raw: bool = False,
+                    rows: Optional[slice] = None) -> Dict[str, "np.ndarray"]:
+        """Legge colonne di un blocco (memory map; copia solo le righe richieste)"""
+        block_dir = self._block_dir(block['id'])
+        result = {}
+        for name in columns:
+            values = np.load(block_dir / f"{name}.npy", mmap_mode='r')
+            values = np.array(values[rows] if rows is not None else values)
+            if name in DICTIONARY_COLUMNS and not raw:
+                values = np.array(self.dictionaries[name], dtype=object)[values]
+            result[name] = values
+        return result
+    
+    def _matching_blocks(self, start: Optional[int], end: Optional[int],
+                         modes: Optional[List[int]]) -> Iterator[Dict]:
+        """Blocchi che possono contenere righe nell'intervallo [start, end) e nelle modalità"""
+        for block in self.blocks:
+            if start is not None and block['ts_max'] < start:
+                continue
+            if end is not None and block['ts_min'] >= end:
+                continue
+            if modes is not None and not set(block['modes']) & set(modes):
+                continue
+            yield block
+    
+    def query(self, start: TimeBound = None, end: TimeBound = None,
+              modes: Optional[Iterable[Union[str, int]]] = None,
+              columns: Optional[List[str]] = None) -> Dict[str, "np.ndarray"]:
+        """
+        Seleziona le misure in un intervallo di tempo e/o per modalità
+        
+        Args:
+            start: Inizio intervallo (incluso), timestamp o datetime. None = nessun limite.
+            end: Fine intervallo (esclusa). None = nessun limite.
+            modes: Modalità da includere (nomi o indici). None = tutte.
+            columns: Colonne da restituire. None = tutte.
+        
+        Returns:
+            Dizionario colonna -> array, righe ordinate per timestamp
+            (material/profile decodificati come stringhe)
+        """
+        columns = list(columns or COLUMNS)
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Colonne sconosciute: {', '.join(sorted(unknown))}")
+        
+        start = None if start is None else parse_timestamp(start)
+        end = None if end is None else parse_timestamp(end)
+        modes = None if modes is None else [_to_mode(m) for m in modes]
+        
+        parts = []
+        for block in self._matching_blocks(start, end, modes):
+            # Righe dell'intervallo: ricerca binaria sul timestamp ordinato
+            timestamps = np.load(self._block_dir(block['id']) / "timestamp.npy", mmap_mode='r')
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='left'))
+            if lo >= hi:
+                continue
+            
+            needed = list(columns)
+            if modes is not None and 'mode' not in needed:
+                needed.append('mode')
+            part = self._read_block(block, needed, rows=slice(lo, hi))
+            
+            if modes is not None and not set(block['modes']) <= set(modes):
+                mask = np.isin(part['mode'], modes)
+                part = {name: values[mask] for name, values in part.items()}
+            parts.append(part)
+        
+        if not parts:
+            return {name: np.zeros(0, dtype=NUMERIC_COLUMNS.get(name, object)) for name in columns}
+        
+        result = {name: np.concatenate([p[name] for p in parts]) for name in columns}
+        
+        # Blocchi sovrapposti nel tempo: riordina il risultato
+        if 'timestamp' in result and len(parts) > 1:
+            ts = result['timestamp']
+            if len(ts) > 1 and (np.diff(ts) < 0).any():
+                order = np.argsort(ts, kind='stable')
+                result = {name: values[order] for name, values in result.items()}
+        return result
+    
+    def count(self, start: TimeBound = None, end: TimeBound = None,
+              modes: Optional[Iterable[Union[str, int]]] = None) -> int:
+        """Numero di misure che soddisfano la query"""
+        return len(self.query(start, end, modes, columns=['mode'])['mode'])
+    
+    def iter_measures(self, start: TimeBound = None, end: TimeBound = None,
+                      modes: Optional[Iterable[Union[str, int]]] = None) -> Iterator[Dict]:
+        """
+        Misure della query come dict (stesse chiavi del JSONL del firmware)
+        
+        Yields:
+            Dict misura
+        """
+        result = self.query(start, end, modes)
+        for ts, mode, v1, v2, material, profile in zip(
+                result['timestamp'].tolist(), result['mode'].tolist(),
+                result['value_mm'].tolist(), result['value2_mm'].tolist(),
+                result['material'].tolist(), result['profile'].tolist()):
+            yield {
+                'timestamp': ts,
+                'mode': MODE_NAMES[mode] if 0 <= mode < len(MODE_NAMES) else mode,
+                'value': v1,
+                'value2': v2,
+                'material': material,
+                'profile': profile,
+            }
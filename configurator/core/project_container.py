@@ -0,0 +1,255 @@
+"""
+Formato contenitore dei progetti (.mdp) con sezioni a caricamento differito
+
+Layout del file:
+
+    header   '<4sHHI': magic b'MDPC', versione, flag, lunghezza TOC
+    TOC      JSON UTF-8: {"meta": {...}, "sections": {nome: info}}
+    blocchi  una sezione per blocco, JSON compresso con zlib
+
+info di una sezione: offset (dall'inizio dei blocchi), size, count
+(elementi), crc32 (del JSON non compresso), codec ('zlib' o 'none').
+
+"meta" contiene i campi piccoli del progetto (nome, date, hardware, ...)
+e viene letto all'apertura; le sezioni a elenco (menus, tipologie,
+astine, fermavetri, modes) vengono lette e decodificate solo al primo
+accesso tramite LazySection. Una sezione mai letta viene riscritta
+copiando il blocco così com'è, senza decodificarla.
+"""
+
+import os
+import json
+import zlib
+import struct
+from pathlib import Path
+from collections.abc import MutableSequence
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from . import atomic_io
+
+MAGIC = b'MDPC'
+CONTAINER_VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+
+# Sezioni del progetto salvate come blocchi separati
+SECTIONS = ('menus', 'tipologie', 'astine', 'fermavetri', 'modes', 'icons')
+
+COMPRESS_LEVEL = 6
+
+
+def is_container(path: Path) -> bool:
+    """True se il file è nel formato contenitore (altrimenti JSON)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except (IOError, OSError):
+        return False
+
+
+def _encode_block(data: Any) -> Tuple[bytes, Dict[str, Any]]:
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    info = {
+        'count': len(data),
+        'crc32': zlib.crc32(raw),
+        'codec': 'zlib',
+    }
+    return zlib.compress(raw, COMPRESS_LEVEL), info
+
+
+class ProjectContainer:
+    """Lettore di un file progetto in formato contenitore"""
+    
+    def __init__(self, path: Path):
+        """
+        Legge header e TOC (le sezioni restano su disco)
+        
+        Args:
+            path: File progetto
+        
+        Raises:
+            IOError: Se il file non è leggibile
+            ValueError: Se il file non è un contenitore valido
+        """
+        self.path = Path(path)
+        
+        with open(self.path, 'rb') as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"File progetto troncato: {self.path}")
+            magic, version, _flags, toc_size = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"Non è un contenitore progetto: {self.path}")
+            if version > CONTAINER_VERSION:
+                raise ValueError(f"Versione contenitore non supportata: {version}")
+            
+            try:
+                toc = json.loads(f.read(toc_size).decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise ValueError(f"Indice progetto non valido: {e}")
+            st = os.fstat(f.fileno())
+        
+        self.meta: Dict[str, Any] = toc.get('meta', {})
+        self.sections: Dict[str, Dict[str, Any]] = toc.get('sections', {})
+        self._data_offset = HEADER.size + toc_size
+        # Il file non deve cambiare tra apertura e lettura delle sezioni
+        self._stamp = (st.st_size, st.st_mtime_ns)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.sections
+    
+    def count(self, name: str) -> int:
+        """Numero di elementi della sezione (senza leggerla)"""
+        return self.sections[name]['count'] if name in self.sections else 0
+    
+    def read_raw(self, name: str) -> bytes:
+        """
+        Blocco della sezione così come è su disco
+        
+        Raises:
+            KeyError: Se la sezione non esiste
+            IOError: Se il file è stato modificato dopo l'apertura
+        """
+        info = self.sections[name]
+        with open(self.path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            if (st.st_size, st.st_mtime_ns) != self._stamp:
+                raise IOError(f"File progetto modificato dopo l'apertura: {self.path}")
+            f.seek(self._data_offset + info['offset'])
+            data = f.read(info['size'])
+        if len(data) != info['size']:
+            raise IOError(f"Sezione {name} troncata: {self.path}")
+        return data
+    
+    def read_section(self, name: str) -> Any:
+        """
+        Legge e decodifica il JSON di una sezione
+        
+        Raises:
+            KeyError: Se la sezione non esiste
+            ValueError: Se il blocco è corrotto (CRC errato)
+        """
+        info = self.sections[name]
+        data = self.read_raw(name)
+        try:
+            if info.get('codec', 'zlib') == 'zlib':
+                data = zlib.decompress(data)
+        except zlib.error as e:
+            raise ValueError(f"Sezione {name} corrotta: {e}")
+        if zlib.crc32(data) != info['crc32']:
+            raise ValueError(f"Sezione {name} corrotta (CRC errato)")
+        return json.loads(data.decode('utf-8'))
+
+
+class LazySection(MutableSequence):
+    """Lista di elementi di una sezione, decodificata al primo accesso"""
+    
+    def __init__(self, container: ProjectContainer, name: str,
+                 decoder: Optional[Callable[[Dict], Any]] = None):
+        """
+        Args:
+            container: File progetto
+            name: Nome della sezione
+            decoder: Funzione dict -> elemento (es: MenuItem.from_dict)
+        """
+        self.container = container
+        self.name = name
+        self.decoder = decoder
+        self._items: Optional[list] = None
+    
+    @property
+    def loaded(self) -> bool:
+        """True se la sezione è già stata decodificata"""
+        return self._items is not None
+    
+    def bind(self, container: ProjectContainer):
+        """Ricollega una sezione non ancora letta a un altro file (es: dopo il salvataggio)"""
+        if not self.loaded:
+            self.container = container
+    
+    def _load(self) -> list:
+        if self._items is None:
+            data = self.container.read_section(self.name) if self.name in self.container else []
+            if self.decoder is not None:
+                data = [self.decoder(item) for item in data]
+            self._items = list(data)
+        return self._items
+    
+    def __len__(self) -> int:
+        if self._items is None:
+            return self.container.count(self.name)
+        return len(self._items)
+    
+    def __getitem__(self, index):
+        return self._load()[index]
+    
+    def __setitem__(self, index, value):
+        self._load()[index] = value
+    
+    def __delitem__(self, index):
+        del self._load()[index]
+    
+    def insert(self, index: int, value):
+        self._load().insert(index, value)
+    
+    def __iter__(self) -> Iterator:
+        return iter(self._load())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, LazySection)):
+            return list(self) == list(other)
+        return NotImplemented
+    
+    def __repr__(self) -> str:
+        if self._items is None:
+            return f"LazySection({self.name!r}, {len(self)} elementi non caricati)"
+        return repr(self._items)
+
+
+def write_container(path: Path, meta: Dict[str, Any], sections: Dict[str, Any],
+                    backup: bool = False,
+                    keep_backups: int = atomic_io.DEFAULT_KEEP_BACKUPS) -> Optional[Path]:
+    """
+    Scrive un file progetto in formato contenitore (scrittura atomica)
+    
+    Args:
+        path: File di destinazione
+        meta: Campi del progetto letti all'apertura
+        sections: Nome -> dati JSON della sezione (lista o dict); una
+            LazySection non ancora letta viene copiata senza decodificarla
+        backup: Se True, conserva la versione precedente come backup
+        keep_backups: Numero di backup da conservare
+    
+    Returns:
+        Path del backup creato (None se nessun backup)
+    
+    Raises:
+        IOError: Se la scrittura non riesce
+        ValueError: Se una sezione non è serializzabile
+    """
+    blocks = []
+    toc_sections = {}
+    offset = 0
+    
+    for name, data in sections.items():
+        if isinstance(data, LazySection) and not data.loaded and data.name in data.container:
+            block = data.container.read_raw(data.name)
+            info = dict(data.container.sections[data.name])
+        else:
+            if isinstance(data, LazySection):
+                data = list(data)
+            try:
+                block, info = _encode_block(data)
+            except TypeError as e:
+                raise ValueError(f"Sezione {name} non serializzabile: {e}")
+        
+        info.update(offset=offset, size=len(block))
+        toc_sections[name] = info
+        blocks.append(block)
+        offset += len(block)
+    
+    toc = json.dumps({'meta': meta, 'sections': toc_sections},
+                     ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    header = HEADER.pack(MAGIC, CONTAINER_VERSION, 0, len(toc))
+    
+    return atomic_io.atomic_write(path, b''.join([header, toc] + blocks),
+                                  backup=backup, keep_backups=keep_backups)
@@ -4,9 +4,26 @@ Gestione salvataggio/caricamento progetti Metro Digitale (.mdp)
 
 import json
 import os
+import dataclasses
 from typing import Optional
 from datetime import datetime
-from .config_model import ProgettoConfigurazione
+from .config_model import (
+    ProgettoConfigurazione, MenuItem, TipologiaInfisso,
+    AstinaConfig, FermavetroConfig, MeasureMode
+)
+from . import atomic_io
+from .project_container import (
+    SECTIONS, ProjectContainer, LazySection, is_container, write_container
+)
+
+# Decodifica degli elementi delle sezioni a elenco (icons è un dict)
+SECTION_DECODERS = {
+    'menus': MenuItem.from_dict,
+    'tipologie': TipologiaInfisso.from_dict,
+    'astine': AstinaConfig.from_dict,
+    'fermavetri': FermavetroConfig.from_dict,
+    'modes': MeasureMode.from_dict,
+}
 
 
 class ProjectManager:
@@ -14,6 +31,9 @@ class ProjectManager:
     
     FILE_EXTENSION = ".mdp"
     
+    # Versioni precedenti conservate a ogni salvataggio (<nome>.backup_<ts>.mdp)
+    KEEP_BACKUPS = atomic_io.DEFAULT_KEEP_BACKUPS
+    
     def __init__(self):
         self.current_file: Optional[str] = None
         self.current_project: Optional[ProgettoConfigurazione] = None
@@ -34,13 +54,21 @@ class ProjectManager:
         self.modified = False
         return self.current_project
     
-    def save_project(self, filepath: str, project: ProgettoConfigurazione) -> bool:
+    def save_project(self, filepath: str, project: ProgettoConfigurazione,
+                     create_backup: bool = True, container: bool = True) -> bool:
         """
         Salva un progetto su file
         
+        La scrittura è atomica (file temporaneo + rename): un crash durante
+        il salvataggio lascia intatta la versione precedente.
+        
         Args:
             filepath: Percorso file di destinazione
             project: Progetto da salvare
+            create_backup: Se True, conserva la versione precedente come
+                backup (ultimi KEEP_BACKUPS)
+            container: Se True, formato contenitore a sezioni (vedi
+                project_container); se False, JSON unico
             
         Returns:
             True se salvato con successo
@@ -56,12 +84,12 @@ class ProjectManager:
             # Aggiorna timestamp modifica
             project.modified = datetime.now()
             
-            # Serializza in JSON
-            data = project.to_dict()
-            
-            # Salva su file con indentazione
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            if container:
+                self._save_container(filepath, project, create_backup)
+            else:
+                # Salva su file JSON con indentazione
+                atomic_io.atomic_write_json(filepath, project.to_dict(), backup=create_backup,
+                                            keep_backups=self.KEEP_BACKUPS)
             
             self.current_file = filepath
             self.current_project = project
@@ -72,10 +100,49 @@ class ProjectManager:
         except Exception as e:
             raise IOError(f"Impossibile salvare il progetto: {e}")
     
+    def _save_container(self, filepath: str, project: ProgettoConfigurazione,
+                        create_backup: bool):
+        """Salva nel formato contenitore; le sezioni non lette vengono copiate"""
+        sections = {}
+        for name in SECTIONS:
+            value = getattr(project, name)
+            if isinstance(value, LazySection) and not value.loaded:
+                sections[name] = value
+            elif name in SECTION_DECODERS:
+                sections[name] = [item.to_dict() for item in value]
+            else:
+                sections[name] = dict(value)
+        
+        write_container(filepath, self._project_meta(project), sections,
+                        backup=create_backup, keep_backups=self.KEEP_BACKUPS)
+        
+        # Le sezioni non lette puntano ora al file appena scritto
+        saved = ProjectContainer(filepath)
+        for name in SECTIONS:
+            value = getattr(project, name)
+            if isinstance(value, LazySection):
+                value.bind(saved)
+    
+    @staticmethod
+    def _project_meta(project: ProgettoConfigurazione) -> dict:
+        """Campi del progetto diversi dalle sezioni (senza decodificarle)"""
+        empty = dataclasses.replace(
+            project, **{name: [] if name in SECTION_DECODERS else {} for name in SECTIONS}
+        )
+        meta = empty.to_dict()
+        for name in SECTIONS:
+            meta.pop(name, None)
+        return meta
+    
     def load_project(self, filepath: str) -> ProgettoConfigurazione:
         """
         Carica un progetto da file
         
+        Nel formato contenitore vengono letti subito solo i campi generali e
+        le icone: menus, tipologie, astine, fermavetri e modes sono
+        decodificati al primo accesso. I file JSON delle versioni precedenti vengono
+        caricati per intero.
+        
         Args:
             filepath: Percorso file da caricare
             
@@ -90,10 +157,13 @@ class ProjectManager:
             if not os.path.exists(filepath):
                 raise FileNotFoundError(f"File non trovato: {filepath}")
             
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            project = ProgettoConfigurazione.from_dict(data)
+            if is_container(filepath):
+                project = self._load_container(filepath)
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                
+                project = ProgettoConfigurazione.from_dict(data)
             
             self.current_file = filepath
             self.current_project = project
@@ -101,11 +171,24 @@ class ProjectManager:
             
             return project
             
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, ValueError) as e:
             raise ValueError(f"Formato file non valido: {e}")
         except Exception as e:
             raise IOError(f"Impossibile caricare il progetto: {e}")
     
+    @staticmethod
+    def _load_container(filepath: str) -> ProgettoConfigurazione:
+        """Progetto dal formato contenitore, con sezioni a caricamento differito"""
+        container = ProjectContainer(filepath)
+        project = ProgettoConfigurazione.from_dict(container.meta)
+        for name in SECTIONS:
+            if name in SECTION_DECODERS:
+                setattr(project, name, LazySection(container, name, SECTION_DECODERS[name]))
+            elif name in container:
+                # Registry icone: dict piccolo, serializzato così com'è da to_dict
+                setattr(project, name, container.read_section(name))
+        return project
+    
     def export_json(self, filepath: str, project: ProgettoConfigurazione) -> bool:
         """
         Esporta progetto come JSON generico
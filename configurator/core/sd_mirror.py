@@ -0,0 +1,235 @@
+"""
+Copia incrementale della microSD del dispositivo
+
+SdMirror mantiene nella cartella di destinazione un manifest JSON con,
+per ogni file copiato, dimensione, data di modifica e hash dei blocchi
+(BLAKE2b, blocchi da 1 MB). A ogni sincronizzazione:
+
+- i file con dimensione e data di modifica invariate non vengono letti;
+- le sessioni (sessions/*.jsonl), scritte dal firmware solo in append,
+  vengono verificate rileggendo l'ultimo blocco già copiato e poi
+  completate copiando solo i byte nuovi; se il contenuto copiato è
+  cambiato si ricopia dal primo blocco diverso;
+- in exports/ e backup/ vengono copiati i file nuovi (o modificati).
+
+I file rimossi dalla SD restano nella copia. Le scritture avvengono
+sempre a offset espliciti, quindi una sincronizzazione interrotta viene
+semplicemente ripresa dalla successiva.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Tuple
+
+MANIFEST_NAME = '.mirror_manifest.json'
+MANIFEST_VERSION = 1
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Cartelle sincronizzate: sessioni in append, altre copiate per file
+APPEND_DIRS = ('sessions',)
+COPY_DIRS = ('exports', 'backup')
+APPEND_SUFFIXES = ('.jsonl',)
+
+
+def _block_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@dataclass
+class MirrorStats:
+    """Esito di una sincronizzazione"""
+    new_files: int = 0
+    appended_files: int = 0
+    recopied_files: int = 0
+    unchanged_files: int = 0
+    bytes_copied: int = 0
+    
+    def to_dict(self) -> Dict[str, int]:
+        """Serializza"""
+        return asdict(self)
+
+
+class SdMirror:
+    """Copia incrementale di sessions/, exports/ e backup/ della microSD"""
+    
+    def __init__(self, source_root: Path, dest_root: Path,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        """
+        Args:
+            source_root: Radice della SD (es: /sd)
+            dest_root: Cartella locale della copia
+            block_size: Dimensione dei blocchi del manifest (byte)
+        
+        Raises:
+            ValueError: Se il manifest esistente non è valido
+        """
+        self.source_root = Path(source_root)
+        self.dest_root = Path(dest_root)
+        self.manifest_path = self.dest_root / MANIFEST_NAME
+        self.block_size = block_size
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._load_manifest()
+    
+    def _load_manifest(self):
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (IOError, OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"Manifest non valido: {e}")
+        
+        # Manifest di un'altra versione o dimensione blocchi: si riparte da zero
+        if manifest.get('version') == MANIFEST_VERSION and \
+                manifest.get('block_size') == self.block_size:
+            self.files = manifest.get('files', {})
+    
+    def _save_manifest(self):
+        """Scrive il manifest (file temporaneo + rename)"""
+        self.dest_root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'block_size': self.block_size,
+                'files': self.files,
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+    
+    def _source_files(self) -> List[tuple]:
+        """File da sincronizzare: (path relativo, path sorgente, in append)"""
+        files = []
+        for name in APPEND_DIRS + COPY_DIRS:
+            directory = self.source_root / name
+            if not directory.is_dir():
+                continue
+            for path in sorted(directory.rglob('*')):
+                if path.is_file():
+                    append = name in APPEND_DIRS and path.suffix.lower() in APPEND_SUFFIXES
+                    files.append((path.relative_to(self.source_root).as_posix(), path, append))
+        return files
+    
+    def sync(self) -> MirrorStats:
+        """
+        Sincronizza la copia con la SD
+        
+        Returns:
+            MirrorStats
+        
+        Raises:
+            IOError: Se la SD o la destinazione non sono accessibili
+        """
+        if not self.source_root.is_dir():
+            raise IOError(f"Cartella sorgente non trovata: {self.source_root}")
+        
+        stats = MirrorStats()
+        try:
+            for rel_path, source, append in self._source_files():
+                self._sync_file(rel_path, source, append, stats)
+        finally:
+            self._save_manifest()
+        return stats
+    
+    def _sync_file(self, rel_path: str, source: Path, append: bool, stats: MirrorStats):
+        st = source.stat()
+        entry = self.files.get(rel_path)
+        dest = self.dest_root / rel_path
+        
+        dest_size = dest.stat().st_size if dest.exists() else -1
+        if entry is not None and dest_size < entry['size']:
+            # Copia locale mancante o troncata: il manifest non vale più
+            entry = None
+        
+        if entry is not None and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            stats.unchanged_files += 1
+            return
+        
+        # start: inizio della rilettura (confine di blocco per gli hash)
+        # write_from: primo byte da scrivere nella copia
+        if entry is None:
+            start = write_from = 0
+            stats.new_files += 1
+        elif append and st.st_size >= entry['size'] and self._tail_matches(source, entry):
+            # Solo byte nuovi: si rilegge l'ultimo blocco (parziale) per il suo hash
+            start = (entry['size'] // self.block_size) * self.block_size
+            write_from = entry['size']
+            stats.appended_files += 1
+        elif append:
+            start = write_from = self._first_changed_block(source, entry)
+            stats.recopied_files += 1
+        else:
+            start = write_from = 0
+            stats.recopied_files += 1
+        
+        blocks = entry['blocks'][:start // self.block_size] if entry is not None else []
+        written, size = self._copy_range(source, dest, start, write_from, blocks)
+        stats.bytes_copied += written
+        
+        # Dimensione effettivamente copiata (il file può crescere durante la copia)
+        self.files[rel_path] = {
+            'size': size,
+            'mtime_ns': st.st_mtime_ns,
+            'blocks': blocks,
+        }
+        shutil.copystat(source, dest)
+    
+    def _tail_matches(self, source: Path, entry: Dict) -> bool:
+        """True se l'ultimo blocco già copiato è invariato sulla SD"""
+        if not entry['blocks']:
+            return entry['size'] == 0
+        index = len(entry['blocks']) - 1
+        start = index * self.block_size
+        with open(source, 'rb') as f:
+            f.seek(start)
+            data = f.read(entry['size'] - start)
+        return _block_hash(data) == entry['blocks'][index]
+    
+    def _first_changed_block(self, source: Path, entry: Dict) -> int:
+        """Offset del primo blocco diverso dal manifest"""
+        with open(source, 'rb') as f:
+            for index, block_hash in enumerate(entry['blocks']):
+                data = f.read(self.block_size)
+                if _block_hash(data) != block_hash or len(data) < self.block_size:
+                    return index * self.block_size
+        return len(entry['blocks']) * self.block_size
+    
+    def _copy_range(self, source: Path, dest: Path, start: int, write_from: int,
+                    blocks: List[str]) -> Tuple[int, int]:
+        """
+        Copia la sorgente da start alla fine, aggiornando gli hash dei blocchi
+        
+        I byte prima di write_from sono già presenti nella copia: vengono
+        letti solo per gli hash.
+        
+        Returns:
+            Byte scritti e dimensione finale della copia
+        """
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        written = 0
+        
+        with open(source, 'rb') as src, open(dest, 'r+b' if dest.exists() else 'wb') as out:
+            src.seek(start)
+            out.seek(write_from)
+            offset = start
+            while True:
+                data = src.read(self.block_size)
+                if not data:
+                    break
+                blocks.append(_block_hash(data))
+                if offset + len(data) > write_from:
+                    skip = max(0, write_from - offset)
+                    out.write(data[skip:])
+                    written += len(data) - skip
+                offset += len(data)
+            out.truncate(offset)
+            out.flush()
+            os.fsync(out.fileno())
+        
+        return written, offset
@@ -5,6 +5,7 @@ Applicazione PyQt6 per configurazione visuale Metro Digitale ESP32
 
 import sys
 import os
+import multiprocessing
 from pathlib import Path
 
 # Aggiungi directory parent al path per import
@@ -45,4 +46,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Eseguibile PyInstaller: i processi dei pool (import cartella misure,
+    # statistiche) non devono riavviare l'interfaccia
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,74 @@
+"""
+Test per scritture atomiche e backup a rotazione
+"""
+
+import os
+import json
+import pytest
+from core import atomic_io
+from core.atomic_io import atomic_write, atomic_write_json, create_backup, list_backups
+
+
+def test_atomic_write_replaces_content(tmp_path):
+    """Test scrittura atomica: contenuto sostituito, nessun file temporaneo"""
+    path = tmp_path / "sub" / "config.json"
+    assert atomic_write_json(path, {"a": 1}) is None
+    atomic_write_json(path, {"a": 2})
+    
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 2}
+    assert [p.name for p in path.parent.iterdir()] == ["config.json"]
+
+
+def test_failed_write_keeps_previous(tmp_path, monkeypatch):
+    """Test errore durante la scrittura: file originale intatto"""
+    path = tmp_path / "project.mdp"
+    atomic_write(path, "versione 1")
+    
+    def failing_replace(src, dst):
+        raise OSError("disco pieno")
+    
+    monkeypatch.setattr(atomic_io.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        atomic_write(path, "versione 2")
+    
+    assert path.read_text() == "versione 1"
+    assert [p.name for p in tmp_path.iterdir()] == ["project.mdp"]
+
+
+def test_failed_write_keeps_backups(tmp_path, monkeypatch):
+    """Test replace fallito con backup: nessun backup nuovo, nessun pruning"""
+    path = tmp_path / "config.json"
+    for i in range(3):
+        atomic_write(path, f"versione {i}", backup=True, keep_backups=2)
+    before = [(b.name, b.read_text()) for b in list_backups(path)]
+    assert len(before) == 2
+    
+    def failing_replace(src, dst):
+        raise OSError("disco pieno")
+    
+    monkeypatch.setattr(atomic_io.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        atomic_write(path, "versione 3", backup=True, keep_backups=2)
+    
+    assert [(b.name, b.read_text()) for b in list_backups(path)] == before
+    assert path.read_text() == "versione 2"
+    assert len(list(tmp_path.iterdir())) == 3
+
+
+def test_backup_rotation(tmp_path):
+    """Test backup hardlink della versione precedente e pruning"""
+    path = tmp_path / "config.json"
+    for i in range(6):
+        atomic_write(path, f"versione {i}", backup=True, keep_backups=3)
+    
+    backups = list_backups(path)
+    assert len(backups) == 3
+    # Dal più recente (stesso secondo: ordinati per contatore)
+    assert [b.read_text() for b in backups] == ["versione 4", "versione 3", "versione 2"]
+    assert path.read_text() == "versione 5"
+    
+    # Il backup è un link al file sostituito, non una copia
+    backup = create_backup(path, keep=3)
+    assert os.path.samefile(backup, path)
+    
+    assert create_backup(tmp_path / "missing.json") is None
@@ -0,0 +1,127 @@
+"""
+Test per il riassemblaggio delle sessioni BLE (blitz_integration/ble_session.py)
+"""
+
+import sys
+import os
+import base64
+import zlib
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'blitz_integration'))
+
+from ble_session import BleSessionReassembler
+
+
+def _messages(data: bytes, chunk_size: int, session_id: str = "20240201_101500"):
+    """Messaggi del protocollo per una sessione: start, chunk (in ordine), end"""
+    chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+    start = {"type": "session_start", "session_id": session_id,
+             "total_chunks": len(chunks), "total_bytes": len(data)}
+    data_chunks = [{"type": "data_chunk", "chunk_id": i,
+                    "data": base64.b64encode(chunk).decode("ascii")}
+                   for i, chunk in enumerate(chunks, 1)]
+    end = {"type": "session_end", "crc32": zlib.crc32(data)}
+    return start, data_chunks, end
+
+
+SESSION = b"".join(b'{"timestamp":%d,"mode":"calibro","value":1.5}\n' % i for i in range(40))
+
+
+def test_out_of_order_and_duplicates():
+    """Test chunk in ordine qualsiasi, duplicati ignorati"""
+    start, chunks, end = _messages(SESSION, 100)
+    reassembler = BleSessionReassembler()
+    
+    assert reassembler.feed(start) is None
+    # L'ultimo chunk (più corto) per primo, poi in ordine inverso con duplicati
+    order = [chunks[-1]] + chunks[::-1] + [chunks[0], chunks[3]]
+    for chunk in order:
+        assert reassembler.feed(chunk) is None
+    assert reassembler.progress == 1.0
+    assert reassembler.duplicates == 3
+    
+    session = reassembler.feed(end)
+    assert session is not None
+    assert bytes(session.data) == SESSION
+    assert session.crc32 == zlib.crc32(SESSION)
+    assert not reassembler.in_progress
+    
+    # Chunk ritrasmessi dopo la fine: ignorati
+    assert reassembler.feed(chunks[0]) is None
+
+
+def test_end_before_last_chunk():
+    """Test session_end ricevuto prima dell'ultimo chunk"""
+    start, chunks, end = _messages(SESSION, 64)
+    reassembler = BleSessionReassembler()
+    reassembler.feed(start)
+    for chunk in chunks[:-1]:
+        reassembler.feed(chunk)
+    assert reassembler.feed(end) is None
+    assert bytes(reassembler.feed(chunks[-1]).data) == SESSION
+
+
+def test_crc_mismatch():
+    """Test CRC errato: sessione scartata"""
+    start, chunks, end = _messages(SESSION, 100)
+    reassembler = BleSessionReassembler()
+    reassembler.feed(start)
+    for chunk in chunks:
+        reassembler.feed(chunk)
+    
+    with pytest.raises(ValueError, match="CRC32"):
+        reassembler.feed(dict(end, crc32=end["crc32"] ^ 1))
+    assert not reassembler.in_progress
+
+
+def test_invalid_chunk_size_and_count():
+    """Test chunk di dimensione errata, chunk_id fuori intervallo, dimensioni non valide"""
+    start, chunks, end = _messages(SESSION, 100)
+    reassembler = BleSessionReassembler()
+    
+    # Chunk intermedio più corto di quello ricevuto per primo
+    reassembler.feed(start)
+    reassembler.feed(chunks[0])
+    short = dict(chunks[1], data=base64.b64encode(b"x" * 50).decode("ascii"))
+    with pytest.raises(ValueError, match="byte invece di"):
+        reassembler.feed(short)
+    assert not reassembler.in_progress
+    
+    # Ultimo chunk incompatibile con la dimensione totale
+    reassembler.feed(start)
+    wrong_last = dict(chunks[-1], data=base64.b64encode(b"x" * 7).decode("ascii"))
+    with pytest.raises(ValueError):
+        reassembler.feed(wrong_last)
+    
+    # chunk_id oltre total_chunks
+    reassembler.feed(start)
+    with pytest.raises(ValueError, match="fuori intervallo"):
+        reassembler.feed(dict(chunks[0], chunk_id=len(chunks) + 1))
+    
+    # Più chunk che byte, sessione oltre il limite
+    with pytest.raises(ValueError):
+        reassembler.feed(dict(start, total_chunks=10, total_bytes=5))
+    with pytest.raises(ValueError, match="troppo grande"):
+        BleSessionReassembler(max_bytes=100).feed(start)
+
+
+def test_session_restart_mid_transfer():
+    """Test nuova session_start durante un trasferimento: la precedente viene scartata"""
+    first_start, first_chunks, _ = _messages(SESSION, 100, session_id="prima")
+    other = SESSION[::-1]
+    start, chunks, end = _messages(other, 128, session_id="seconda")
+    
+    reassembler = BleSessionReassembler()
+    reassembler.feed(first_start)
+    for chunk in first_chunks[:3]:
+        reassembler.feed(chunk)
+    
+    reassembler.feed(start)
+    assert reassembler.session_id == "seconda"
+    assert reassembler.progress == 0.0
+    for chunk in chunks:
+        reassembler.feed(chunk)
+    session = reassembler.feed(end)
+    assert session.session_id == "seconda"
+    assert bytes(session.data) == other
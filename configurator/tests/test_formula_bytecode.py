@@ -0,0 +1,150 @@
+"""
+Test per il bytecode delle formule: conformità dell'interprete
+di riferimento (precisione float del firmware) con FormulaParser.evaluate
+"""
+
+import os
+import re
+import random
+import pytest
+from core.formula_parser import FormulaParser
+from core.formula_fuzz import random_formula
+from core.formula_bytecode import (
+    FormulaBytecode, compile_bytecode, run_bytecode, to_float32,
+    BYTECODE_VERSION, BYTECODE_MAX_STACK, OP_CONST, OP_VAR, OP_ADD, OP_DIV
+)
+
+
+VALORI = {"L": 1200.0, "H": 1500.0, "B": 50.0, "S": 20.0}
+
+TEMPLATE_FORMULAS = [
+    "L + 6",
+    "H - 12",
+    "(L + 6) / 2",
+    "L / 2",
+    "H - 15",
+    "L - 2*B + 6",
+    "round((L - 10) / 3, 1)",
+    "max(L, H) - min(B, S, 10)",
+    "abs(S - B) * -1",
+    "round(H / 7)",
+]
+
+
+def test_bytecode_layout():
+    """Test istruzioni postfix, pool costanti e slot variabili"""
+    bytecode = compile_bytecode("(L + 6) / 2")
+    
+    assert bytecode.variables == ["L"]
+    assert bytecode.constants == [6.0, 2.0]
+    assert bytecode.stack_size == 2
+    assert bytecode.code == bytes([
+        OP_VAR, 0, OP_CONST, 0, OP_ADD, OP_CONST, 1, OP_DIV
+    ])
+    
+    # Variabili e costanti ripetute condividono lo slot
+    bytecode = compile_bytecode("L * L + L")
+    assert bytecode.variables == ["L"]
+
+
+def test_bytecode_roundtrip():
+    """Test serializzazione binaria e dizionario (payload firmware)"""
+    bytecode = compile_bytecode("max(L, H) - 2.5 * B")
+    
+    data = bytecode.to_dict()
+    assert set(data) == {"vars", "program"}
+    
+    restored = FormulaBytecode.from_dict(data)
+    assert restored == bytecode
+    assert run_bytecode(restored, VALORI) == 1375.0
+    
+    with pytest.raises(ValueError):
+        FormulaBytecode.from_bytes(bytecode.to_bytes()[:6], bytecode.variables)
+
+
+@pytest.mark.parametrize("formula", TEMPLATE_FORMULAS)
+def test_bytecode_matches_evaluate(formula):
+    """Test conformità su formule tipiche dei template"""
+    parser = FormulaParser()
+    bytecode = compile_bytecode(formula, parser)
+    
+    assert run_bytecode(bytecode, VALORI) == to_float32(parser.evaluate(formula, VALORI))
+
+
+def test_bytecode_fuzz_conformance():
+    """
+    Fuzz: interprete bytecode e FormulaParser danno lo stesso risultato
+    (calcolo in double, risultato arrotondato a float come nel firmware)
+    """
+    rng = random.Random(2024)
+    parser = FormulaParser()
+    
+    for _ in range(500):
+        formula = random_formula(rng, rng.randint(1, 6))
+        bytecode = compile_bytecode(formula, parser)
+        
+        try:
+            expected = to_float32(parser.evaluate(formula, VALORI))
+        except ValueError:
+            with pytest.raises(ValueError):
+                run_bytecode(bytecode, VALORI)
+            continue
+        
+        assert run_bytecode(bytecode, VALORI) == expected
+
+
+def test_bytecode_float32():
+    """Test precisione del firmware: variabili e risultato float, calcolo in double"""
+    parser = FormulaParser()
+    
+    # 1200.1 non è rappresentabile come float: l'interprete usa il valore del firmware
+    assert run_bytecode(compile_bytecode("L", parser), {"L": 1200.1}) == to_float32(1200.1)
+    assert to_float32(1200.1) != 1200.1
+    
+    # Calcolo intermedio in double: 1e30 * 1e30 / 1e30 non trabocca
+    bytecode = compile_bytecode("L * H / H", parser)
+    assert run_bytecode(bytecode, {"L": 2.0, "H": 1e30}) == 2.0
+    
+    # Risultato fuori dall'intervallo float (il firmware restituirebbe inf)
+    with pytest.raises(ValueError):
+        run_bytecode(compile_bytecode("L * H", parser), {"L": 1e30, "H": 1e30})
+    with pytest.raises(ValueError):
+        to_float32(1e300)
+
+
+def test_bytecode_errors():
+    """Test errori: variabili mancanti, divisione per zero, formula non valida"""
+    with pytest.raises(ValueError) as exc_info:
+        run_bytecode(compile_bytecode("L + H"), {"L": 1.0})
+    assert "mancanti" in str(exc_info.value).lower()
+    
+    with pytest.raises(ValueError):
+        run_bytecode(compile_bytecode("L / (H - H)"), VALORI)
+    
+    with pytest.raises(ValueError):
+        compile_bytecode("L.__class__")
+
+
+def test_bytecode_stack_limit():
+    """Test limite stack condiviso con il firmware (FORMULA_BYTECODE_MAX_STACK)"""
+    header = os.path.join(os.path.dirname(__file__), '..', '..', 'firmware', 'main', 'formula_parser.h')
+    with open(header, 'r', encoding='utf-8') as f:
+        text = f.read()
+    assert int(re.search(r'FORMULA_BYTECODE_MAX_STACK\s+(\d+)', text).group(1)) == BYTECODE_MAX_STACK
+    assert int(re.search(r'FORMULA_BYTECODE_VERSION\s+(\d+)', text).group(1)) == BYTECODE_VERSION
+    
+    def wide(args: int) -> str:
+        # min con N argomenti: N valori sullo stack prima di OP_MIN
+        return "min(L, " + ", ".join(str(i + 2000) for i in range(args - 1)) + ")"
+    
+    ok = compile_bytecode(wide(BYTECODE_MAX_STACK))
+    assert ok.stack_size == BYTECODE_MAX_STACK
+    assert run_bytecode(ok, VALORI) == VALORI["L"]
+    
+    with pytest.raises(ValueError):
+        compile_bytecode(wide(BYTECODE_MAX_STACK + 1))
+    
+    data = bytearray(ok.to_bytes())
+    data[3] = BYTECODE_MAX_STACK + 1
+    with pytest.raises(ValueError):
+        FormulaBytecode.from_bytes(bytes(data), ok.variables)
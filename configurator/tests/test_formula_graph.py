@@ -0,0 +1,101 @@
+"""
+Test per FormulaGraph
+"""
+
+import pytest
+from core.formula_graph import FormulaGraph
+
+
+def test_graph_order_and_evaluate():
+    """Test ordine topologico e calcolo con risultati intermedi"""
+    formule = {
+        "taglio": "luce / 2",
+        "luce": "L - 12",
+        "vetro": "H - 10",
+    }
+    graph = FormulaGraph(formule)
+    
+    assert graph.order.index("luce") < graph.order.index("taglio")
+    assert graph.inputs == ["H", "L"]
+    
+    results = graph.evaluate({"L": 1212, "H": 1500})
+    assert results == {"taglio": 600.0, "luce": 1200.0, "vetro": 1490.0}
+
+
+def test_graph_cycle_detection():
+    """Test rilevamento dipendenze circolari"""
+    with pytest.raises(ValueError) as exc_info:
+        FormulaGraph({"a": "b + L", "b": "c * 2", "c": "a - 1"})
+    assert "circolare" in str(exc_info.value).lower()
+    
+    with pytest.raises(ValueError):
+        FormulaGraph({"a": "a + 1"})
+
+
+def test_graph_incremental_update():
+    """Test ricalcolo solo dei risultati a valle della variabile modificata"""
+    graph = FormulaGraph({
+        "luce": "L - 12",
+        "taglio": "luce / 2",
+        "vetro": "H - 10",
+        "area": "taglio * vetro",
+    })
+    
+    assert graph.dependents("H") == ["vetro", "area"]
+    
+    graph.evaluate({"L": 1212, "H": 1500})
+    
+    updated = graph.update({"H": 1000})
+    assert list(updated) == ["vetro", "area"]
+    assert updated["area"] == 600.0 * 990.0
+    
+    # Valore invariato: nulla da ricalcolare
+    assert graph.update({"H": 1000}) == {}
+    
+    assert graph.results()["luce"] == 1200.0
+    
+    # Calcolo fallito (divisione per zero): variabili e risultati invariati
+    graph = FormulaGraph({"luce": "L - 12", "rapporto": "luce / (H - 1000)"})
+    graph.evaluate({"L": 1212, "H": 1500})
+    with pytest.raises(ValueError):
+        graph.update({"L": 1000, "H": 1000})
+    assert graph.results() == {"luce": 1200.0, "rapporto": 2.4}
+    assert graph.update({"L": 1012}) == {"luce": 1000.0, "rapporto": 2.0}
+    
+    with pytest.raises(ValueError):
+        graph.evaluate({"L": 1212, "H": 1000})
+    assert graph.results() == {"luce": 1000.0, "rapporto": 2.0}
+
+
+def test_graph_inline():
+    """Test formule indipendenti: risultati intermedi sostituiti dalle loro formule"""
+    formule = {
+        "taglio": "luce / 2",
+        "luce": "L - 12",
+        "area": "taglio * (H - 10)",
+    }
+    graph = FormulaGraph(formule)
+    inlined = graph.inline()
+    
+    assert list(inlined) == list(formule)
+    assert inlined["luce"] == "L - 12"
+    assert inlined["taglio"] == "(L - 12) / 2"
+    assert inlined["area"] == "(L - 12) / 2 * (H - 10)"
+    
+    # Ogni formula usa solo le variabili misurate e dà lo stesso risultato
+    for formula in inlined.values():
+        assert set(graph.parser.get_variables(formula)) <= set(graph.inputs)
+    single = FormulaGraph(inlined)
+    assert single.evaluate({"L": 1212, "H": 1510}) == graph.evaluate({"L": 1212, "H": 1510})
+
+
+def test_graph_invalid_formula():
+    """Test formula non valida nel grafo"""
+    with pytest.raises(ValueError) as exc_info:
+        FormulaGraph({"luce": "L - * 12"})
+    assert "luce" in str(exc_info.value)
+    
+    graph = FormulaGraph({"luce": "L - 12"})
+    with pytest.raises(ValueError) as exc_info:
+        graph.evaluate({})
+    assert "mancanti" in str(exc_info.value).lower()
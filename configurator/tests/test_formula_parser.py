@@ -3,7 +3,10 @@ Test per FormulaParser
 """
 
 import pytest
-from core.formula_parser import FormulaParser
+from core.formula_parser import FormulaParser, HAS_NUMPY, tolerance_intervals, get_formula_parser
+
+if HAS_NUMPY:
+    import numpy as np
 
 
 def test_formula_parser_init():
@@ -23,6 +26,13 @@ def test_parse_simple_expression():
     # Somma
     result = parser.parse("10 + 5")
     assert result is not None
+    
+    # Struttura annidata
+    assert parser.parse("(L + 6) / 2") == [["L", "+", 6.0], "/", 2.0]
+    assert parser.parse("round(-L)") == ["round", ["-", "L"]]
+    
+    with pytest.raises(ValueError):
+        parser.parse("L +")
 
 
 def test_validate_formula():
@@ -103,5 +113,204 @@ def test_test_formula():
     assert isinstance(result, str)
 
 
+def test_compile_formula():
+    """Test compilazione formula riutilizzabile"""
+    parser = FormulaParser()
+    
+    compiled = parser.compile("(L + 6) / 2")
+    assert compiled.variables == ["L"]
+    assert compiled.evaluate({"L": 1200}) == 603.0
+    
+    # Formula già compilata: stessa istanza dalla cache
+    assert parser.compile("(L + 6) / 2") is compiled
+    
+    with pytest.raises(ValueError):
+        parser.compile("L + * 2")
+
+
+def test_compile_cache_lru():
+    """Test cache LRU limitata delle formule compilate"""
+    parser = FormulaParser(cache_size=2)
+    
+    first = parser.compile("L + 1")
+    parser.compile("L + 2")
+    parser.compile("L + 1")  # Rende "L + 1" la più recente
+    parser.compile("L + 3")  # Scarta "L + 2"
+    
+    assert parser.compile("L + 1") is first
+    assert len(parser._compiled) == 2
+    assert "L + 2" not in parser._compiled
+
+
+def test_optimize_formula():
+    """Test constant folding e normalizzazione formule"""
+    parser = FormulaParser()
+    
+    assert parser.optimize("L - 2*6 + 0.5") == "L - 11.5"
+    assert parser.optimize("(L + 6) / 2") == "(L + 6) / 2"
+    assert parser.optimize("L * 2 / 4") == "L * 0.5"
+    assert parser.optimize("10 - L - 3") == "7 - L"
+    assert parser.optimize("-(-L) + 0") == "L"
+    assert parser.optimize("min(L, 3 + 4)") == "min(L, 7)"
+    assert parser.optimize("1e-5 + L") == "L + 0.00001"
+    
+    # Divisione per zero costante non viene calcolata in anticipo
+    assert parser.optimize("L / (2 - 2)") == "L / 0"
+    with pytest.raises(ValueError):
+        parser.evaluate("L / (2 - 2)", {"L": 100})
+    
+    # Divisore composto: resta un termine unico (con B = 0 la divisione per zero resta)
+    assert parser.optimize("L / (H / B)") == "L / (H / B)"
+    assert parser.optimize("L * 2 / (3 * H)") == "L / (H * 3) * 2"
+    assert parser.optimize("L / (4 / 2)") == "L / 2"
+    zero = {"L": 1200.0, "H": 1500.0, "B": 0.0}
+    with pytest.raises(ValueError):
+        parser.evaluate("L / (H / B)", zero)
+    if HAS_NUMPY:
+        columns = {name: np.array([value, 1.0]) for name, value in zero.items()}
+        result = parser.evaluate_batch("L / (H / B)", columns)
+        assert np.isnan(result[0]) and result[1] == 1.0
+    
+    # Costanti non finite: rifiutate; prodotti che traboccano non vengono calcolati
+    for formula in ["L * 1e400", "1e400 - 1e400 + L", "L * " + "9" * 400]:
+        with pytest.raises(ValueError):
+            parser.optimize(formula)
+        with pytest.raises(ValueError):
+            parser.compile(formula)
+    assert "Infinity" not in parser.optimize("L * 1e308 * 10")
+    
+    # Formula ottimizzata equivalente all'originale
+    original = FormulaParser(optimize=False)
+    for formula in ["L - 2*6 + 0.5", "(H - 3) * 2 / 4 - B", "-(L + H) * 2"]:
+        values = {"L": 1234.5, "H": 987.25, "B": 15.0}
+        assert parser.evaluate(formula, values) == pytest.approx(original.evaluate(formula, values))
+        assert parser.evaluate(parser.optimize(formula), values) == \
+            pytest.approx(original.evaluate(formula, values))
+
+
+def test_validation_cache():
+    """Test cache di variabili e validazioni (per formula e insieme di variabili)"""
+    parser = FormulaParser()
+    
+    variables = parser.get_variables("L + H * L")
+    assert variables == ["L", "H"]
+    variables.append("X")
+    assert parser.get_variables("L + H * L") == ["L", "H"]
+    
+    assert parser.validate("L + H", ["L", "H"]) == (True, "")
+    assert parser.validate("L + H", ["H", "L"]) == (True, "")
+    assert len(parser._validation_cache) == 1
+    
+    # Stessa formula, variabili diverse: esito diverso
+    valid, message = parser.validate("L + H", ["L"])
+    assert valid is False
+    assert "H" in message
+    
+    parser.clear_cache()
+    assert not parser._validation_cache and not parser._variables_cache
+
+
+def test_shared_parser():
+    """Test istanza condivisa: stessa cache per tutti i punti di utilizzo"""
+    from core.formula_graph import FormulaGraph
+    
+    parser = get_formula_parser()
+    assert parser is get_formula_parser()
+    
+    compiled = parser.compile("L * 2 + 1")
+    assert parser.compile("L * 2 + 1") is compiled
+    
+    graph = FormulaGraph({"a": "L * 2 + 1"})
+    assert graph.parser is parser
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="NumPy non disponibile")
+def test_evaluate_batch():
+    """Test valutazione vettoriale su colonne NumPy"""
+    parser = FormulaParser()
+    
+    columns = {"L": np.array([1200.0, 1000.0, 801.0]), "B": np.array([50.0, 50.0, 49.0])}
+    
+    result = parser.evaluate_batch("(L + 6) / 2", columns)
+    assert result.tolist() == [603.0, 503.0, 403.5]
+    
+    # Funzioni mappate su NumPy, confronto con la valutazione scalare
+    formula = "round(max(L, 1000) - min(B, 50) / 3) + abs(B - L)"
+    result = parser.evaluate_batch(formula, columns)
+    expected = [
+        parser.evaluate(formula, {"L": l, "B": b})
+        for l, b in zip(columns["L"], columns["B"])
+    ]
+    assert result.tolist() == expected
+    
+    # round con cifre come round() di Python (2.675 e 1.005 non sono esattamente a metà)
+    halves = {"L": np.array([2.675, 1.005, 2679.95, 0.125, -0.375, 1e17, 5e-324])}
+    result = parser.evaluate_batch("round(L, 2)", halves)
+    assert result.tolist() == [round(value, 2) for value in halves["L"].tolist()]
+    assert result.tolist()[:2] == [2.67, 1.0]
+    assert parser.evaluate_batch("round(L, -1)", {"L": np.array([25.0, 35.0, 2679.95])}).tolist() \
+        == [20.0, 40.0, 2680.0]
+    
+    rng = np.random.default_rng(3)
+    random_values = {"L": np.round(rng.uniform(-5000, 5000, 2000), 3) + rng.choice([0.0, 5e-4], 2000)}
+    for formula in ["round(L, 1)", "round(L / 3, 2)", "round(L * 1.1, 3)"]:
+        expected = [parser.evaluate(formula, {"L": value}) for value in random_values["L"].tolist()]
+        assert parser.evaluate_batch(formula, random_values).tolist() == expected
+    
+    # Formula costante: un risultato per riga
+    assert parser.evaluate_batch("2 * 3", columns).tolist() == [6.0, 6.0, 6.0]
+    
+    with pytest.raises(ValueError) as exc_info:
+        parser.evaluate_batch("L + H", columns)
+    assert "mancanti" in str(exc_info.value).lower()
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="NumPy non disponibile")
+def test_evaluate_interval():
+    """Test propagazione della tolleranza attraverso le formule"""
+    parser = FormulaParser()
+    
+    lo, hi = parser.evaluate_interval("(L + 6) / 2", tolerance_intervals({"L": 1200.0}, 0.005))
+    assert lo[0] == pytest.approx(602.9975)
+    assert hi[0] == pytest.approx(603.0025)
+    
+    # Sottrazione: le tolleranze si sommano
+    lo, hi = parser.evaluate_interval("L - H", {"L": (999.0, 1001.0), "H": (499.0, 501.0)})
+    assert (lo[0], hi[0]) == (498.0, 502.0)
+    
+    # Divisore che contiene lo zero: intervallo illimitato
+    lo, hi = parser.evaluate_interval("L / H", {"L": (1.0, 2.0), "H": (-1.0, 1.0)})
+    assert (lo[0], hi[0]) == (-np.inf, np.inf)
+    
+    with pytest.raises(ValueError):
+        parser.evaluate_interval("L + 1", {"L": (2.0, 1.0)})
+    
+    with pytest.raises(ValueError) as exc_info:
+        parser.evaluate_interval("L + H", {"L": (1.0, 2.0)})
+    assert "mancanti" in str(exc_info.value).lower()
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="NumPy non disponibile")
+def test_evaluate_interval_contains_samples():
+    """Test che l'intervallo contenga ogni valore ottenibile dentro le tolleranze"""
+    parser = FormulaParser()
+    rng = np.random.default_rng(7)
+    formula = "round(max(L, H) / (B + 10), 2) - abs(S - B) * min(L, 2) + -H"
+    
+    nominali = {name: rng.uniform(-100, 1500, 200) for name in "LHBS"}
+    nominali["B"] = rng.uniform(0, 100, 200)
+    intervalli = tolerance_intervals(nominali, {"L": 0.5, "H": 0.5, "B": 1.0, "S": 0.1})
+    lo, hi = parser.evaluate_interval(formula, intervalli)
+    
+    for _ in range(20):
+        campione = {
+            name: rng.uniform(intervalli[name][0], intervalli[name][1])
+            for name in "LHBS"
+        }
+        result = parser.evaluate_batch(formula, campione)
+        assert np.all(result >= lo - 1e-9)
+        assert np.all(result <= hi + 1e-9)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
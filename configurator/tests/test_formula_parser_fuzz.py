@@ -0,0 +1,144 @@
+"""
+Fuzz test per FormulaParser: le formule con accesso ad attributi,
+nomi dunder o costrutti Python non consentiti devono essere rifiutate
+"""
+
+import ast
+import random
+import pytest
+from core.formula_parser import FormulaParser
+from core.formula_fuzz import random_formula
+
+
+# Nodi ammessi in una formula valida
+ALLOWED_NODES = (
+    ast.Expression, ast.Constant, ast.Name, ast.Load,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div,
+    ast.UnaryOp, ast.USub, ast.UAdd, ast.Call,
+)
+
+MALICIOUS = [
+    "().__class__",
+    "().__class__.__bases__[0].__subclasses__()",
+    "L.__class__",
+    "L.real",
+    "math.pi",
+    "__import__('os')",
+    "__builtins__",
+    "_L + 1",
+    "globals()",
+    "open('/etc/passwd')",
+    "(lambda: 1)()",
+    "[x for x in (1, 2)]",
+    "{'a': 1}",
+    "L[0]",
+    "'abc'",
+    "b'abc'",
+    "L if H else B",
+    "L ** 2",
+    "L // 2",
+    "L % 2",
+    "L == H",
+    "L and H",
+    "not L",
+    "~L",
+    "(L := 5)",
+    "round(L, ndigits=2)",
+    "max(*[L, H])",
+    "min(L)",
+    "abs(L, H)",
+    "round",
+    "f'{L}'",
+    "True + L",
+    "1j + L",
+    "None",
+    "...",
+    "getattr(L, 'real')",
+    "round.__call__(L)",
+    "(round)(L).__class__",
+    "L; import os",
+    "L\x00",
+]
+
+
+@pytest.mark.parametrize("formula", MALICIOUS)
+def test_rejects_malicious(formula):
+    """Test che le formule non consentite vengano rifiutate in compilazione"""
+    parser = FormulaParser()
+    
+    with pytest.raises(ValueError):
+        parser.compile(formula)
+    
+    valid, message = parser.validate(formula, ["L", "H", "B"])
+    assert valid is False
+    assert message
+
+
+def _mutate(rng: random.Random, formula: str) -> str:
+    """Inserisce frammenti pericolosi in una posizione casuale"""
+    fragments = [".", "_", "__", "[", "]", "'", ".__class__", "lambda", ",", ":",
+                 "=", "**", "(", ")", "import", "__dict__", "x for x in L", "@", ";"]
+    pos = rng.randint(0, len(formula))
+    return formula[:pos] + rng.choice(fragments) + formula[pos:]
+
+
+def test_fuzz_mutations_never_escape():
+    """Fuzz: formule mutate vengono rifiutate o contengono solo nodi ammessi"""
+    rng = random.Random(1234)
+    parser = FormulaParser()
+    valori = {"L": 1200.0, "H": 1500.0, "B": 50.0, "S": 20.0}
+    
+    for _ in range(2000):
+        formula = _mutate(rng, random_formula(rng, rng.randint(1, 5)))
+        
+        try:
+            compiled = parser.compile(formula)
+        except ValueError:
+            continue
+        
+        for node in ast.walk(compiled.tree):
+            assert isinstance(node, ALLOWED_NODES), f"{formula!r}: {type(node).__name__}"
+            if isinstance(node, ast.Name):
+                assert not node.id.startswith("_")
+        
+        # La valutazione fallisce solo con ValueError
+        try:
+            compiled.evaluate(valori)
+        except ValueError:
+            pass
+
+
+def test_fuzz_valid_formulas_match_python():
+    """
+    Fuzz: formule valide danno lo stesso risultato dell'aritmetica Python
+    (a meno degli arrotondamenti introdotti dal constant folding)
+    """
+    rng = random.Random(42)
+    parser = FormulaParser()
+    namespace = {"round": round, "abs": abs, "min": min, "max": max}
+    
+    for _ in range(500):
+        formula = random_formula(rng, rng.randint(1, 6))
+        # Anche variabili nulle: l'ottimizzazione non deve nascondere divisioni per zero
+        valori = {"L": 1200.0, "H": 1500.0, "B": 50.0, "S": 20.0}
+        if rng.random() < 0.3:
+            valori[rng.choice(sorted(valori))] = 0.0
+        try:
+            expected = float(eval(formula, {"__builtins__": {}}, dict(namespace, **valori)))
+        except ZeroDivisionError:
+            with pytest.raises(ValueError):
+                parser.evaluate(formula, valori)
+            continue
+        
+        assert parser.evaluate(formula, valori) == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+def test_deeply_nested_formula_rejected():
+    """Test che formule troppo annidate vengano rifiutate senza crash"""
+    parser = FormulaParser()
+    
+    with pytest.raises(ValueError):
+        parser.compile("-" * 5000 + "L")
+    
+    with pytest.raises(ValueError):
+        parser.compile("(" * 1000 + "L" + ")" * 1000)
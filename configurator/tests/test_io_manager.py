@@ -9,6 +9,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from pathlib import Path
 import tempfile
 import json
+import gzip
+from core import io_manager as io_manager_module
 from core.io_manager import IOManager
 
 
@@ -53,6 +55,288 @@ def test_export_import_measures_jsonl():
         assert len(imported_all) == 3
 
 
+def test_iter_measures_jsonl():
+    """Test lettura JSONL in streaming con proiezione, filtro e batch"""
+    manager = IOManager()
+    
+    measures = [
+        {"timestamp": 1700000000 + i, "mode": "vetri" if i % 3 == 0 else "calibro",
+         "value": float(i), "notes": "x" * 10}
+        for i in range(10)
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "20240101.jsonl"
+        manager.export_measures_jsonl(measures, path, append=False)
+        
+        # Ultima linea troncata (scrittura interrotta): viene saltata
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"timestamp": 17000')
+        
+        records = list(manager.iter_measures_jsonl(path, fields=["timestamp", "value"]))
+        assert len(records) == 10
+        assert records[0] == {"timestamp": 1700000000, "value": 0.0}
+        
+        vetri = list(manager.iter_measures_jsonl(path, where=lambda m: m["mode"] == "vetri"))
+        assert [m["value"] for m in vetri] == [0.0, 3.0, 6.0, 9.0]
+        
+        batches = list(manager.iter_measures_jsonl(path, batch_size=4))
+        assert [len(b) for b in batches] == [4, 4, 2]
+        
+        assert manager.count_measures_jsonl(path) == 10
+        assert manager.count_measures_jsonl(Path(tmpdir) / "missing.jsonl") is None
+
+
+def test_export_import_measures_binary():
+    """Test export/import misure nel formato binario del firmware"""
+    manager = IOManager()
+    
+    measures = [
+        {"timestamp": 1700000000 + i, "mode": "astine", "value": 100.0 + i,
+         "value2": 0.0, "material": "Alluminio", "profile": "", "notes": ""}
+        for i in range(5)
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = Path(tmpdir) / "backup_20240101.bin"
+        
+        assert manager.export_measures_binary(measures, path) is True
+        
+        # Timestamp ISO, come nelle misure esportate da export_measures_jsonl
+        iso = [dict(measures[0], timestamp="2024-02-01T10:15:00")]
+        assert manager.export_measures_binary(iso, Path(tmpdir) / "iso.bin") is True
+        
+        records = manager.import_measures_binary(path)
+        assert records is not None
+        assert len(records) == 5
+        
+        # Record corrotto: scartato all'import
+        data = bytearray(path.read_bytes())
+        data[0] ^= 0xFF
+        path.write_bytes(bytes(data))
+        
+        assert len(manager.import_measures_binary(path)) == 4
+        assert len(manager.import_measures_binary(path, verify_crc=False)) == 5
+        
+        imported = list(manager.iter_measures_binary(path, fields=["timestamp", "value"]))
+        assert imported[0] == {"timestamp": 1700000001, "value": 101.0}
+        
+        batches = list(manager.iter_measures_binary(path, batch_size=3, verify_crc=False))
+        assert [len(b) for b in batches] == [3, 2]
+        
+        assert manager.import_measures_binary(Path(tmpdir) / "missing.bin") is None
+
+
+def test_import_measures_to_store():
+    """Test import JSONL, CSV firmware e binario nell'archivio colonnare"""
+    manager = IOManager()
+    
+    measures = [
+        {"timestamp": 1700000000 + i * 60, "mode": "vetri", "value": 500.0 + i,
+         "value2": 800.0, "material": "PVC", "profile": "", "notes": ""}
+        for i in range(6)
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        manager.export_measures_jsonl(measures[:2], tmpdir / "20231114.jsonl", append=False)
+        manager.export_measures_binary(measures[2:4], tmpdir / "backup.bin")
+        
+        with open(tmpdir / "export.csv", 'w', encoding='utf-8') as f:
+            f.write("Timestamp,Mode,Value(mm),Value2(mm),Material,Profile,Notes\n")
+            f.write("2023-11-15 10:00:00,Calibro,123.400,0.000,Alluminio,Serie 45,\n")
+        
+        store = manager.open_measure_store(tmpdir / "store")
+        assert store is not None
+        
+        assert manager.import_measures_to_store(store, tmpdir / "20231114.jsonl") == 2
+        assert manager.import_measures_to_store(store, tmpdir / "backup.bin") == 2
+        assert manager.import_measures_to_store(store, tmpdir / "export.csv") == 1
+        assert manager.import_measures_to_store(store, tmpdir / "missing.jsonl") is None
+        
+        # Modalità fuori intervallo: errore riportato, nessuna eccezione
+        with open(tmpdir / "overflow.jsonl", 'w', encoding='utf-8') as f:
+            f.write('{"timestamp": 1700000000, "mode": 300, "value": 1.0}\n')
+        assert manager.import_measures_to_store(store, tmpdir / "overflow.jsonl") is None
+        
+        assert store.count(modes=["vetri"]) == 4
+        calibro = store.query(modes=["calibro"])
+        assert calibro["profile"][0] == "Serie 45"
+        assert abs(calibro["value_mm"][0] - 123.4) < 1e-4
+
+
+def test_iter_measures_directory():
+    """Test import cartella: file in parallelo uniti in ordine di timestamp"""
+    manager = IOManager()
+    
+    def day(start, count):
+        return [{"timestamp": start + i * 7200, "mode": "calibro", "value": float(i)}
+                for i in range(count)]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        # Sessioni sovrapposte nel tempo, una salvata in ordine inverso
+        manager.export_measures_jsonl(day(1700000000, 20), tmpdir / "20231114.jsonl", append=False)
+        manager.export_measures_jsonl(day(1700003600, 20)[::-1], tmpdir / "20231115.jsonl", append=False)
+        manager.export_measures_binary(day(1700001800, 5), tmpdir / "backup.bin")
+        (tmpdir / "notes.txt").write_text("ignorato")
+        
+        # File non ordinato anche su più blocchi di spill
+        for workers, run_size in ((1, 100_000), (2, 100_000), (2, 7)):
+            io_manager_module.SORT_RUN_SIZE = run_size
+            try:
+                progress = []
+                measures = list(manager.iter_measures_directory(
+                    tmpdir, progress_callback=lambda d, t: progress.append((d, t)),
+                    max_workers=workers))
+            finally:
+                io_manager_module.SORT_RUN_SIZE = 100_000
+            
+            timestamps = [m["timestamp"] for m in measures]
+            assert len(timestamps) == 45
+            assert timestamps == sorted(timestamps)
+            assert progress[0] == (0, 3)
+            assert progress[-1] == (3, 3)
+        
+        # Flusso abbandonato: spill eliminati
+        before = set(Path(tempfile.gettempdir()).glob("measure_merge_*"))
+        stream = manager.iter_measures_directory(tmpdir, max_workers=1)
+        next(stream)
+        spill_dirs = set(Path(tempfile.gettempdir()).glob("measure_merge_*")) - before
+        assert len(spill_dirs) == 1 and any(next(iter(spill_dirs)).iterdir())
+        stream.close()
+        assert not any(d.exists() for d in spill_dirs)
+
+
+def test_iter_measures_directory_runs_and_errors():
+    """Test spill: file letto una volta, blocchi in ordine uniti, file illeggibili segnalati"""
+    manager = IOManager()
+    measures = [{"timestamp": 1700000000 + i * 60, "mode": "calibro", "value": float(i)}
+                for i in range(20)]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        manager.export_measures_jsonl(measures, tmpdir / "sorted.jsonl", append=False)
+        manager.export_measures_jsonl(measures[::-1], tmpdir / "reversed.jsonl", append=False)
+        
+        # File ordinato: un solo spill anche su più blocchi; non ordinato: uno per blocco
+        spill_dir = tmpdir / "spill"
+        spill_dir.mkdir()
+        spills, error = io_manager_module._prepare_sorted_runs(
+            str(tmpdir / "sorted.jsonl"), str(spill_dir), 7)
+        assert error is None and len(spills) == 1
+        assert [m for _key, m in io_manager_module._iter_spill(spills[0])] == measures
+        spills, error = io_manager_module._prepare_sorted_runs(
+            str(tmpdir / "reversed.jsonl"), str(spill_dir), 7)
+        assert error is None and len(spills) == 3
+        
+        # Archivio troncato: errore a metà lettura, file escluso e segnalato
+        with open(tmpdir / "sorted.jsonl", 'rb') as f:
+            data = gzip.compress(f.read() * 50)
+        (tmpdir / "broken.jsonl.gz").write_bytes(data[:len(data) // 2])
+        spills, error = io_manager_module._prepare_sorted_runs(
+            str(tmpdir / "broken.jsonl.gz"), str(spill_dir), 7)
+        assert spills == [] and error
+        
+        for workers in (1, 2):
+            errors = []
+            result = list(manager.iter_measures_directory(
+                tmpdir, max_workers=workers,
+                error_callback=lambda path, message: errors.append(path.name)))
+            assert [m["value"] for m in result] == [float(i) for i in range(20) for _ in (0, 1)]
+            assert errors == ["broken.jsonl.gz"]
+
+
+def test_compute_measure_stats():
+    """Test statistiche in streaming da file, cartella (in parallelo) e flusso"""
+    manager = IOManager()
+    
+    measures = [
+        {"timestamp": 1700000000 + i, "mode": "vetri" if i % 2 else "astine",
+         "value": float(i), "material": "PVC"}
+        for i in range(100)
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        manager.export_measures_jsonl(measures[:60], tmpdir / "20231114.jsonl", append=False)
+        manager.export_measures_binary(measures[60:], tmpdir / "backup.bin")
+        
+        single = manager.compute_measure_stats(tmpdir / "20231114.jsonl", group_by="mode")
+        assert single.total.count == 60
+        assert single.get("astine").count == 30
+        
+        for workers in (1, 2):
+            stats = manager.compute_measure_stats(tmpdir, group_by="mode", max_workers=workers)
+            assert stats.total.count == 100
+            assert abs(stats.total.mean - 49.5) < 1e-9
+            assert stats.get("vetri").max == 99.0
+        
+        streamed = manager.compute_measure_stats(
+            manager.iter_measures_jsonl(tmpdir / "20231114.jsonl", batch_size=16))
+        assert streamed.total.count == 60
+        
+        assert manager.compute_measure_stats(tmpdir / "missing.jsonl") is None
+
+
+def test_measure_directory_firmware_csv():
+    """Test cartella con JSONL e CSV del firmware: stesso schema delle misure"""
+    manager = IOManager()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        manager.export_measures_jsonl(
+            [{"timestamp": 1706700000, "mode": "vetri", "value": 10.0}],
+            tmpdir / "20240201.jsonl", append=False)
+        (tmpdir / "export.csv").write_text(
+            "Timestamp,Mode,Value(mm),Value2(mm),Material,Profile,Notes\n"
+            "2024-02-01 16:00:00,Vetri,20.00,0.00,PVC,,\n", encoding="utf-8")
+        
+        measures = list(manager.iter_measures_directory(tmpdir, max_workers=1))
+        assert [m["mode"] for m in measures] == ["vetri", "vetri"]
+        assert measures[1]["value"] == "20.00" and measures[1]["material"] == "PVC"
+        
+        stats = manager.compute_measure_stats(tmpdir, group_by="mode", max_workers=1)
+        assert stats.skipped == 0
+        assert stats.get("vetri").count == 2
+
+
+def test_open_measure_journal():
+    """Test journal: misure singole leggibili con iter_measures_jsonl"""
+    manager = IOManager()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        journal = manager.open_measure_journal(Path(tmpdir), auto_flush=False)
+        assert journal is not None
+        
+        for i in range(10):
+            journal.append({"timestamp": 1700000000 + i, "value": float(i)})
+        journal.close()
+        
+        measures = list(manager.iter_measures_jsonl(journal.current_path))
+        assert [m["value"] for m in measures] == [float(i) for i in range(10)]
+
+
+def test_import_measures_session():
+    """Test import di una sessione ricevuta in memoria (trasferimento BLE)"""
+    manager = IOManager()
+    
+    data = bytearray(
+        b'{"timestamp": 1706800100, "mode": "calibro", "value": 123.45}\n'
+        b'\n'
+        b'{"timestamp": 1706800200, "mode": "vetri", "value": 1188.0, "material": "Alluminio \xc3\xa8"}\n'
+        b'{"timestamp": 17068'
+    )
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_path = Path(tmpdir) / "sessions" / "20240201.jsonl"
+        measures = manager.import_measures_session(data, output_path)
+        
+        assert [m["timestamp"] for m in measures] == [1706800100, 1706800200]
+        assert measures[1]["material"] == "Alluminio è"
+        assert output_path.read_bytes() == bytes(data)
+
+
 def test_export_import_measures_csv():
     """Test export/import misure CSV"""
     manager = IOManager()
@@ -77,6 +361,127 @@ def test_export_import_measures_csv():
         assert float(imported[0]["value"]) == 123.45
 
 
+def test_export_measures_csv_stream():
+    """Test export CSV in streaming: header completo e decimali per modalità"""
+    manager = IOManager()
+    
+    measures = [
+        {"timestamp": 1700000000, "mode": "calibro", "value": 12.3456},
+        {"timestamp": 1700000060, "mode": "vetri", "value": 800.0, "value2": 1200.04},
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        jsonl_path = Path(tmpdir) / "20231114.jsonl"
+        csv_path = Path(tmpdir) / "export.csv"
+        manager.export_measures_jsonl(measures, jsonl_path, append=False)
+        
+        count = manager.export_measures_csv_stream(
+            manager.iter_measures_jsonl(jsonl_path), csv_path,
+            modes={"calibro": 3, "vetri": 1}
+        )
+        assert count == 2
+        
+        imported = manager.import_measures_csv(csv_path)
+        assert list(imported[0].keys()) == ["timestamp", "mode", "value", "value2"]
+        assert imported[0]["value"] == "12.346"
+        assert imported[1]["value2"] == "1200.0"
+        
+        # Anche export_measures_csv non perde i campi assenti nella prima misura
+        assert manager.export_measures_csv(measures, csv_path) is True
+        assert "value2" in manager.import_measures_csv(csv_path)[0]
+
+
+def test_import_measures_csv_typed():
+    """Test import CSV tipizzato"""
+    manager = IOManager()
+    
+    measures = [
+        {"timestamp": 1700000000, "mode": "calibro", "value": 12.3456},
+        {"timestamp": 1700000060, "mode": "vetri", "value": 800.0, "value2": 1200.04},
+    ]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        csv_path = Path(tmpdir) / "export.csv"
+        manager.export_measures_csv(measures, csv_path)
+        
+        columns = manager.import_measures_csv_typed(csv_path)
+        assert columns["timestamp"].tolist() == [1700000000, 1700000060]
+        assert columns["value"].tolist() == [12.3456, 800.0]
+        assert list(columns["mode"]) == ["calibro", "vetri"]
+        
+        assert manager.import_measures_csv_typed(csv_path, schema={"value": "bool"}) is None
+        assert manager.import_measures_csv_typed(Path(tmpdir) / "missing.csv") is None
+
+
+def test_archive_measure_sessions():
+    """Test archiviazione sessioni e lettura trasparente dei file compressi"""
+    manager = IOManager()
+    
+    measures = [{"timestamp": 1700000000 + i * 60, "mode": "calibro", "value": float(i)}
+                for i in range(20)]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        session = Path(tmpdir) / "20231114.jsonl"
+        manager.export_measures_jsonl(measures, session, append=False)
+        
+        archiver = manager.archive_measure_sessions(tmpdir, older_than_days=30, background=False)
+        archive = Path(tmpdir) / "20231114.jsonl.gz"
+        assert archiver.archived == [archive]
+        
+        assert manager.import_measures_jsonl(archive) == measures
+        assert manager.count_measures_jsonl(archive) == 20
+        assert list(manager.iter_measures_directory(tmpdir, max_workers=1)) == measures
+        
+        selected = list(manager.iter_measures_range(archive, 1700000000 + 300, 1700000000 + 600))
+        assert [m["value"] for m in selected] == [5.0, 6.0, 7.0, 8.0, 9.0]
+        
+        assert manager.archive_measure_sessions(tmpdir, codec="lz4") is None
+
+
+def test_ingest_measures():
+    """Test import idempotente: sorgenti sovrapposte senza duplicati"""
+    manager = IOManager()
+    
+    measures = [{"timestamp": 1700000000 + i, "mode": "calibro", "value": float(i)}
+                for i in range(10)]
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sd_dump = Path(tmpdir) / "dump.bin"
+        output = Path(tmpdir) / "measures.jsonl"
+        manager.export_measures_binary(measures[:6], sd_dump)
+        
+        result = manager.ingest_measures(sd_dump, output)
+        assert result == {"imported": 6, "duplicates": 0, "invalid": 0}
+        
+        # Sessione BLE sovrapposta: solo le ultime 4 misure sono nuove
+        result = manager.ingest_measures(iter(measures + [{"mode": "calibro"}]), output, batch_size=3)
+        assert result == {"imported": 4, "duplicates": 6, "invalid": 1}
+        
+        assert manager.ingest_measures(sd_dump, output)["imported"] == 0
+        assert [m["value"] for m in manager.iter_measures_jsonl(output)] == [float(i) for i in range(10)]
+        assert (Path(tmpdir) / "measures.jsonl.keys").exists()
+
+
+def test_sync_sd_mirror():
+    """Test sincronizzazione incrementale della SD"""
+    manager = IOManager()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        card = Path(tmpdir) / "sd"
+        mirror = Path(tmpdir) / "mirror"
+        session = card / "sessions" / "20240301.jsonl"
+        manager.export_measures_jsonl([{"timestamp": 1709280000, "value": 1.0}], session)
+        
+        result = manager.sync_sd_mirror(mirror, source_root=card)
+        assert result["new_files"] == 1
+        
+        result = manager.sync_sd_mirror(mirror, source_root=card)
+        assert result["unchanged_files"] == 1 and result["bytes_copied"] == 0
+        assert manager.import_measures_jsonl(mirror / "sessions" / "20240301.jsonl")[0]["value"] == 1.0
+        
+        assert manager.sync_sd_mirror(mirror, source_root=Path(tmpdir) / "missing") is None
+
+
 def test_export_import_config():
     """Test export/import configurazione"""
     manager = IOManager()
@@ -104,6 +509,23 @@ def test_export_import_config():
         assert imported["schema_version"] == "2.0.0"
 
 
+def test_export_config_backups():
+    """Test export configurazione atomico con backup a rotazione"""
+    manager = IOManager()
+    manager.KEEP_BACKUPS = 2
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        output_path = Path(tmpdir) / "config.json"
+        for version in range(4):
+            assert manager.export_config({"schema_version": str(version)}, output_path)
+        
+        backups = sorted(Path(tmpdir).glob("config.backup_*.json"))
+        assert len(backups) == 2
+        assert manager.import_config(output_path, migrate=False)["schema_version"] == "3"
+        assert {manager.import_config(b, migrate=False)["schema_version"] for b in backups} == {"1", "2"}
+        assert not list(Path(tmpdir).glob(".*.tmp"))
+
+
 def test_config_migration():
     """Test migrazione configurazione"""
     manager = IOManager()
@@ -176,12 +598,57 @@ if __name__ == "__main__":
     test_export_import_measures_jsonl()
     print("✓ test_export_import_measures_jsonl")
     
+    test_iter_measures_jsonl()
+    print("✓ test_iter_measures_jsonl")
+    
+    test_export_import_measures_binary()
+    print("✓ test_export_import_measures_binary")
+    
+    test_import_measures_to_store()
+    print("✓ test_import_measures_to_store")
+    
+    test_iter_measures_directory()
+    print("✓ test_iter_measures_directory")
+    
+    test_iter_measures_directory_runs_and_errors()
+    print("✓ test_iter_measures_directory_runs_and_errors")
+    
+    test_compute_measure_stats()
+    print("✓ test_compute_measure_stats")
+    
+    test_measure_directory_firmware_csv()
+    print("✓ test_measure_directory_firmware_csv")
+    
+    test_open_measure_journal()
+    print("✓ test_open_measure_journal")
+    
+    test_import_measures_session()
+    print("✓ test_import_measures_session")
+    
     test_export_import_measures_csv()
     print("✓ test_export_import_measures_csv")
     
+    test_export_measures_csv_stream()
+    print("✓ test_export_measures_csv_stream")
+    
+    test_import_measures_csv_typed()
+    print("✓ test_import_measures_csv_typed")
+    
+    test_archive_measure_sessions()
+    print("✓ test_archive_measure_sessions")
+    
+    test_ingest_measures()
+    print("✓ test_ingest_measures")
+    
+    test_sync_sd_mirror()
+    print("✓ test_sync_sd_mirror")
+    
     test_export_import_config()
     print("✓ test_export_import_config")
     
+    test_export_config_backups()
+    print("✓ test_export_config_backups")
+    
     test_config_migration()
     print("✓ test_config_migration")
     
@@ -0,0 +1,100 @@
+"""
+Test per il job runner delle operazioni di I/O
+"""
+
+import json
+import threading
+from core.io_manager import IOManager
+from core.job_runner import (
+    JobRunner, JobCancelled, export_measures_job, export_config_job,
+    DONE, FAILED, CANCELLED, COALESCED
+)
+
+
+def _blocking_job(started, release):
+    def job_func(job, value):
+        started.set()
+        while not release.wait(0.01):
+            job.check_cancelled()
+        return value
+    return job_func
+
+
+def test_events_and_result():
+    """Test esecuzione, eventi di avanzamento e risultato"""
+    runner = JobRunner()
+    events = []
+    runner.add_listener(events.append)
+    
+    def count(job, n):
+        for i in job.track(range(n), every=10):
+            pass
+        return n
+    
+    job = runner.submit("target", count, 25)
+    assert job.wait(5)
+    assert job.state == DONE and job.result == 25
+    
+    kinds = [e.kind for e in events]
+    assert kinds[0] == "running" and kinds[-1] == "done"
+    assert [e.done for e in events if e.kind == "progress"] == [0, 10, 20, 25]
+    
+    failing = runner.submit("other", lambda job: 1 / 0)
+    assert failing.wait(5) and failing.state == FAILED and "division" in failing.error
+    runner.shutdown()
+
+
+def test_cancel_running_job():
+    """Test annullamento cooperativo di un job in corso"""
+    runner = JobRunner()
+    started, release = threading.Event(), threading.Event()
+    
+    job = runner.submit("target", _blocking_job(started, release), 1)
+    assert started.wait(5)
+    runner.cancel("target")
+    assert job.wait(5)
+    assert job.state == CANCELLED
+    runner.shutdown()
+
+
+def test_coalesce_same_target():
+    """Test accorpamento: per target solo l'ultimo job accodato viene eseguito"""
+    runner = JobRunner()
+    started, release = threading.Event(), threading.Event()
+    
+    first = runner.submit("out.csv", _blocking_job(started, release), 1)
+    assert started.wait(5)
+    second = runner.submit("out.csv", lambda job: 2)
+    third = runner.submit("out.csv", lambda job: 3)
+    
+    assert third.wait(5)
+    assert first.state == CANCELLED
+    assert second.state == COALESCED
+    assert third.state == DONE and third.result == 3
+    assert runner.active_jobs == []
+    runner.shutdown()
+
+
+def test_export_jobs(tmp_path):
+    """Test job di export misure e configurazione"""
+    runner = JobRunner()
+    manager = IOManager()
+    measures = [{"timestamp": 1700000000 + i, "mode": "calibro", "value": float(i)} for i in range(50)]
+    
+    job = runner.submit("m", export_measures_job, manager, measures, tmp_path / "out.jsonl")
+    assert job.wait(5) and job.result == 50
+    assert len(manager.import_measures_jsonl(tmp_path / "out.jsonl")) == 50
+    
+    job = runner.submit("c", export_config_job, manager, {"version": "2.0.0"}, tmp_path / "config.json")
+    assert job.wait(5) and job.state == DONE
+    assert json.loads((tmp_path / "config.json").read_text())["config"]["version"] == "2.0.0"
+    
+    # Export annullato: nessun file parziale
+    def cancelled_measures():
+        yield from measures[:10]
+        raise JobCancelled()
+    
+    job = runner.submit("m", export_measures_job, manager, cancelled_measures(), tmp_path / "cut.csv")
+    assert job.wait(5) and job.state == CANCELLED
+    assert list(tmp_path.glob("cut.csv*")) == []
+    runner.shutdown()
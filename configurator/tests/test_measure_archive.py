@@ -0,0 +1,102 @@
+"""
+Test per l'archivio compresso delle sessioni
+"""
+
+import gzip
+import json
+from datetime import datetime
+import pytest
+from core import measure_archive
+from core.measure_archive import (
+    SessionArchiver, write_block_archive, read_index, iter_archive_range,
+    open_measure_text, HAS_ZSTD
+)
+
+
+T0 = 1709280000  # 2024-03-01 08:00:00 UTC
+
+
+def _write_session(path, count, step=10):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({"timestamp": T0 + i * step, "mode": "calibro", "value": float(i)}) + "\n")
+
+
+def test_block_archive_is_plain_gzip(tmp_path):
+    """Test archivio a blocchi leggibile come gzip unico e con indice"""
+    source = tmp_path / "20240301.jsonl"
+    _write_session(source, 500)
+    archive = tmp_path / "20240301.jsonl.gz"
+    
+    index = write_block_archive(source, archive, block_size=2048)
+    
+    assert len(index["blocks"]) > 5
+    assert sum(block["count"] for block in index["blocks"]) == 500
+    assert read_index(archive) == index
+    
+    # Membri gzip concatenati: un lettore gzip standard legge tutto il file
+    with gzip.open(archive, "rb") as f:
+        assert f.read() == source.read_bytes()
+    with open_measure_text(archive) as f:
+        assert len(f.readlines()) == 500
+
+
+def test_range_reads_only_matching_blocks(tmp_path, monkeypatch):
+    """Test query per intervallo: decompressi solo i blocchi necessari"""
+    source = tmp_path / "20240301.jsonl"
+    _write_session(source, 500)
+    archive = tmp_path / "20240301.jsonl.gz"
+    index = write_block_archive(source, archive, block_size=2048)
+    
+    decompressed = []
+    original = measure_archive._decompress
+    
+    def counting(data, codec):
+        decompressed.append(len(data))
+        return original(data, codec)
+    
+    monkeypatch.setattr(measure_archive, "_decompress", counting)
+    
+    measures = list(iter_archive_range(archive, T0 + 1000, T0 + 1100))
+    assert [m["value"] for m in measures] == [100.0 + i for i in range(10)]
+    assert len(decompressed) <= 2 < len(index["blocks"])
+    
+    # Indice non coerente con l'archivio: lettura completa, stesso risultato
+    archive.with_name(archive.name + ".idx").write_text('{"version": 1, "size": 0}')
+    assert list(iter_archive_range(archive, T0 + 1000, T0 + 1100)) == measures
+
+
+def test_session_archiver_background(tmp_path):
+    """Test job di archiviazione: solo le sessioni più vecchie della soglia"""
+    _write_session(tmp_path / "20240101.jsonl", 50)
+    _write_session(tmp_path / "20240225.jsonl", 50)
+    now = datetime(2024, 3, 1, 12, 0, 0).timestamp()
+    
+    archiver = SessionArchiver(tmp_path, older_than_days=30, clock=lambda: now).start()
+    assert archiver.join(timeout=10)
+    
+    assert archiver.archived == [tmp_path / "20240101.jsonl.gz"]
+    assert archiver.errors == []
+    assert not (tmp_path / "20240101.jsonl").exists()
+    assert (tmp_path / "20240101.jsonl.gz.idx").exists()
+    assert (tmp_path / "20240225.jsonl").exists()
+
+
+@pytest.mark.skipif(not HAS_ZSTD, reason="zstandard non disponibile")
+def test_block_archive_zstd(tmp_path):
+    """Test archivio zstd a frame indipendenti"""
+    source = tmp_path / "20240301.jsonl"
+    _write_session(source, 300)
+    archive = tmp_path / "20240301.jsonl.zst"
+    
+    write_block_archive(source, archive, codec="zstd", block_size=2048)
+    
+    with open_measure_text(archive) as f:
+        assert f.read() == source.read_text()
+    assert len(list(iter_archive_range(archive, T0, T0 + 100))) == 10
+
+
+def test_unknown_codec():
+    """Test codec non supportato"""
+    with pytest.raises(ValueError):
+        SessionArchiver(".", codec="lz4")
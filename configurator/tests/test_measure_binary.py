@@ -0,0 +1,99 @@
+"""
+Test per il formato binario delle misure (measurement_record_t del firmware)
+"""
+
+import zlib
+import struct
+import pytest
+from datetime import datetime
+from core.measure_binary import (
+    RECORD_SIZE, compute_crc32, verify_crc32, read_records,
+    write_records, measures_to_records, iter_measures
+)
+
+
+MEASURES = [
+    {"timestamp": 1700000000, "mode": "calibro", "value": 1234.5, "value2": 0.0,
+     "material": "Alluminio", "profile": "Serie 45", "notes": ""},
+    {"timestamp": 1700000060, "mode": "vetri", "value": 800.25, "value2": 1200.0,
+     "material": "", "profile": "", "notes": "vetro camera"},
+    {"timestamp": 1700000120, "mode": "fermavetri", "value": 512.0, "value2": 0.0,
+     "material": "PVC", "profile": "P" * 60, "notes": "n" * 80},
+]
+
+
+def _firmware_crc(m) -> int:
+    """CRC come storage_calculate_crc32: campi numerici e stringhe fino a strlen"""
+    modes = ["calibro", "vetri", "astine", "fermavetri"]
+    data = struct.pack("<Iiff", m["timestamp"], modes.index(m["mode"]),
+                       m["value"], m["value2"])
+    for key, size in (("material", 32), ("profile", 48), ("notes", 64)):
+        data += m[key].encode("utf-8")[:size - 1]
+    return zlib.crc32(data)
+
+
+def test_crc_matches_firmware():
+    """Test CRC vettoriale uguale a quello del firmware"""
+    records = measures_to_records(MEASURES)
+    
+    assert records.itemsize == RECORD_SIZE
+    assert list(records["crc32"]) == [_firmware_crc(m) for m in MEASURES]
+    assert verify_crc32(records).all()
+
+
+def test_binary_roundtrip(tmp_path):
+    """Test scrittura, append e lettura con memory map"""
+    path = tmp_path / "backup_20240101.bin"
+    records = measures_to_records(MEASURES)
+    
+    write_records(path, records[:2])
+    write_records(path, records[2:], append=True)
+    assert path.stat().st_size == 3 * RECORD_SIZE
+    
+    loaded = read_records(path)
+    assert (compute_crc32(loaded) == records["crc32"]).all()
+    
+    measures = list(iter_measures(loaded))
+    assert measures[0]["mode"] == "calibro"
+    assert measures[1]["notes"] == "vetro camera"
+    # Stringhe troncate alla dimensione del campo (terminatore incluso)
+    assert measures[2]["profile"] == "P" * 47
+    assert measures[2]["notes"] == "n" * 63
+
+
+def test_corrupted_and_truncated_records(tmp_path):
+    """Test record corrotto rilevato e record finale incompleto ignorato"""
+    path = tmp_path / "session.bin"
+    write_records(path, measures_to_records(MEASURES))
+    
+    data = bytearray(path.read_bytes())
+    data[RECORD_SIZE + 8] ^= 0x01  # value_mm del secondo record
+    data += b"\x01" * 50           # scrittura interrotta
+    path.write_bytes(bytes(data))
+    
+    records = read_records(path, use_mmap=False)
+    assert len(records) == 3
+    
+    valid = verify_crc32(records)
+    assert list(valid) == [True, False, True]
+    assert [m["timestamp"] for m in iter_measures(records, valid)] == [1700000000, 1700000120]
+
+
+def test_invalid_mode():
+    """Test modalità sconosciuta"""
+    with pytest.raises(ValueError):
+        measures_to_records([{"timestamp": 1, "mode": "righello"}])
+
+
+def test_iso_timestamp():
+    """Test timestamp ISO (come scritto da IOManager.export_measures_jsonl)"""
+    iso = dict(MEASURES[0], timestamp="2024-02-01T10:15:00")
+    records = measures_to_records([iso, dict(iso, timestamp="1706782500.0")])
+    
+    expected = int(datetime.fromisoformat("2024-02-01T10:15:00").timestamp())
+    assert records["timestamp"][0] == expected
+    assert records["timestamp"][1] == 1706782500
+    assert verify_crc32(records).all()
+    
+    with pytest.raises(ValueError):
+        measures_to_records([dict(iso, timestamp="ieri")])
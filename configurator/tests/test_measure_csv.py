@@ -0,0 +1,160 @@
+"""
+Test per export/import CSV delle misure
+"""
+
+import io
+import csv
+import math
+from dataclasses import dataclass
+import numpy as np
+import pytest
+from core import measure_csv
+from core.measure_csv import (
+    write_measures_csv, decimal_formatter, mode_decimals, read_measures_csv_columns
+)
+
+
+@dataclass
+class Mode:
+    """Modalità minima con gli attributi di MeasureMode usati dall'export"""
+    id: str
+    nome: str
+    decimali: int
+
+
+def _rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_union_header_from_iterator(monkeypatch):
+    """Test header con l'unione dei campi anche da un iteratore (spool su disco)"""
+    monkeypatch.setattr(measure_csv, "SPOOL_MAX_MEMORY", 64)
+    
+    def measures():
+        yield {"timestamp": 1, "value": 10.0}
+        yield {"timestamp": 2, "value": 20.0, "notes": "ultimo campo"}
+        for i in range(100):
+            yield {"timestamp": 3 + i, "material": "PVC"}
+    
+    out = io.StringIO()
+    assert write_measures_csv(out, measures()) == 102
+    
+    rows = _rows(out.getvalue())
+    assert rows[0] == ["timestamp", "value", "notes", "material"]
+    assert rows[2] == ["2", "20.0", "ultimo campo", ""]
+    assert rows[-1] == ["102", "", "", "PVC"]
+
+
+def test_schema_and_formatters():
+    """Test schema dichiarato, formatter per colonna e decimali per modalità"""
+    measures = [
+        {"timestamp": 1, "mode": "calibro", "value": 12.3456, "extra": "x"},
+        {"timestamp": 2, "mode": "vetri", "value": 1188.04, "value2": 1488},
+        {"timestamp": 3, "mode": "astine", "value": "n/d"},
+    ]
+    modes = [Mode("calibro", "Calibro", 3), Mode("vetri", "Vetri", 1)]
+    
+    out = io.StringIO()
+    write_measures_csv(
+        out, iter(measures), fields=["timestamp", "mode", "value", "value2"],
+        formatters={"mode": str.upper}, decimals=mode_decimals(modes),
+        default_decimals=0
+    )
+    
+    assert _rows(out.getvalue()) == [
+        ["timestamp", "mode", "value", "value2"],
+        ["1", "CALIBRO", "12.346", ""],
+        ["2", "VETRI", "1188.0", "1488.0"],
+        ["3", "ASTINE", "n/d", ""],
+    ]
+
+
+def test_decimal_formatter():
+    """Test formatter a decimali fissi"""
+    fmt = decimal_formatter(2)
+    assert fmt(1.005 + 1e-9) == "1.01"
+    assert fmt("3") == "3.00"
+    assert fmt(None) == ""
+    assert mode_decimals({"Calibro": 3}) == {"calibro": 3}
+
+
+def test_read_columns_inferred_types():
+    """Test import tipizzato: tipi dedotti, vuoti come NaN/NaT"""
+    text = (
+        "timestamp,mode,value,count,notes\n"
+        "2024-03-01T10:00:00,calibro,12.5,3,prima\n"
+        "2024-03-01T10:01:00,vetri,,4,\n"
+        ",astine,7e1,5,terza\n"
+    )
+    columns = read_measures_csv_columns(io.StringIO(text))
+    
+    assert columns["timestamp"].dtype == np.dtype("datetime64[s]")
+    assert np.isnat(columns["timestamp"][2])
+    assert columns["value"].dtype == np.float64
+    assert math.isnan(columns["value"][1]) and columns["value"][2] == 70.0
+    assert columns["count"].dtype == np.int64 and columns["count"].sum() == 12
+    assert list(columns["notes"]) == ["prima", "", "terza"]
+
+
+def test_read_columns_decimal_comma_and_schema():
+    """Test CSV italiano (';' e virgola decimale) con schema esplicito"""
+    text = (
+        "mode;value;value2;lotto\n"
+        "vetri;1.188,5;800,25;001\n"
+        "vetri;12,0;;002\n"
+    )
+    columns = read_measures_csv_columns(io.StringIO(text), schema={"lotto": "str"})
+    
+    assert columns["value"].tolist() == [1188.5, 12.0]
+    assert columns["value2"][0] == 800.25 and math.isnan(columns["value2"][1])
+    assert list(columns["lotto"]) == ["001", "002"]
+
+
+def test_read_columns_ambiguous_decimal():
+    """Test colonne con virgola e punto decimale: errore invece di indovinare"""
+    mixed = "mode;value\nvetri;2,5\nvetri;1.5\n"
+    with pytest.raises(ValueError, match="ambiguo"):
+        read_measures_csv_columns(io.StringIO(mixed))
+    
+    # Con decimal esplicito il punto decimale non viene letto come migliaia
+    with pytest.raises(ValueError):
+        read_measures_csv_columns(io.StringIO(mixed), decimal=",")
+    
+    # Decimale dedotto per colonna; testo con virgole resta testo
+    text = "value;value2;notes\n2,5;1.5;a, b\n1.200,0;2.25;c\n"
+    columns = read_measures_csv_columns(io.StringIO(text))
+    assert columns["value"].tolist() == [2.5, 1200.0]
+    assert columns["value2"].tolist() == [1.5, 2.25]
+    assert list(columns["notes"]) == ["a, b", "c"]
+
+
+def test_read_columns_firmware_dialect():
+    """Test CSV del firmware: colonne rinominate, modalità minuscole"""
+    text = (
+        "Timestamp,Mode,Value(mm),Value2(mm),Material,Profile,Notes\n"
+        "2024-03-01 10:00:00,Calibro,12.345,0.000,,,\n"
+        "2024-03-01 10:00:05,Vetri,800.000,1200.000,PVC,P70,\n"
+        "2024-03-01 10:00:09,Vetri,801.000\n"
+    )
+    columns = read_measures_csv_columns(io.StringIO(text))
+    
+    assert list(columns) == ["timestamp", "mode", "value", "value2", "material", "profile", "notes"]
+    assert columns["timestamp"][1] == np.datetime64("2024-03-01T10:00:05")
+    assert list(columns["mode"]) == ["calibro", "vetri", "vetri"]
+    assert columns["value"].tolist() == [12.345, 800.0, 801.0]
+    assert math.isnan(columns["value2"][2])
+    assert columns["material"][1] == "PVC"
+
+
+def test_read_columns_multiline_quoted_field():
+    """Test round trip export/import di note con virgolette e newline"""
+    out = io.StringIO()
+    measures = [
+        {"timestamp": 1, "value": 1.5, "notes": "riga1\nriga2"},
+        {"timestamp": 2, "value": 2.5, "notes": 'con "virgolette", e virgola'},
+    ]
+    write_measures_csv(out, measures)
+    
+    columns = read_measures_csv_columns(io.StringIO(out.getvalue()))
+    assert list(columns["notes"]) == ["riga1\nriga2", 'con "virgolette", e virgola']
+    assert columns["value"].tolist() == [1.5, 2.5]
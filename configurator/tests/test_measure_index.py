@@ -0,0 +1,89 @@
+"""
+Test per l'indice di deduplicazione delle misure
+"""
+
+import pytest
+from core import measure_index
+from core.measure_index import MeasureIndex, measure_key, measure_keys
+from core.measure_binary import measures_to_records
+
+
+def _keys(count, start=1700000000):
+    return [(start + i, i % 4, (i * 2654435761) & 0xFFFFFFFF) for i in range(count)]
+
+
+def test_add_and_reopen(tmp_path):
+    """Test inserimento, duplicati e persistenza su disco"""
+    path = tmp_path / "measures.keys"
+    
+    with MeasureIndex(path, initial_capacity=16) as index:
+        assert index.add((1700000000, 0, 123)) is True
+        assert index.add((1700000000, 0, 123)) is False
+        assert index.add((1700000000, 1, 123)) is True
+        assert len(index) == 2
+    
+    with MeasureIndex(path) as index:
+        assert len(index) == 2
+        assert (1700000000, 1, 123) in index
+        assert (1700000000, 2, 123) not in index
+
+
+def test_add_many_with_growth(tmp_path):
+    """Test inserimento a lotti oltre la capacità iniziale (ricostruzione)"""
+    keys = _keys(5000)
+    
+    with MeasureIndex(tmp_path / "measures.keys", initial_capacity=16) as index:
+        assert index.add_many(keys[:3000] + keys[:10]) == [True] * 3000 + [False] * 10
+        assert index.add_many(keys[2990:]) == [False] * 10 + [True] * 2000
+        assert index.capacity >= 5000 / measure_index.MAX_LOAD
+        assert len(index) == 5000
+        
+        # Ricerca scalare e vettoriale coerenti
+        assert all(key in index for key in keys[::97])
+        assert index.contains_many([keys[0], (1, 0, 0)]) == [True, False]
+        
+        # Chiave ripetuta nello stesso lotto: nuova solo la prima volta
+        assert index.add_many([(1, 0, 0), (1, 0, 0)]) == [True, False]
+
+
+def test_growth_in_chunks(tmp_path, monkeypatch):
+    """Test ricostruzione a blocchi: nessuna chiave persa tra un blocco e l'altro"""
+    monkeypatch.setattr(measure_index, 'GROW_CHUNK_SLOTS', 7)
+    keys = _keys(3000)
+    
+    with MeasureIndex(tmp_path / "measures.keys", initial_capacity=16) as index:
+        for key in keys:
+            index.add(key)
+        assert len(index) == 3000
+        assert index.contains_many(keys) == [True] * 3000
+        assert index.add_many(keys[::5]) == [False] * 600
+
+
+def test_invalid_file(tmp_path):
+    """Test file che non è un indice"""
+    path = tmp_path / "other.keys"
+    path.write_bytes(b"not an index" * 10)
+    with pytest.raises(ValueError):
+        MeasureIndex(path)
+
+
+def test_measure_keys():
+    """Test chiavi con crc32 del firmware o calcolato"""
+    measure = {"timestamp": 1700000000, "mode": "vetri", "value": 800.0, "value2": 1200.0,
+               "material": "PVC", "profile": "", "notes": ""}
+    crc = int(measures_to_records([measure])["crc32"][0])
+    
+    keys = measure_keys([
+        dict(measure, crc32=crc),
+        measure,
+        dict(measure, mode="Vetri", timestamp="2023-11-14T22:13:20"),
+        {"timestamp": 1, "mode": "sconosciuta", "crc32": 1},
+    ])
+    
+    assert keys[0] == keys[1] == (1700000000, 1, crc)
+    assert keys[2][1:] == (1, crc)
+    # Chiave calcolata uguale al record binario della stessa misura ISO
+    iso_record = measures_to_records([dict(measure, timestamp="2023-11-14T22:13:20")])[0]
+    assert keys[2] == (int(iso_record["timestamp"]), 1, int(iso_record["crc32"]))
+    assert keys[3] is None
+    assert measure_key({"timestamp": 5, "mode": 2, "crc32": -1}) == (5, 2, 0xFFFFFFFF)
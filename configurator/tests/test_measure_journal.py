@@ -0,0 +1,104 @@
+"""
+Test per il journal JSONL delle misure
+"""
+
+import json
+import time
+from datetime import datetime
+import pytest
+from core.measure_journal import MeasureJournal
+
+
+T0 = datetime(2024, 3, 10, 23, 59, 0).timestamp()
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+def _lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_group_commit_thresholds(tmp_path):
+    """Test commit per numero di misure e per intervallo di tempo"""
+    clock = FakeClock(T0)
+    journal = MeasureJournal(tmp_path, max_records=3, flush_interval=5.0,
+                             auto_flush=False, clock=clock)
+    
+    journal.append({"timestamp": int(T0), "value": 1.0})
+    journal.append({"timestamp": int(T0), "value": 2.0})
+    assert journal.pending == 2
+    assert journal.current_path.stat().st_size == 0
+    
+    journal.append({"timestamp": int(T0), "value": 3.0})
+    assert journal.pending == 0
+    assert len(_lines(journal.current_path)) == 3
+    
+    # Soglia di tempo: commit al primo append dopo l'intervallo
+    journal.append({"timestamp": int(T0), "value": 4.0})
+    clock.now += 6.0
+    journal.append({"timestamp": int(T0), "value": 5.0})
+    assert journal.pending == 0
+    
+    journal.append({"timestamp": int(T0), "value": 6.0})
+    journal.close()
+    assert [m["value"] for m in _lines(tmp_path / "20240310.jsonl")] == [1, 2, 3, 4, 5, 6]
+    
+    with pytest.raises(ValueError):
+        journal.append({"value": 7.0})
+
+
+def test_daily_rotation(tmp_path):
+    """Test rotazione YYYYMMDD.jsonl al cambio di giorno"""
+    with MeasureJournal(tmp_path, auto_flush=False) as journal:
+        journal.append({"timestamp": int(T0), "value": 1.0})
+        journal.append({"timestamp": int(T0) + 120, "value": 2.0})
+        journal.append({"timestamp": "2024-03-11T08:00:00", "value": 3.0})
+    
+    assert [m["value"] for m in _lines(tmp_path / "20240310.jsonl")] == [1.0]
+    assert [m["value"] for m in _lines(tmp_path / "20240311.jsonl")] == [2.0, 3.0]
+
+
+def test_torn_line_recovery(tmp_path):
+    """Test rimozione dell'ultima linea incompleta alla riapertura"""
+    path = tmp_path / "20240310.jsonl"
+    path.write_text('{"timestamp": 1, "value": 1.0}\n{"timestamp": 2, "val', encoding='utf-8')
+    
+    with MeasureJournal(tmp_path, auto_flush=False) as journal:
+        journal.append({"timestamp": int(T0), "value": 3.0})
+        assert journal.recovered_bytes == len('{"timestamp": 2, "val')
+    
+    assert [m["value"] for m in _lines(path)] == [1.0, 3.0]
+
+
+def test_missing_final_newline(tmp_path):
+    """Test ultima linea completa senza newline: conservata, newline aggiunto"""
+    path = tmp_path / "20240310.jsonl"
+    path.write_text('{"timestamp": 1, "value": 1.0}\n{"timestamp": 2, "value": 2.0}', encoding='utf-8')
+    
+    with MeasureJournal(tmp_path, auto_flush=False) as journal:
+        journal.append({"timestamp": int(T0), "value": 3.0})
+        assert journal.recovered_bytes == 0
+    
+    assert [m["value"] for m in _lines(path)] == [1.0, 2.0, 3.0]
+
+
+def test_auto_flush_thread(tmp_path):
+    """Test commit a tempo dal thread di servizio senza nuove misure"""
+    journal = MeasureJournal(tmp_path, flush_interval=0.05)
+    journal.append({"timestamp": int(T0), "value": 1.0})
+    
+    for _ in range(100):
+        if journal.pending == 0:
+            break
+        time.sleep(0.01)
+    
+    assert journal.pending == 0
+    assert len(_lines(journal.current_path)) == 1
+    journal.close()
@@ -0,0 +1,84 @@
+"""
+Test per le statistiche incrementali delle misure
+"""
+
+import math
+import random
+import statistics
+import pytest
+from core.measure_stats import RunningStats, GroupedStats
+
+
+def test_running_stats_matches_statistics():
+    """Test Welford: stessi risultati del calcolo su tutti i dati"""
+    rng = random.Random(1)
+    values = [rng.uniform(500.0, 3000.0) for _ in range(1000)]
+    
+    stats = RunningStats()
+    for value in values:
+        stats.update(value)
+    
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(statistics.mean(values))
+    assert stats.std == pytest.approx(statistics.stdev(values))
+    assert (stats.min, stats.max) == (min(values), max(values))
+    
+    # Valori grandi con piccola varianza: nessuna cancellazione numerica
+    stats = RunningStats()
+    for value in (1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16):
+        stats.update(value)
+    assert stats.variance == pytest.approx(30.0)
+
+
+def test_merge_partitions():
+    """Test merge: partizioni unite uguali a un'unica passata"""
+    rng = random.Random(2)
+    values = [rng.gauss(1200.0, 15.0) for _ in range(999)]
+    
+    whole = RunningStats()
+    whole.update_batch(values)
+    
+    merged = RunningStats()
+    for start in range(0, len(values), 250):
+        part = RunningStats()
+        for value in values[start:start + 250]:
+            part.update(value)
+        merged.merge(part)
+    merged.merge(RunningStats())
+    
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean)
+    assert merged.variance == pytest.approx(whole.variance)
+    assert merged.min == whole.min and merged.max == whole.max
+    
+    restored = RunningStats.from_dict(merged.to_dict())
+    assert restored == merged
+    assert RunningStats().to_dict()["min"] is None
+
+
+def test_grouped_stats():
+    """Test raggruppamento per modalità e chiavi composte"""
+    measures = [
+        {"mode": "vetri", "material": "PVC", "value": 800.0},
+        {"mode": "vetri", "material": "Legno", "value": 900.0},
+        {"mode": "calibro", "material": "PVC", "value": 10.0},
+        {"mode": "calibro", "material": "PVC", "value": "n/d"},
+    ]
+    
+    by_mode = GroupedStats(group_by="mode").update_many([measures[:2], measures[2:]])
+    assert by_mode.total.count == 3
+    assert by_mode.skipped == 1
+    assert by_mode.get("vetri").mean == 850.0
+    assert by_mode.get("calibro").std == 0.0
+    
+    composite = GroupedStats(group_by=("mode", "material")).update_many(measures)
+    assert composite.get(("vetri", "PVC")).count == 1
+    assert "vetri/Legno" in composite.to_dict()["groups"]
+    
+    other = GroupedStats(group_by="mode").update_many(measures[:1])
+    assert by_mode.merge(other).get("vetri").count == 3
+    
+    with pytest.raises(ValueError):
+        by_mode.merge(composite)
+    
+    assert math.isclose(by_mode.total.mean, (800 + 900 + 10 + 800) / 4)
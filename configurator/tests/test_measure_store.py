@@ -0,0 +1,131 @@
+"""
+Test per l'archivio colonnare delle misure
+"""
+
+import numpy as np
+import pytest
+from core.measure_store import MeasureStore
+
+
+T0 = 1700000000
+
+
+def _measures(count, offset=0):
+    modes = ["calibro", "vetri", "astine", "fermavetri"]
+    return [
+        {"timestamp": T0 + offset + i * 60, "mode": modes[i % 4],
+         "value": float(i), "value2": 0.0,
+         "material": "PVC" if i % 2 else "Alluminio", "profile": f"P{i % 3}"}
+        for i in range(count)
+    ]
+
+
+def test_append_and_reopen(tmp_path):
+    """Test blocchi, dizionari e persistenza del manifest"""
+    store = MeasureStore(tmp_path, block_size=4)
+    assert store.append_measures(_measures(10)) == 10
+    
+    # Ogni append scrive blocchi nuovi (l'ultimo blocco incompleto non viene riscritto)
+    store.append_measures(_measures(3, offset=10000))
+    assert [b["count"] for b in store.blocks] == [4, 4, 2, 3]
+    
+    reopened = MeasureStore(tmp_path)
+    assert len(reopened) == 13
+    assert reopened.block_size == 4
+    assert sorted(reopened.dictionaries["material"]) == ["Alluminio", "PVC"]
+    
+    result = reopened.query()
+    assert list(result["value_mm"][:10]) == [float(i) for i in range(10)]
+    assert result["material"][0] == "Alluminio"
+    assert result["profile"][4] == "P1"
+
+
+def test_append_atomic_and_compact(tmp_path):
+    """Test append con manifest atomico e unione dei blocchi incompleti"""
+    store = MeasureStore(tmp_path, block_size=4)
+    store.append_measures(_measures(6))
+    assert [b["id"] for b in store.blocks] == [0, 1]
+    block_1 = sorted((tmp_path / "blocks" / "000001").iterdir())
+    mtimes = [p.stat().st_mtime_ns for p in block_1]
+    
+    # Interruzione prima del manifest: l'archivio su disco resta invariato
+    def crash():
+        raise OSError("disco pieno")
+    
+    store._save_manifest = crash
+    with pytest.raises(OSError):
+        store.append_measures(_measures(3, offset=10000))
+    assert [b["count"] for b in store.blocks] == [4, 2]
+    
+    reopened = MeasureStore(tmp_path)
+    assert [b["id"] for b in reopened.blocks] == [0, 1]
+    assert list(reopened.query()["value_mm"]) == [float(i) for i in range(6)]
+    
+    # Append riuscito: il blocco incompleto non viene toccato
+    reopened.append_measures(_measures(1, offset=10000))
+    reopened.append_measures(_measures(1, offset=20000))
+    assert [(b["id"], b["count"]) for b in reopened.blocks] == [(0, 4), (1, 2), (2, 1), (3, 1)]
+    assert [p.stat().st_mtime_ns for p in block_1] == mtimes
+    
+    # compact: blocchi incompleti consecutivi uniti, directory vecchie rimosse
+    assert reopened.compact() == 2
+    assert [(b["id"], b["count"]) for b in reopened.blocks] == [(0, 4), (4, 4)]
+    assert not (tmp_path / "blocks" / "000001").exists()
+    assert reopened.compact() == 0
+    
+    result = MeasureStore(tmp_path).query()
+    assert len(result["timestamp"]) == 8
+    assert list(result["timestamp"]) == sorted(result["timestamp"])
+
+
+def test_query_time_range_and_mode(tmp_path):
+    """Test query per intervallo e modalità (solo i blocchi necessari)"""
+    store = MeasureStore(tmp_path, block_size=8)
+    store.append_measures(_measures(100))
+    
+    result = store.query(start=T0 + 60 * 10, end=T0 + 60 * 20)
+    assert list(result["value_mm"]) == [float(i) for i in range(10, 20)]
+    
+    vetri = store.query(modes=["vetri"], columns=["timestamp", "value_mm"])
+    assert set(vetri) == {"timestamp", "value_mm"}
+    assert list(vetri["value_mm"]) == [float(i) for i in range(1, 100, 4)]
+    
+    assert store.count(start=T0 + 60 * 50, modes=["Calibro"]) == 12
+    assert store.count(start=T0 + 60 * 1000) == 0
+    
+    # Blocchi che non possono contenere risultati non vengono aperti
+    candidates = list(store._matching_blocks(T0 + 60 * 10, T0 + 60 * 20, None))
+    assert [b["id"] for b in candidates] == [1, 2]
+
+
+def test_unsorted_append(tmp_path):
+    """Test misure non ordinate: blocchi ordinati e risultato ordinato"""
+    store = MeasureStore(tmp_path, block_size=5)
+    measures = _measures(20)
+    store.append_measures(measures[::-1])
+    
+    result = store.query()
+    assert np.all(np.diff(result["timestamp"]) >= 0)
+    assert list(result["value_mm"]) == [float(i) for i in range(20)]
+    
+    first = next(store.iter_measures(modes=["astine"]))
+    assert first["mode"] == "astine"
+    assert first["value"] == 2.0
+
+
+def test_invalid_input(tmp_path):
+    """Test modalità sconosciuta e colonne non valide"""
+    store = MeasureStore(tmp_path)
+    
+    with pytest.raises(ValueError):
+        store.append_measures([{"timestamp": T0, "mode": "righello"}])
+    
+    # Modalità fuori dal tipo della colonna (int8)
+    with pytest.raises(ValueError):
+        store.append_measures([{"timestamp": T0, "mode": 300}])
+    with pytest.raises(ValueError):
+        store.append({"timestamp": [T0], "mode": [300]})
+    assert len(store) == 0
+    
+    with pytest.raises(ValueError):
+        store.query(columns=["notes"])
@@ -0,0 +1,95 @@
+"""
+Test per il formato contenitore dei progetti
+"""
+
+import json
+import pytest
+from core.project_container import (
+    ProjectContainer, LazySection, is_container, write_container
+)
+
+
+def _write_sample(path):
+    write_container(path, {"nome": "Catalogo"}, {
+        "menus": [{"id": "m1"}],
+        "tipologie": [{"id": f"t{i}", "nome": f"Tipologia {i}"} for i in range(100)],
+        "icons": {"home": "mdi:home"},
+    })
+
+
+def test_roundtrip_and_lazy_load(tmp_path):
+    """Test apertura: solo TOC, sezioni decodificate al primo accesso"""
+    path = tmp_path / "progetto.mdp"
+    _write_sample(path)
+    assert is_container(path)
+    
+    container = ProjectContainer(path)
+    assert container.meta == {"nome": "Catalogo"}
+    
+    decoded = []
+    tipologie = LazySection(container, "tipologie", lambda d: decoded.append(d["id"]) or d)
+    astine = LazySection(container, "astine")
+    
+    # len dal TOC, senza decodifica
+    assert len(tipologie) == 100 and not tipologie.loaded and decoded == []
+    assert tipologie[5]["nome"] == "Tipologia 5"
+    assert tipologie.loaded and len(decoded) == 100
+    
+    assert container.read_section("icons") == {"home": "mdi:home"}
+    assert len(astine) == 0 and list(astine) == []
+    
+    astine.append({"id": "a1"})
+    assert astine == [{"id": "a1"}]
+
+
+def test_rewrite_copies_unread_sections(tmp_path):
+    """Test salvataggio: le sezioni non lette vengono copiate, non decodificate"""
+    path = tmp_path / "progetto.mdp"
+    _write_sample(path)
+    container = ProjectContainer(path)
+    
+    def no_decode(data):
+        raise AssertionError("sezione decodificata")
+    
+    tipologie = LazySection(container, "tipologie", no_decode)
+    menus = LazySection(container, "menus")
+    menus.append({"id": "m2"})
+    
+    write_container(path, {"nome": "Catalogo 2"},
+                    {"menus": menus, "tipologie": tipologie}, backup=True)
+    assert not tipologie.loaded
+    
+    # Il vecchio contenitore non deve leggere il file sostituito
+    with pytest.raises(IOError):
+        container.read_raw("tipologie")
+    
+    saved = ProjectContainer(path)
+    tipologie.bind(saved)
+    tipologie.decoder = None
+    assert saved.meta["nome"] == "Catalogo 2"
+    assert saved.read_section("menus") == [{"id": "m1"}, {"id": "m2"}]
+    assert len(list(tipologie)) == 100
+
+
+def test_invalid_files(tmp_path):
+    """Test file JSON, troncati e sezioni corrotte"""
+    legacy = tmp_path / "legacy.mdp"
+    legacy.write_text(json.dumps({"nome": "Vecchio"}), encoding="utf-8")
+    assert not is_container(legacy)
+    with pytest.raises(ValueError):
+        ProjectContainer(legacy)
+    
+    path = tmp_path / "progetto.mdp"
+    _write_sample(path)
+    data = bytearray(path.read_bytes())
+    data[-5] ^= 0xFF
+    path.write_bytes(bytes(data))
+    
+    container = ProjectContainer(path)
+    assert container.read_section("menus") == [{"id": "m1"}]
+    with pytest.raises(ValueError):
+        container.read_section("icons")
+    
+    (tmp_path / "short.mdp").write_bytes(b"MDPC")
+    with pytest.raises(ValueError):
+        ProjectContainer(tmp_path / "short.mdp")
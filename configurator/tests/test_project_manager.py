@@ -0,0 +1,73 @@
+"""
+Test per ProjectManager: salvataggio e caricamento dei progetti (.mdp)
+"""
+
+import json
+from core.config_model import ProgettoConfigurazione, MenuItem, TipologiaInfisso
+from core.project_container import LazySection, is_container
+from core.project_manager import ProjectManager
+
+
+def _sample_project() -> ProgettoConfigurazione:
+    project = ProgettoConfigurazione(nome="Catalogo")
+    project.menus = [MenuItem(id="m1", nome="Misure", icona="mdi:ruler")]
+    project.tipologie = [
+        TipologiaInfisso(id=f"t{i}", nome=f"Tipologia {i}", icona="mdi:window")
+        for i in range(50)
+    ]
+    return project
+
+
+def test_container_save_and_load(tmp_path):
+    """Test salvataggio nel formato contenitore e ricaricamento"""
+    path = str(tmp_path / "catalogo.mdp")
+    manager = ProjectManager()
+    assert manager.save_project(path, _sample_project(), create_backup=False)
+    assert is_container(path)
+    
+    project = ProjectManager().load_project(path)
+    assert project.nome == "Catalogo"
+    assert isinstance(project.tipologie, LazySection)
+    assert len(project.tipologie) == 50 and not project.tipologie.loaded
+    
+    assert project.tipologie[7].nome == "Tipologia 7"
+    assert [m.id for m in project.menus] == ["m1"]
+    assert list(project.astine) == []
+
+
+def test_unread_section_survives_save(tmp_path):
+    """Test sezione mai letta: copiata nel nuovo file senza decodificarla"""
+    path = str(tmp_path / "catalogo.mdp")
+    ProjectManager().save_project(path, _sample_project(), create_backup=False)
+    
+    manager = ProjectManager()
+    project = manager.load_project(path)
+    project.menus.append(MenuItem(id="m2", nome="Archivio", icona="mdi:folder"))
+    project.nome = "Catalogo 2"
+    manager.save_project(path, project)
+    assert not project.tipologie.loaded
+    
+    # La sezione non letta è ricollegata al file appena scritto
+    assert project.tipologie[49].id == "t49"
+    
+    reloaded = ProjectManager().load_project(path)
+    assert reloaded.nome == "Catalogo 2"
+    assert [m.id for m in reloaded.menus] == ["m1", "m2"]
+    assert [t.id for t in reloaded.tipologie] == [f"t{i}" for i in range(50)]
+
+
+def test_load_legacy_json(tmp_path):
+    """Test caricamento di un .mdp JSON delle versioni precedenti"""
+    path = tmp_path / "vecchio.mdp"
+    path.write_text(json.dumps(_sample_project().to_dict()), encoding="utf-8")
+    assert not is_container(path)
+    
+    project = ProjectManager().load_project(str(path))
+    assert project.nome == "Catalogo"
+    assert isinstance(project.tipologie, list)
+    assert [t.id for t in project.tipologie][:3] == ["t0", "t1", "t2"]
+    
+    # Risalvato nel formato contenitore
+    ProjectManager().save_project(str(path), project, create_backup=False)
+    assert is_container(path)
+    assert len(ProjectManager().load_project(str(path)).tipologie) == 50
@@ -0,0 +1,78 @@
+"""
+Test per la copia incrementale della microSD
+"""
+
+import os
+from core.sd_mirror import SdMirror
+
+
+def _make_card(root):
+    (root / "sessions").mkdir(parents=True)
+    (root / "exports").mkdir()
+    (root / "backup").mkdir()
+    (root / "sessions" / "20240301.jsonl").write_bytes(b'{"value": 1}\n' * 100)
+    (root / "exports" / "export_20240301.csv").write_text("timestamp,value\n1,2\n")
+    (root / "config.json").write_text("{}")
+
+
+def _append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+    # Data di modifica diversa anche su filesystem a bassa risoluzione
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+
+def test_first_sync_and_unchanged(tmp_path):
+    """Test prima copia completa e sincronizzazione senza modifiche"""
+    card, mirror = tmp_path / "sd", tmp_path / "mirror"
+    _make_card(card)
+    
+    stats = SdMirror(card, mirror, block_size=256).sync()
+    assert stats.new_files == 2
+    assert (mirror / "sessions" / "20240301.jsonl").read_bytes() == \
+        (card / "sessions" / "20240301.jsonl").read_bytes()
+    assert not (mirror / "config.json").exists()
+    
+    stats = SdMirror(card, mirror, block_size=256).sync()
+    assert stats.unchanged_files == 2
+    assert stats.bytes_copied == 0
+
+
+def test_append_copies_only_new_bytes(tmp_path):
+    """Test sessione in append: copiati solo i byte nuovi"""
+    card, mirror = tmp_path / "sd", tmp_path / "mirror"
+    _make_card(card)
+    session = card / "sessions" / "20240301.jsonl"
+    SdMirror(card, mirror, block_size=256).sync()
+    
+    _append(session, b'{"value": 2}\n' * 3)
+    (card / "backup" / "config_20240302.json").write_text("{}")
+    
+    stats = SdMirror(card, mirror, block_size=256).sync()
+    assert stats.appended_files == 1
+    assert stats.new_files == 1
+    assert stats.bytes_copied == 3 * 13 + 2
+    assert (mirror / "sessions" / "20240301.jsonl").read_bytes() == session.read_bytes()
+
+
+def test_rewritten_session_is_recopied_from_changed_block(tmp_path):
+    """Test sessione riscritta: ricopia dal primo blocco diverso"""
+    card, mirror = tmp_path / "sd", tmp_path / "mirror"
+    _make_card(card)
+    session = card / "sessions" / "20240301.jsonl"
+    SdMirror(card, mirror, block_size=256).sync()
+    
+    data = bytearray(session.read_bytes())
+    data[-5] = ord("9")
+    session.write_bytes(bytes(data) + b'{"value": 3}\n')
+    
+    stats = SdMirror(card, mirror, block_size=256).sync()
+    assert stats.recopied_files == 1
+    assert stats.bytes_copied < len(data)
+    assert (mirror / "sessions" / "20240301.jsonl").read_bytes() == session.read_bytes()
+    
+    # Copia locale cancellata: di nuovo copia completa
+    (mirror / "sessions" / "20240301.jsonl").unlink()
+    assert SdMirror(card, mirror, block_size=256).sync().new_files == 1
+    assert (mirror / "sessions" / "20240301.jsonl").read_bytes() == session.read_bytes()
@@ -7,19 +7,28 @@ from PyQt6.QtWidgets import (
     QLineEdit, QPushButton, QTextEdit, QGroupBox,
     QFormLayout, QDoubleSpinBox, QListWidget
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QColor, QPalette
 
-from core.formula_parser import FormulaParser
+from core.formula_parser import get_formula_parser
 
 
 class FormulaEditor(QWidget):
     """Editor per formule matematiche con test"""
     
+    # Attesa dopo l'ultimo tasto prima di validare (ms)
+    VALIDATION_DELAY_MS = 150
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
-        self.parser = FormulaParser()
+        self.parser = get_formula_parser()
+        
+        # Validazione ritardata: una sola validazione per raffica di tasti
+        self._validation_timer = QTimer(self)
+        self._validation_timer.setSingleShot(True)
+        self._validation_timer.setInterval(self.VALIDATION_DELAY_MS)
+        self._validation_timer.timeout.connect(self._validate_formula)
         
         layout = QVBoxLayout(self)
         
@@ -74,7 +83,12 @@ class FormulaEditor(QWidget):
         layout.addStretch()
     
     def _on_formula_changed(self, text):
-        """Validazione real-time formula"""
+        """Riavvia il timer di validazione a ogni modifica"""
+        self._validation_timer.start()
+    
+    def _validate_formula(self):
+        """Validazione formula (dopo la pausa di digitazione)"""
+        text = self.formula_input.text()
         if not text.strip():
             self.validation_label.setText("")
             self.result_label.setText("Risultato: -")
@@ -139,6 +153,10 @@ class FormulaEditor(QWidget):
     def set_formula(self, formula: str):
         """Imposta formula da editare"""
         self.formula_input.setText(formula)
+        
+        # Formula impostata da codice: validazione immediata
+        self._validation_timer.stop()
+        self._validate_formula()
     
     def get_formula(self) -> str:
         """Ottiene formula corrente"""
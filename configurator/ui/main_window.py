@@ -8,12 +8,16 @@ from PyQt6.QtWidgets import (
     QDockWidget, QToolBar, QStatusBar, QMessageBox,
     QFileDialog, QLabel, QTabWidget
 )
-from PyQt6.QtCore import Qt, QSize, pyqtSignal
+from PyQt6.QtCore import Qt, QSize, QThread, QObject, pyqtSignal
 from PyQt6.QtGui import QAction, QIcon, QKeySequence
 
 from core.project_manager import ProjectManager
 from core.config_model import ProgettoConfigurazione
 from core.io_manager import IOManager
+from core.job_runner import (
+    JobRunner, export_measures_job, export_config_job,
+    RUNNING, DONE, FAILED, CANCELLED
+)
 from .canvas_widget import DisplayPreviewWidget
 from .toolbox_widget import ToolboxWidget
 from .properties_panel import PropertiesPanel
@@ -24,6 +28,44 @@ from .mode_editor_dialog import ModeEditorDialog
 from pathlib import Path
 
 
+class MeasureDirectoryImportThread(QThread):
+    """Thread per import di una cartella di misure (non blocca la UI)"""
+    
+    progress = pyqtSignal(int, int)
+    import_finished = pyqtSignal(int, list)
+    
+    def __init__(self, io_manager, input_dir):
+        super().__init__()
+        self.io_manager = io_manager
+        self.input_dir = input_dir
+    
+    def run(self):
+        """
+        Legge e unisce i file; emette il numero di misure (-1 se errore)
+        e i file esclusi perché non leggibili
+        """
+        failed = []
+        try:
+            count = 0
+            for _measure in self.io_manager.iter_measures_directory(
+                    self.input_dir,
+                    progress_callback=lambda done, total: self.progress.emit(done, total),
+                    error_callback=lambda path, message: failed.append(f"{path.name}: {message}")):
+                count += 1
+            self.import_finished.emit(count, failed)
+        
+        except Exception as e:
+            # Qualsiasi errore (anche del pool di processi) deve riabilitare l'azione
+            print(f"Errore import cartella misure: {e}")
+            self.import_finished.emit(-1, failed)
+
+
+class JobEventBridge(QObject):
+    """Inoltra gli eventi del JobRunner (thread del job) al thread della UI"""
+    
+    event = pyqtSignal(object)
+
+
 class MainWindow(QMainWindow):
     """Finestra principale dell'applicazione"""
     
@@ -35,6 +77,13 @@ class MainWindow(QMainWindow):
         self.project_manager = ProjectManager()
         self.current_project = self.project_manager.new_project()
         self.io_manager = IOManager()
+        self.import_thread = None
+        
+        # Export in background: gli eventi arrivano nel thread della UI
+        self.job_runner = JobRunner()
+        self.job_bridge = JobEventBridge()
+        self.job_bridge.event.connect(self._on_job_event)
+        self.job_runner.add_listener(self.job_bridge.event.emit)
         
         self._init_ui()
         self._create_actions()
@@ -89,6 +138,10 @@ class MainWindow(QMainWindow):
         self.action_import_measures.setStatusTip("Importa misure da JSONL/CSV")
         self.action_import_measures.triggered.connect(self._on_import_measures)
         
+        self.action_import_measures_dir = QAction("Importa Cartella Mis&ure...", self)
+        self.action_import_measures_dir.setStatusTip("Importa tutte le sessioni di una cartella (es: /sd/sessions)")
+        self.action_import_measures_dir.triggered.connect(self._on_import_measures_directory)
+        
         self.action_export_measures = QAction("Esporta M&isure...", self)
         self.action_export_measures.setStatusTip("Esporta misure su JSONL/CSV")
         self.action_export_measures.triggered.connect(self._on_export_measures)
@@ -101,6 +154,11 @@ class MainWindow(QMainWindow):
         self.action_export_config.setStatusTip("Esporta configurazione completa")
         self.action_export_config.triggered.connect(self._on_export_config)
         
+        self.action_cancel_jobs = QAction("&Annulla Export in Corso", self)
+        self.action_cancel_jobs.setStatusTip("Annulla gli export in esecuzione in background")
+        self.action_cancel_jobs.setEnabled(False)
+        self.action_cancel_jobs.triggered.connect(lambda: self.job_runner.cancel())
+        
         self.action_exit = QAction("E&sci", self)
         self.action_exit.setShortcut(QKeySequence.StandardKey.Quit)
         self.action_exit.triggered.connect(self.close)
@@ -191,10 +249,13 @@ class MainWindow(QMainWindow):
         # Sottomenu Import/Export
         import_export_menu = file_menu.addMenu("📥📤 Import/Export")
         import_export_menu.addAction(self.action_import_measures)
+        import_export_menu.addAction(self.action_import_measures_dir)
         import_export_menu.addAction(self.action_export_measures)
         import_export_menu.addSeparator()
         import_export_menu.addAction(self.action_import_config)
         import_export_menu.addAction(self.action_export_config)
+        import_export_menu.addSeparator()
+        import_export_menu.addAction(self.action_cancel_jobs)
         
         file_menu.addSeparator()
         file_menu.addAction(self.action_exit)
@@ -494,11 +555,12 @@ class MainWindow(QMainWindow):
         
         filepath = Path(filepath)
         
-        # Determina formato
+        # Determina formato (JSONL letto in streaming: memoria costante)
         if filepath.suffix.lower() == '.jsonl':
-            measures = self.io_manager.import_measures_jsonl(filepath)
+            count = self.io_manager.count_measures_jsonl(filepath)
         elif filepath.suffix.lower() == '.csv':
             measures = self.io_manager.import_measures_csv(filepath)
+            count = len(measures) if measures is not None else None
         else:
             QMessageBox.warning(
                 self,
@@ -507,11 +569,11 @@ class MainWindow(QMainWindow):
             )
             return
         
-        if measures:
+        if count:
             QMessageBox.information(
                 self,
                 "Import Completato",
-                f"Importate {len(measures)} misure"
+                f"Importate {count} misure"
             )
         else:
             QMessageBox.warning(
@@ -520,6 +582,50 @@ class MainWindow(QMainWindow):
                 "Impossibile importare misure"
             )
     
+    def _on_import_measures_directory(self):
+        """Importa tutte le misure di una cartella in background"""
+        if self.import_thread is not None and self.import_thread.isRunning():
+            return
+        
+        directory = QFileDialog.getExistingDirectory(self, "Importa Cartella Misure")
+        if not directory:
+            return
+        
+        self.action_import_measures_dir.setEnabled(False)
+        self.import_thread = MeasureDirectoryImportThread(self.io_manager, Path(directory))
+        self.import_thread.progress.connect(self._on_import_directory_progress)
+        self.import_thread.import_finished.connect(self._on_import_directory_finished)
+        self.import_thread.start()
+    
+    def _on_import_directory_progress(self, done: int, total: int):
+        """Aggiorna la barra di stato durante l'import della cartella"""
+        self.statusbar.showMessage(f"Import misure: {done}/{total} file")
+    
+    def _on_import_directory_finished(self, count: int, failed: list):
+        """Import cartella completato"""
+        self.action_import_measures_dir.setEnabled(True)
+        self.statusbar.clearMessage()
+        
+        if failed:
+            QMessageBox.warning(
+                self,
+                "File Non Importati",
+                "File esclusi perché non leggibili:\n" + "\n".join(failed)
+            )
+        
+        if count > 0:
+            QMessageBox.information(
+                self,
+                "Import Completato",
+                f"Importate {count} misure"
+            )
+        else:
+            QMessageBox.warning(
+                self,
+                "Errore Import",
+                "Nessuna misura importata dalla cartella"
+            )
+    
     def _on_export_measures(self):
         """Esporta misure su file"""
         filepath, selected_filter = QFileDialog.getSaveFileName(
@@ -534,16 +640,7 @@ class MainWindow(QMainWindow):
         
         filepath = Path(filepath)
         
-        # Crea misure esempio per demo
-        measures = self.io_manager.create_example_measures(10)
-        
-        # Determina formato
-        success = False
-        if filepath.suffix.lower() == '.jsonl':
-            success = self.io_manager.export_measures_jsonl(measures, filepath)
-        elif filepath.suffix.lower() == '.csv':
-            success = self.io_manager.export_measures_csv(measures, filepath)
-        else:
+        if filepath.suffix.lower() not in ('.jsonl', '.csv'):
             QMessageBox.warning(
                 self,
                 "Formato Non Supportato",
@@ -551,18 +648,12 @@ class MainWindow(QMainWindow):
             )
             return
         
-        if success:
-            QMessageBox.information(
-                self,
-                "Export Completato",
-                f"Esportate {len(measures)} misure"
-            )
-        else:
-            QMessageBox.warning(
-                self,
-                "Errore Export",
-                "Impossibile esportare misure"
-            )
+        # Crea misure esempio per demo
+        measures = self.io_manager.create_example_measures(10)
+        
+        # Export in background (un nuovo export sullo stesso file sostituisce il precedente)
+        self.job_runner.submit(str(filepath.resolve()), export_measures_job,
+                               self.io_manager, measures, filepath)
     
     def _on_import_config(self):
         """Importa configurazione completa"""
@@ -639,21 +730,38 @@ class MainWindow(QMainWindow):
             if reply != QMessageBox.StandardButton.Yes:
                 return
         
-        # Export
-        success = self.io_manager.export_config(config, filepath, create_backup=True)
+        # Export in background
+        self.job_runner.submit(str(filepath.resolve()), export_config_job,
+                               self.io_manager, config, filepath, create_backup=True)
+    
+    def _on_job_event(self, event):
+        """Aggiorna la UI con gli eventi dei job di export"""
+        self.action_cancel_jobs.setEnabled(bool(self.job_runner.active_jobs))
+        name = Path(event.target).name
         
-        if success:
+        if event.kind == RUNNING:
+            self.statusbar.showMessage(f"Export {name}...")
+        elif event.kind == 'progress':
+            if event.total:
+                self.statusbar.showMessage(f"Export {name}: {event.done}/{event.total}")
+            else:
+                self.statusbar.showMessage(f"Export {name}: {event.done}")
+        elif event.kind == DONE:
+            self.statusbar.clearMessage()
             QMessageBox.information(
                 self,
                 "Export Completato",
-                f"Configurazione esportata su:\n{filepath}"
+                f"Esportato su:\n{event.target}"
             )
-        else:
+        elif event.kind == FAILED:
+            self.statusbar.clearMessage()
             QMessageBox.warning(
                 self,
                 "Errore Export",
-                "Impossibile esportare configurazione"
+                f"Impossibile esportare {name}:\n{event.error}"
             )
+        elif event.kind == CANCELLED:
+            self.statusbar.showMessage(f"Export {name} annullato", 3000)
     
     def _on_documentation(self):
         """Mostra documentazione"""
@@ -680,10 +788,10 @@ class MainWindow(QMainWindow):
     
     def _load_project_to_ui(self):
         """Carica progetto nella UI"""
-        # Carica menu
+        # Le sezioni passano agli editor così come sono: per i progetti in
+        # formato contenitore sono decodificate solo quando l'editor viene
+        # mostrato, e quelle mai aperte vengono salvate senza decodificarle
         self.menu_editor.load_menus(self.current_project.menus)
-        
-        # Carica tipologie
         self.tipologia_editor.load_tipologie(self.current_project.tipologie)
         
         # TODO: Carica hardware, modes, ui_layout, icons
@@ -804,3 +912,7 @@ class MainWindow(QMainWindow):
                 event.ignore()
         else:
             event.accept()
+        
+        if event.isAccepted():
+            # Annulla gli export in corso (nessun file parziale resta su disco)
+            self.job_runner.shutdown()
@@ -7,7 +7,7 @@ from PyQt6.QtWidgets import (
     QTreeWidgetItem, QPushButton, QToolButton
 )
 from PyQt6.QtCore import Qt
-from typing import List
+from typing import List, Optional, Sequence
 
 from core.config_model import MenuItem
 
@@ -54,10 +54,31 @@ class MenuEditor(QWidget):
         self.tree.setHeaderLabels(["Nome", "Icona", "Azione"])
         self.tree.setColumnWidth(0, 200)
         layout.addWidget(self.tree)
+        
+        # Menu non ancora mostrati nell'albero (decodificati alla prima visualizzazione)
+        self._pending_menus: Optional[Sequence[MenuItem]] = None
     
-    def load_menus(self, menus: List[MenuItem]):
-        """Carica menu nell'editor"""
+    def load_menus(self, menus: Sequence[MenuItem]):
+        """
+        Carica menu nell'editor
+        
+        Una sezione a caricamento differito (LazySection) viene decodificata
+        solo quando l'editor viene mostrato.
+        """
         self.tree.clear()
+        self._pending_menus = menus
+        if self.isVisible():
+            self._populate()
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._populate()
+    
+    def _populate(self):
+        """Riempie l'albero con i menu caricati (una volta sola)"""
+        if self._pending_menus is None:
+            return
+        menus, self._pending_menus = self._pending_menus, None
         for menu in sorted(menus, key=lambda m: m.ordine):
             self._add_menu_item(menu, self.tree)
     
@@ -77,6 +98,10 @@ class MenuEditor(QWidget):
     
     def get_menus(self) -> List[MenuItem]:
         """Ottiene menu dall'editor"""
+        # Editor mai mostrato: sezione originale, ancora non decodificata
+        if self._pending_menus is not None:
+            return self._pending_menus
+        
         menus = []
         for i in range(self.tree.topLevelItemCount()):
             item = self.tree.topLevelItem(i)
@@ -83,6 +83,10 @@ class ModeEditorDialog(QDialog):
         self.mode_data = mode_data or {}
         self.workflow_steps: List[WorkflowStepWidget] = []
         
+        # Grafo formule dell'anteprima (ricostruito solo se cambia il testo)
+        self._preview_graph = None
+        self._preview_graph_text = None
+        
         self.setWindowTitle("🔧 Editor Modalità di Misura")
         self.resize(700, 650)
         
@@ -252,8 +256,10 @@ class ModeEditorDialog(QDialog):
         self.formula_input = QTextEdit()
         self.formula_input.setPlaceholderText(
             "es: L + H + B - 5.0\n"
+            "Più risultati, uno per riga: luce = L - 12\n"
+            "                             taglio = luce / 2\n"
             "Variabili disponibili: L, H, D, B\n"
-            "Operatori: +, -, *, /, (), sqrt(), abs()"
+            "Operatori: +, -, *, /, (), round(), abs(), min(), max()"
         )
         self.formula_input.setFont(QFont("Courier New", 11))
         layout.addWidget(self.formula_input)
@@ -286,6 +292,9 @@ class ModeEditorDialog(QDialog):
             spin.setRange(0, 10000)
             spin.setValue(1000)
             spin.setSuffix(" mm")
+            spin.valueChanged.connect(
+                lambda value, var=var: self._on_test_value_changed(var, value)
+            )
             test_layout.addRow(f"{var}:", spin)
             self.test_values[var] = spin
         
@@ -404,29 +413,105 @@ class ModeEditorDialog(QDialog):
             self.formula_result.setText("Risultato: Inserisci una formula")
             return
         
-        # Sostituisci variabili con valori test
-        test_formula = formula
-        for var, spin in self.test_values.items():
-            test_formula = test_formula.replace(var, str(spin.value()))
+        # Crea contesto con variabili
+        context = {var: spin.value() for var, spin in self.test_values.items()}
         
         try:
             # Usa parser sicuro formula invece di eval
-            from core.formula_parser import FormulaParser
-            parser = FormulaParser()
-            
-            # Crea contesto con variabili
-            context = {var: spin.value() for var, spin in self.test_values.items()}
-            
-            # Valuta formula in modo sicuro
-            result = parser.evaluate(formula, context)
+            graph = self._get_preview_graph(formula)
             
-            # Formatta risultato
-            decimals = self.decimals_spin.value()
-            unit = self.unit_combo.currentText()
-            self.formula_result.setText(f"Risultato: {result:.{decimals}f} {unit}")
+            if graph is None:
+                from core.formula_parser import get_formula_parser
+                parser = get_formula_parser()
+                
+                # Valuta formula in modo sicuro
+                result = parser.evaluate(formula, context)
+                self.formula_result.setText(f"Risultato: {self._format_preview_value(result)}")
+            else:
+                graph.evaluate(context)
+                self._show_graph_results(graph)
         except Exception as e:
+            self._preview_graph = None
+            self._preview_graph_text = None
             self.formula_result.setText(f"Errore: {str(e)}")
     
+    def _get_preview_graph(self, text: str):
+        """
+        Ritorna il grafo delle formule per testi con più righe 'nome = formula'.
+        Ritorna None per una formula singola.
+        """
+        if text == self._preview_graph_text:
+            return self._preview_graph
+        
+        formule = self._split_formule(text)
+        if not formule:
+            graph = None
+        else:
+            from core.formula_graph import FormulaGraph
+            graph = FormulaGraph(formule)
+        
+        self._preview_graph = graph
+        self._preview_graph_text = text
+        return graph
+    
+    @staticmethod
+    def _split_formule(text: str) -> Dict[str, str]:
+        """
+        Converte le righe 'nome = formula' in {nome_risultato: formula}
+        
+        Args:
+            text: Testo del campo formula
+        
+        Returns:
+            Formule per MeasureMode.formule (vuoto per una formula singola)
+        
+        Raises:
+            ValueError: Se una riga non è nella forma 'nome = formula'
+                        o un nome è ripetuto
+        """
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if len(lines) <= 1 and not any('=' in line for line in lines):
+            return {}
+        
+        formule = {}
+        for line in lines:
+            nome, sep, espressione = line.partition('=')
+            nome, espressione = nome.strip(), espressione.strip()
+            if not sep or not nome or not espressione:
+                raise ValueError(f"Riga non valida (usa 'nome = formula'): {line}")
+            if nome in formule:
+                raise ValueError(f"Risultato definito più volte: {nome}")
+            formule[nome] = espressione
+        return formule
+    
+    def _on_test_value_changed(self, var: str, value: float):
+        """Aggiorna l'anteprima ricalcolando solo i risultati che dipendono da var"""
+        if self._preview_graph is None:
+            return
+        
+        if self._preview_graph_text != self.formula_input.toPlainText().strip():
+            return
+        
+        try:
+            self._preview_graph.update({var: value})
+            self._show_graph_results(self._preview_graph)
+        except Exception as e:
+            self.formula_result.setText(f"Errore: {str(e)}")
+    
+    def _show_graph_results(self, graph):
+        """Mostra tutti i risultati del grafo formule"""
+        lines = [
+            f"{nome}: {self._format_preview_value(valore)}"
+            for nome, valore in graph.results().items()
+        ]
+        self.formula_result.setText("\n".join(lines))
+    
+    def _format_preview_value(self, value: float) -> str:
+        """Formatta un risultato con decimali e unità correnti"""
+        decimals = self.decimals_spin.value()
+        unit = self.unit_combo.currentText()
+        return f"{value:.{decimals}f} {unit}"
+    
     def _preview_mode(self):
         """Mostra anteprima modalità"""
         data = self._get_form_data()
@@ -445,7 +530,12 @@ Workflow ({len(data['workflow'])} passi):
         for step in data['workflow']:
             preview_text += f"  {step['step']}. {step['variable']}: {step['description']} ({step['probe_type']})\n"
         
-        preview_text += f"\nFormula: {data['formula']}\n"
+        if data['formule']:
+            preview_text += "\nFormule:\n"
+            for nome, formula in data['formule'].items():
+                preview_text += f"  {nome} = {formula}\n"
+        else:
+            preview_text += f"\nFormula: {data['formula']}\n"
         preview_text += f"Unità: {data['unit']}, Decimali: {data['decimals']}\n"
         preview_text += f"Invio BT: {'Sì' if data['bt_enabled'] else 'No'}\n"
         
@@ -468,11 +558,32 @@ Workflow ({len(data['workflow'])} passi):
             QMessageBox.warning(self, "Validazione", "Workflow vuoto: aggiungi almeno un passo")
             return
         
+        # Più righe 'nome = formula': salvate come grafo in 'formule', solo se valido
+        try:
+            formule = self._split_formule(self.formula_input.toPlainText().strip())
+            if formule:
+                from core.formula_graph import FormulaGraph
+                FormulaGraph(formule)
+        except ValueError as e:
+            QMessageBox.warning(self, "Validazione", f"Formule non valide:\n{e}")
+            return
+        
         self.mode_data = data
         self.accept()
     
     def _get_form_data(self) -> Dict[str, Any]:
-        """Ottiene dati dal form"""
+        """
+        Ottiene dati dal form
+        
+        Una formula singola resta in 'formula'; più righe 'nome = formula'
+        vanno in 'formule' ({nome_risultato: formula}, come MeasureMode).
+        """
+        text = self.formula_input.toPlainText().strip()
+        try:
+            formule = self._split_formule(text)
+        except ValueError:
+            formule = {}
+        
         return {
             'id': self.id_input.text(),
             'name': self.name_input.text(),
@@ -481,7 +592,8 @@ Workflow ({len(data['workflow'])} passi):
             'description': self.description_text.toPlainText(),
             'workflow': [step.get_data() for step in self.workflow_steps],
             'workflow_notes': self.workflow_notes.toPlainText(),
-            'formula': self.formula_input.toPlainText(),
+            'formula': '' if formule else text,
+            'formule': formule,
             'unit': self.unit_combo.currentText(),
             'decimals': self.decimals_spin.value(),
             'bt_enabled': self.bt_send_check.isChecked(),
@@ -514,8 +626,14 @@ Workflow ({len(data['workflow'])} passi):
         
         self.workflow_notes.setPlainText(self.mode_data.get('workflow_notes', ''))
         
-        # Formula
-        self.formula_input.setPlainText(self.mode_data.get('formula', ''))
+        # Formula (o grafo di formule, una riga 'nome = formula' per risultato)
+        formule = self.mode_data.get('formule') or {}
+        if formule:
+            self.formula_input.setPlainText(
+                "\n".join(f"{nome} = {formula}" for nome, formula in formule.items())
+            )
+        else:
+            self.formula_input.setPlainText(self.mode_data.get('formula', ''))
         
         unit = self.mode_data.get('unit', 'mm')
         index = self.unit_combo.findText(unit)
@@ -48,11 +48,25 @@ class TipologiaEditor(QWidget):
         layout.addWidget(self.list)
         
         self.tipologie = []
+        self._list_stale = False
     
     def load_tipologie(self, tipologie: List[TipologiaInfisso]):
-        """Carica tipologie nell'editor"""
+        """
+        Carica tipologie nell'editor
+        
+        Una sezione a caricamento differito (LazySection) viene decodificata
+        solo quando l'editor viene mostrato.
+        """
         self.tipologie = tipologie
-        self._update_list()
+        self.list.clear()
+        self._list_stale = True
+        if self.isVisible():
+            self._update_list()
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._list_stale:
+            self._update_list()
     
     def get_tipologie(self) -> List[TipologiaInfisso]:
         """Ottiene tipologie dall'editor"""
@@ -60,6 +74,7 @@ class TipologiaEditor(QWidget):
     
     def _update_list(self):
         """Aggiorna lista visualizzata"""
+        self._list_stale = False
         self.list.clear()
         for tip in self.tipologie:
             self.list.addItem(f"{tip.nome} ({tip.categoria})")
@@ -311,3 +311,191 @@ bool formula_parser_get_variable(const char *nome,
     
     return false;
 }
+
+// Execute precompiled postfix bytecode
+ParseResult formula_bytecode_evaluate(const uint8_t *program, size_t length,
+                                      const float *slots, uint8_t num_slots) {
+    ParseResult result = {
+        .success = false,
+        .value = 0.0f,
+        .error_message = ""
+    };
+    
+    if (!program || length < 4) {
+        snprintf(result.error_message, sizeof(result.error_message), "Truncated bytecode");
+        return result;
+    }
+    
+    uint8_t version = program[0];
+    uint8_t num_consts = program[1];
+    uint8_t num_vars = program[2];
+    uint8_t stack_size = program[3];
+    size_t code_start = 4 + (size_t)num_consts * sizeof(double);
+    
+    if (version != FORMULA_BYTECODE_VERSION) {
+        snprintf(result.error_message, sizeof(result.error_message),
+                "Unsupported bytecode version %u", version);
+        return result;
+    }
+    if (code_start > length || stack_size > FORMULA_BYTECODE_MAX_STACK) {
+        snprintf(result.error_message, sizeof(result.error_message), "Invalid bytecode header");
+        return result;
+    }
+    if (num_vars > num_slots || (num_vars > 0 && !slots)) {
+        snprintf(result.error_message, sizeof(result.error_message), "Missing variable values");
+        return result;
+    }
+    
+    double stack[FORMULA_BYTECODE_MAX_STACK];
+    uint8_t sp = 0;
+    size_t pc = code_start;
+    
+    while (pc < length) {
+        uint8_t op = program[pc++];
+        
+        switch (op) {
+            case FBC_OP_CONST:
+            case FBC_OP_VAR: {
+                if (pc >= length || sp >= FORMULA_BYTECODE_MAX_STACK) {
+                    goto invalid;
+                }
+                uint8_t arg = program[pc++];
+                if (op == FBC_OP_CONST) {
+                    if (arg >= num_consts) {
+                        goto invalid;
+                    }
+                    double value;
+                    memcpy(&value, &program[4 + (size_t)arg * sizeof(double)], sizeof(double));
+                    stack[sp++] = value;
+                } else {
+                    if (arg >= num_vars) {
+                        goto invalid;
+                    }
+                    stack[sp++] = slots[arg];
+                }
+                break;
+            }
+            
+            case FBC_OP_MIN:
+            case FBC_OP_MAX: {
+                if (pc >= length) {
+                    goto invalid;
+                }
+                uint8_t count = program[pc++];
+                if (count == 0 || count > sp) {
+                    goto invalid;
+                }
+                double value = stack[sp - count];
+                for (uint8_t i = sp - count + 1; i < sp; i++) {
+                    if (op == FBC_OP_MIN ? stack[i] < value : stack[i] > value) {
+                        value = stack[i];
+                    }
+                }
+                sp -= count;
+                stack[sp++] = value;
+                break;
+            }
+            
+            case FBC_OP_NEG:
+            case FBC_OP_ABS:
+            case FBC_OP_ROUND:
+                if (sp < 1) {
+                    goto invalid;
+                }
+                if (op == FBC_OP_NEG) {
+                    stack[sp - 1] = -stack[sp - 1];
+                } else if (op == FBC_OP_ABS) {
+                    stack[sp - 1] = fabs(stack[sp - 1]);
+                } else {
+                    // Metà al pari, come round() del configuratore
+                    stack[sp - 1] = rint(stack[sp - 1]);
+                }
+                break;
+            
+            case FBC_OP_ROUND_N: {
+                if (sp < 2) {
+                    goto invalid;
+                }
+                double digits = stack[--sp];
+                if (digits != floor(digits)) {
+                    snprintf(result.error_message, sizeof(result.error_message),
+                            "round(): non-integer digits");
+                    return result;
+                }
+                if (digits >= 0 && digits <= 15) {
+                    // Da 2^52 in su ogni double è intero: nulla da arrotondare
+                    // (e "%.*f" richiederebbe fino a DBL_MAX_10_EXP cifre)
+                    double x = stack[sp - 1];
+                    if (isfinite(x) && fabs(x) < 4503599627370496.0) {
+                        // Arrotondamento decimale corretto (come round() del
+                        // configuratore): rint(x * 10^n) sbaglia vicino a metà.
+                        // Segno, 16 cifre intere, punto e 15 decimali: < 64
+                        char buf[64];
+                        int len = snprintf(buf, sizeof(buf), "%.*f", (int)digits, x);
+                        if (len > 0 && len < (int)sizeof(buf)) {
+                            stack[sp - 1] = strtod(buf, NULL);
+                        } else {
+                            double scale = pow(10.0, digits);
+                            stack[sp - 1] = rint(x * scale) / scale;
+                        }
+                    }
+                } else if (digits < 0) {
+                    double scale = pow(10.0, -digits);
+                    stack[sp - 1] = rint(stack[sp - 1] / scale) * scale;
+                }
+                break;
+            }
+            
+            case FBC_OP_ADD:
+            case FBC_OP_SUB:
+            case FBC_OP_MUL:
+            case FBC_OP_DIV: {
+                if (sp < 2) {
+                    goto invalid;
+                }
+                double right = stack[--sp];
+                double left = stack[sp - 1];
+                
+                if (op == FBC_OP_ADD) {
+                    stack[sp - 1] = left + right;
+                } else if (op == FBC_OP_SUB) {
+                    stack[sp - 1] = left - right;
+                } else if (op == FBC_OP_MUL) {
+                    stack[sp - 1] = left * right;
+                } else {
+                    if (right == 0.0) {
+                        snprintf(result.error_message, sizeof(result.error_message),
+                                "Division by zero");
+                        return result;
+                    }
+                    stack[sp - 1] = left / right;
+                }
+                break;
+            }
+            
+            default:
+                goto invalid;
+        }
+    }
+    
+    if (sp != 1 || !isfinite(stack[0])) {
+        goto invalid;
+    }
+    
+    // Risultato restituito come float: oltre FLT_MAX sarebbe inf
+    float value = (float)stack[0];
+    if (!isfinite(value)) {
+        snprintf(result.error_message, sizeof(result.error_message),
+                "Result out of float range");
+        return result;
+    }
+    
+    result.success = true;
+    result.value = value;
+    return result;
+    
+invalid:
+    snprintf(result.error_message, sizeof(result.error_message), "Invalid bytecode");
+    ESP_LOGE(TAG, "Invalid bytecode at offset %u", (unsigned)pc);
+    return result;
+}
@@ -2,8 +2,30 @@
 #define FORMULA_PARSER_H
 
 #include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
 #include "config.h"
 
+// Bytecode postfix generato dal configuratore (core/formula_bytecode.py)
+#define FORMULA_BYTECODE_VERSION    1
+#define FORMULA_BYTECODE_MAX_STACK  32
+
+// Opcode con operando (1 byte)
+#define FBC_OP_CONST    0x01
+#define FBC_OP_VAR      0x02
+#define FBC_OP_MIN      0x23
+#define FBC_OP_MAX      0x24
+
+// Opcode senza operando
+#define FBC_OP_ADD      0x10
+#define FBC_OP_SUB      0x11
+#define FBC_OP_MUL      0x12
+#define FBC_OP_DIV      0x13
+#define FBC_OP_NEG      0x14
+#define FBC_OP_ROUND    0x20
+#define FBC_OP_ROUND_N  0x21
+#define FBC_OP_ABS      0x22
+
 // Tipi di token
 typedef enum {
     TOKEN_NUMBER,
@@ -64,4 +86,19 @@ bool formula_parser_get_variable(const char *nome,
                                  uint8_t num_variabili,
                                  float *out_value);
 
+/**
+ * @brief Esegue una formula già compilata in bytecode (senza parsing)
+ * 
+ * Formato: header [versione, n_costanti, n_slot, stack_max], pool di
+ * costanti double little-endian, istruzioni opcode(+operando).
+ * 
+ * @param program Programma decodificato (campo "program" in base64)
+ * @param length Lunghezza programma in byte
+ * @param slots Valori delle variabili nell'ordine del campo "vars"
+ * @param num_slots Numero di valori in slots
+ * @return ParseResult Risultato con success, value ed eventuali errori
+ */
+ParseResult formula_bytecode_evaluate(const uint8_t *program, size_t length,
+                                      const float *slots, uint8_t num_slots);
+
 #endif // FORMULA_PARSER_H
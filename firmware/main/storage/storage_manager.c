@@ -268,6 +268,37 @@ bool storage_export_csv(const measurement_session_t *session, const char *filena
     return true;
 }
 
+bool storage_export_binary(const measurement_session_t *session, const char *filename) {
+    if (!session || !filename) return false;
+    
+    if (!g_storage_state.sd_mounted) {
+        ESP_LOGE(TAG, "SD card non disponibile");
+        return false;
+    }
+    
+    char filepath[128];
+    snprintf(filepath, sizeof(filepath), "%s/%s", SD_EXPORTS_DIR, filename);
+    
+    FILE *f = fopen(filepath, "wb");
+    if (!f) {
+        ESP_LOGE(TAG, "Errore creazione file binario %s", filepath);
+        return false;
+    }
+    
+    // Records scritti così come sono in memoria (CRC già calcolato al salvataggio)
+    size_t written = fwrite(session->records, sizeof(measurement_record_t),
+                            session->count, f);
+    fclose(f);
+    
+    if (written != session->count) {
+        ESP_LOGE(TAG, "Errore scrittura file binario %s", filepath);
+        return false;
+    }
+    
+    ESP_LOGI(TAG, "Export binario completato: %s (%d records)", filepath, session->count);
+    return true;
+}
+
 bool storage_export_to_file(const measurement_session_t *session,
                             export_format_t format,
                             const char *filename,
@@ -284,9 +315,7 @@ bool storage_export_to_file(const measurement_session_t *session,
             return false;
         
         case EXPORT_FORMAT_BINARY:
-            // TODO: implementare export binario
-            ESP_LOGW(TAG, "Export binario non ancora implementato");
-            return false;
+            return storage_export_binary(session, filename);
         
         default:
             return false;
@@ -137,6 +137,18 @@ bool storage_export_to_file(const measurement_session_t *session,
  */
 bool storage_export_csv(const measurement_session_t *session, const char *filename);
 
+/**
+ * @brief Export binario (sequenza di measurement_record_t)
+ * 
+ * Record little-endian senza header, ciascuno con il proprio CRC32:
+ * leggibile dal configuratore (core/measure_binary.py)
+ * 
+ * @param session Sessione da esportare
+ * @param filename Nome file binario output
+ * @return true se export OK, false altrimenti
+ */
+bool storage_export_binary(const measurement_session_t *session, const char *filename);
+
 /**
  * @brief Invia sessione via Bluetooth (chunked transfer)
  * 